@@ -0,0 +1,138 @@
+import secrets
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import FileResponse, PlainTextResponse
+from sqlalchemy import func
+from sqlmodel import select
+
+from app.config import Settings
+from app.database import get_session
+from app.enums import AllowedDateRanges, AllowedTrendingKinds, JobStatus, ProfileTarget
+from app.models import RefreshJob
+from app.services.leader import leader
+from app.services.profiling import collapsed_stacks, profiler
+from app.services.scheduler import scheduler
+from app.services.tracing import tracer
+
+
+def require_admin(authorization: str | None = Header(default=None)):
+    """Check the ``Authorization: Bearer <ADMIN_TOKEN>`` header."""
+    token = Settings.app.ADMIN_TOKEN
+    if not token:
+        raise HTTPException(status_code=403, detail="Admin API is disabled")
+    scheme, _, credentials = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not secrets.compare_digest(credentials, token):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+adminRouter = APIRouter(dependencies=[Depends(require_admin)])
+
+
+@adminRouter.post("/refresh", status_code=202)
+async def refresh(
+    kind: AllowedTrendingKinds | None = None,
+    since: AllowedDateRanges | None = None,
+):
+    return await leader.request_refresh(scheduler, kind=kind, since=since)
+
+
+@adminRouter.get("/refresh")
+async def refresh_status():
+    return {
+        "holder": leader.holder,
+        "is_leader": leader.is_leader,
+        "slices": scheduler.status() if leader.is_leader else [],
+    }
+
+
+@adminRouter.get("/jobs")
+async def jobs(limit: int = 20):
+    async with get_session() as session:
+        result = await session.execute(
+            select(RefreshJob.kind, RefreshJob.status, func.count()).group_by(
+                RefreshJob.kind, RefreshJob.status
+            )
+        )
+        counts = [
+            {"kind": kind, "status": status, "count": count}
+            for kind, status, count in result.all()
+        ]
+        result = await session.execute(
+            select(RefreshJob)
+            .where(RefreshJob.status == JobStatus.failed)
+            .order_by(RefreshJob.updated_at.desc())  # type: ignore
+            .limit(limit)
+        )
+        failed = [
+            {
+                "key": job.idempotency_key,
+                "attempts": job.attempts,
+                "last_error": job.last_error,
+                "updated_at": job.updated_at,
+            }
+            for job in result.scalars().all()
+        ]
+    return {"counts": counts, "failed": failed}
+
+
+@adminRouter.get("/traces")
+async def traces():
+    return {
+        "enabled": tracer.is_enabled,
+        "traces": [
+            {"name": path.name, "size": path.stat().st_size} for path in tracer.list()
+        ],
+    }
+
+
+@adminRouter.put("/traces")
+async def toggle_traces(enabled: bool):
+    """Turn scheduler cycle tracing on or off in this process."""
+    tracer.is_enabled = enabled
+    return {"enabled": tracer.is_enabled}
+
+
+@adminRouter.get("/traces/{name}")
+async def download_trace(name: str):
+    path = tracer.find(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    return FileResponse(path, media_type="application/json", filename=name)
+
+
+@adminRouter.get("/profiles")
+async def profiles():
+    return {
+        "armed": profiler.status(),
+        "profiles": [
+            {"name": path.name, "size": path.stat().st_size} for path in profiler.list()
+        ],
+    }
+
+
+@adminRouter.post("/profiles", status_code=202)
+async def arm_profiling(target: ProfileTarget, count: int = Query(1, ge=1, le=20)):
+    """Profile the next ``count`` requests or scheduler cycles of this process."""
+    armed = profiler.arm(target, count)
+    return {
+        "target": armed.target,
+        "remaining": armed.remaining,
+        "expires_in": Settings.app.PROFILE_ARM_TTL,
+        "is_leader": leader.is_leader,
+    }
+
+
+@adminRouter.delete("/profiles")
+async def disarm_profiling():
+    profiler.disarm()
+    return {"armed": profiler.status()}
+
+
+@adminRouter.get("/profiles/{name}")
+async def download_profile(name: str, format: str = "json"):
+    path = profiler.find(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "collapsed":
+        return PlainTextResponse(collapsed_stacks(path))
+    return FileResponse(path, media_type="application/json", filename=name)
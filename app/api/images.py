@@ -0,0 +1,124 @@
+import asyncio
+import os
+from typing import Awaitable, Callable
+
+from fastapi import APIRouter, HTTPException, Path, Query, Request, Response
+from fastapi.responses import FileResponse, RedirectResponse
+
+from app.config import Settings
+from app.enums import AllowedDateRanges
+from app.services.images import (
+    CachedImage,
+    ImageUnavailable,
+    avatar_size,
+    image_proxy,
+    open_graph_version,
+)
+from app.services.read_model import read_model
+
+# GitHub 用户名和仓库名允许的字符，其他路径不会转发给源站
+USERNAME_PATTERN = r"^[A-Za-z0-9](?:[A-Za-z0-9-]{0,38})$"
+REPOSITORY_PATTERN = r"^[A-Za-z0-9._-]{1,100}$"
+VERSION_PATTERN = r"^[0-9a-f]{1,64}$"
+
+# 带版本号的地址内容不会变化
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+imageRouter = APIRouter()
+
+
+async def image_response(
+    request: Request,
+    load: Callable[[], Awaitable[CachedImage]],
+    cache_control: str,
+):
+    image = await load()
+    headers = {"ETag": image.etag, "Cache-Control": cache_control}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and image.etag in {
+        etag.strip() for etag in if_none_match.split(",")
+    }:
+        return Response(status_code=304, headers=headers)
+    try:
+        stat_result = await asyncio.to_thread(os.stat, image.path)
+    except FileNotFoundError:
+        # 文件已被其他进程淘汰，重新获取一次
+        image_proxy.cache.discard(image)
+        image = await load()
+        headers["ETag"] = image.etag
+        stat_result = await asyncio.to_thread(os.stat, image.path)
+    return FileResponse(
+        image.path,
+        media_type=image.content_type,
+        headers=headers,
+        stat_result=stat_result,
+    )
+
+
+def not_found() -> HTTPException:
+    return HTTPException(
+        status_code=404,
+        detail="Image not found",
+        headers={"Cache-Control": "public, max-age=300"},
+    )
+
+
+def unavailable(e: ImageUnavailable) -> HTTPException:
+    if e.status == 404:
+        return not_found()
+    return HTTPException(status_code=502, detail="Image origin unavailable")
+
+
+@imageRouter.get("/avatar/{username}")
+async def avatar(
+    request: Request,
+    username: str = Path(pattern=USERNAME_PATTERN),
+    size: int = Query(default=80, ge=1, le=460),
+):
+    ttl = int(Settings.app.IMAGE_AVATAR_TTL)
+    try:
+        return await image_response(
+            request,
+            lambda: image_proxy.avatar(username, avatar_size(size)),
+            f"public, max-age={ttl}, stale-while-revalidate={ttl * 7}",
+        )
+    except ImageUnavailable as e:
+        raise unavailable(e)
+
+
+async def open_graph_versions(username: str, repository_name: str) -> list[str]:
+    """Card versions of a trending repository, the most recently updated first."""
+    repos = [
+        repo
+        for since in AllowedDateRanges
+        for repo in (await read_model.get(since)).repositories
+        if repo.username == username and repo.repository_name == repository_name
+    ]
+    repos.sort(key=lambda repo: repo.updated_at, reverse=True)
+    return [open_graph_version(repo) for repo in repos]
+
+
+@imageRouter.get("/og/{username}/{repository_name}")
+async def open_graph(
+    request: Request,
+    username: str = Path(pattern=USERNAME_PATTERN),
+    repository_name: str = Path(pattern=REPOSITORY_PATTERN),
+    v: str = Query(pattern=VERSION_PATTERN),
+):
+    # 只转发本站生成的版本号，任意 v 不能在源站和缓存里制造新条目
+    versions = await open_graph_versions(username, repository_name)
+    if not versions:
+        raise not_found()
+    if v not in versions:
+        return RedirectResponse(
+            request.url.include_query_params(v=versions[0]),
+            headers={"Cache-Control": "public, max-age=300"},
+        )
+    try:
+        return await image_response(
+            request,
+            lambda: image_proxy.open_graph(v, username, repository_name),
+            IMMUTABLE,
+        )
+    except ImageUnavailable as e:
+        raise unavailable(e)
@@ -1,43 +1,156 @@
-from typing import List
+import asyncio
+from dataclasses import asdict
+from typing import Any, Callable, List
 
-from fastapi import APIRouter, Response
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 
 from app.config import Settings
 from app.database import get_session
 from app.enums import AllowedDateRanges
-from app.models import Repository
-from app.services.github_trending import get_trending_repos
+from app.services.cache import feed_cache
+from app.services.events import broadcaster, format_event
+from app.services.metrics import RENDER_SECONDS
+from app.services.read_model import read_model
 from app.services.rss import RSSService
+from app.services.search import SearchResult, search_repositories
+from app.services.tags import TagCount
 
 apiRouter = APIRouter()
 rss_service = RSSService(Settings.app.BASE_URL)
 
 
+def summary_language(lang: str | None = None) -> str:
+    """Resolve the ``lang`` query parameter to a configured summary language."""
+    if lang is None:
+        return Settings.ai.SUMMARY_LANGUAGE
+    if lang not in Settings.ai.SUMMARY_LANGUAGES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported lang, expected one of {Settings.ai.SUMMARY_LANGUAGES}",
+        )
+    return lang
+
+
+def timed_render(kind: str, render: Callable[..., str], *args: Any) -> str:
+    with RENDER_SECONDS.time(kind):
+        return render(*args)
+
+
 @apiRouter.get("/trending/repositories/{since}")
 async def get_trending_repositories(
     since: AllowedDateRanges = AllowedDateRanges.daily,
+    tag: str | None = None,
+    lang: str = Depends(summary_language),
 ):
+    snapshot = await read_model.get(since)
+    rss_content = await feed_cache.get_or_create(
+        ("repositories", since, tag, lang, snapshot.version),
+        lambda: asyncio.to_thread(
+            timed_render,
+            "repositories_rss",
+            rss_service.generate_repository_feed,
+            snapshot.repositories_for(tag),
+            since,
+            snapshot.translations_for(lang),
+            snapshot.published_at,
+        ),
+        # 只缓存存在的标签，避免任意 tag 参数撑大缓存
+        cacheable=not tag or tag in snapshot.by_tag,
+    )
+    return Response(content=rss_content, media_type="application/xml")
+
+
+@apiRouter.get("/repositories/{since}")
+async def get_trending_repositories_json(
+    since: AllowedDateRanges = AllowedDateRanges.daily,
+    tag: str | None = None,
+    lang: str = Depends(summary_language),
+) -> List[dict]:
+    snapshot = await read_model.get(since)
+    translations = snapshot.translations_for(lang)
+    return [
+        {
+            **asdict(repo),
+            "ai_summary": translations.get(repo.ai_summary or "", repo.ai_summary),
+            "summary_language": lang,
+            "related": [asdict(item) for item in snapshot.related_to(repo.id)],
+        }
+        for repo in snapshot.repositories_for(tag)
+    ]
+
+
+@apiRouter.get("/search")
+async def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    since: AllowedDateRanges | None = None,
+    limit: int = Query(20, ge=1, le=100),
+) -> List[SearchResult]:
     async with get_session() as session:
-        repositories: List[Repository] = await get_trending_repos(
-            since=since,
-            session=session,
-        )
-        rss_content = rss_service.generate_repository_feed(repositories, since)
-        return Response(content=rss_content, media_type="application/xml")
+        return await search_repositories(session, q, since=since, limit=limit)
+
 
+@apiRouter.get("/tags")
+async def get_tags(
+    since: AllowedDateRanges = AllowedDateRanges.daily,
+    limit: int = Query(50, ge=1, le=500),
+) -> List[TagCount]:
+    snapshot = await read_model.get(since)
+    return list(snapshot.tags[:limit])
 
-# @router.get("/trending/developers/{since}")
-# async def get_trending_developers(
-#     since: AllowedDateRanges = AllowedDateRanges.daily,
-#     session: Session = Depends(get_session),
-# ):
-#     # 从数据库中获取最新的开发者数据
-#     query = select(Developer)
-#     developers: List[Developer] = list(session.exec(query).all())
 
-#     # 按排名排序
-#     developers.sort(key=lambda x: x.rank)
+@apiRouter.get("/trending/developers/{since}")
+async def get_trending_developers(
+    since: AllowedDateRanges = AllowedDateRanges.daily,
+    lang: str = Depends(summary_language),
+):
+    snapshot = await read_model.get(since)
+    rss_content = await feed_cache.get_or_create(
+        ("developers", since, lang, snapshot.version),
+        lambda: asyncio.to_thread(
+            timed_render,
+            "developers_rss",
+            rss_service.generate_developer_feed,
+            snapshot.developers,
+            since.value,
+            snapshot.translations_for(lang),
+            snapshot.published_at,
+        ),
+    )
+    return Response(content=rss_content, media_type="application/xml")
+
+
+@apiRouter.get("/stream")
+async def stream(
+    since: List[AllowedDateRanges] = Query(default=list(AllowedDateRanges)),
+    last_event_id: str | None = Header(default=None),
+):
+    """Server-Sent Events: one ``publish`` event per republished range."""
+    # 先加载快照，之后本进程才能感知到这些时间范围的发布
+    for item in since:
+        await read_model.get(item)
+    resume_id = int(last_event_id) if (last_event_id or "").isdigit() else None
+
+    async def events():
+        yield "retry: 10000\n\n"
+        start_id = resume_id
+        if start_id is None or not broadcaster.can_resume(start_id):
+            # 错过的事件无法补发时，发送当前版本让客户端重新同步
+            start_id = broadcaster.last_id
+            yield format_event(
+                start_id,
+                "snapshot",
+                {item.value: (await read_model.get(item)).version for item in since},
+            )
+        async for message in broadcaster.stream(
+            {item.value for item in since},
+            last_event_id=start_id,
+            heartbeat=Settings.app.STREAM_HEARTBEAT_INTERVAL,
+        ):
+            yield message
 
-#     # 生成 RSS feed
-#     rss_content = rss_service.generate_developer_feed(developers, since.value)
-#     return Response(content=rss_content, media_type="application/xml")
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
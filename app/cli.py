@@ -0,0 +1,415 @@
+"""
+Command line.
+
+Run ``python -m app.cli crawl`` to refresh the trending data once, without
+the web server, e.g. from cron or a batch job::
+
+    python -m app.cli crawl --since daily,weekly --concurrency 8
+
+It prints a JSON summary (timings, GitHub requests, LLM calls, summary
+cache hits and failed slices) and exits with status 1 if any slice
+failed. ``--dry-run`` only fetches and parses the trending pages, without
+touching the database or calling the LLM.
+
+Run ``python -m app.cli replay`` to feed the pages archived in
+``ARCHIVE_DIR`` through the current parser and the database pipeline
+without the network, e.g. to backfill after a parser fix::
+
+    python -m app.cli replay --since daily --start 2025-01-01
+
+``--dry-run`` only parses them, which doubles as a parser benchmark.
+
+Run ``python -m app.cli compact`` to apply the retention policies once and
+print the deleted rows, row counts and database size. ``--vacuum`` then
+rebuilds an SQLite file once, which also switches databases created
+before incremental auto-vacuum to it. This blocks other connections while
+it runs.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+from datetime import UTC, datetime
+from typing import Any, Dict, List, Optional
+
+from app.config import Settings
+from app.database import create_db_and_tables, engine
+from app.enums import AllowedDateRanges, AllowedTrendingKinds
+from app.languages import AllowedProgrammingLanguages
+from app.services import parsing
+from app.services.archive import (
+    ArchivedPage,
+    OfflineAIService,
+    ReplayGitHubService,
+    archive,
+)
+from app.services.metrics import (
+    CACHE_REQUESTS,
+    DB_FREE_BYTES,
+    DB_SIZE_BYTES,
+    HTTP_FAILURES,
+    HTTP_REQUEST_SECONDS,
+    HTTP_RESPONSE_BYTES,
+    HTTP_RETRIES,
+    LLM_ERRORS,
+    LLM_REQUEST_SECONDS,
+    LLM_TOKENS,
+    REFRESH_SECONDS,
+)
+from app.services.retention import (
+    full_vacuum,
+    record_database_size,
+    retention,
+)
+from app.services.scheduler import RefreshSlice, scheduler
+from app.services.transport import TransportError
+
+
+def comma_separated(enum):
+    def parse(value: str) -> list:
+        try:
+            return [enum(item.strip()) for item in value.split(",") if item.strip()]
+        except ValueError:
+            choices = ", ".join(member.value for member in enum)
+            raise argparse.ArgumentTypeError(f"choose from {choices}")
+
+    return parse
+
+
+def metric_values(metric) -> Dict[tuple, Any]:
+    return {tuple(json.loads(key)): value for key, value in metric.dump().items()}
+
+
+def summarize(
+    slices: List[Dict[str, Any]], seconds: float, dry_run: bool
+) -> Dict[str, Any]:
+    requests = metric_values(HTTP_REQUEST_SECONDS)
+    llm: Dict[str, Dict[str, float]] = {}
+    for (call,), state in metric_values(LLM_REQUEST_SECONDS).items():
+        llm.setdefault(call, {})
+        llm[call]["calls"] = state[-1]
+        llm[call]["seconds"] = round(state[-2], 3)
+    for (call, kind), value in metric_values(LLM_TOKENS).items():
+        llm.setdefault(call, {})[f"{kind}_tokens"] = value
+    for (call,), value in metric_values(LLM_ERRORS).items():
+        llm.setdefault(call, {})["errors"] = value
+    cache: Dict[str, Dict[str, float]] = {}
+    for (name, result), value in metric_values(CACHE_REQUESTS).items():
+        cache.setdefault(name, {})[result] = value
+    return {
+        "dry_run": dry_run,
+        "seconds": round(seconds, 3),
+        "slices": slices,
+        "failures": [item["key"] for item in slices if not item["ok"]],
+        "http": {
+            "requests": sum(state[-1] for state in requests.values()),
+            "errors": requests.get(("error",), [0])[-1],
+            "bytes": sum(metric_values(HTTP_RESPONSE_BYTES).values()),
+            "failures": {
+                reason: value
+                for (reason,), value in metric_values(HTTP_FAILURES).items()
+            },
+            "retries": sum(metric_values(HTTP_RETRIES).values()),
+        },
+        "llm": llm,
+        "cache": cache,
+    }
+
+
+async def crawl_slice(
+    refresh_slice: RefreshSlice, language: Optional[AllowedProgrammingLanguages]
+) -> Dict[str, Any]:
+    """Fetch and parse one slice without storing anything."""
+    started = time.perf_counter()
+    error = None
+    try:
+        if refresh_slice.kind == AllowedTrendingKinds.repositories:
+            items = await scheduler.github_service.get_trending_repositories(
+                since=refresh_slice.since, language=language
+            )
+        else:
+            items = await scheduler.github_service.get_trending_developers(
+                since=refresh_slice.since, language=language
+            )
+    except TransportError as e:
+        items, error = [], str(e)
+    return {
+        "key": refresh_slice.key,
+        "ok": bool(items),
+        "seconds": round(time.perf_counter() - started, 3),
+        "items": len(items),
+        "error": error,
+    }
+
+
+def stored_slice(refresh_slice: RefreshSlice) -> Dict[str, Any]:
+    labels = (refresh_slice.kind.value, refresh_slice.since.value)
+    seconds = sum(
+        state[-2]
+        for key, state in metric_values(REFRESH_SECONDS).items()
+        if key[:2] == labels
+    )
+    return {
+        "key": refresh_slice.key,
+        "ok": refresh_slice.failures == 0,
+        "seconds": round(seconds, 3),
+    }
+
+
+async def crawl(
+    kinds: List[AllowedTrendingKinds],
+    sinces: List[AllowedDateRanges],
+    language: Optional[AllowedProgrammingLanguages],
+    concurrency: int,
+    dry_run: bool,
+) -> Dict[str, Any]:
+    slices = [scheduler.slices[(kind, since)] for kind in kinds for since in sinces]
+    started = time.perf_counter()
+    try:
+        if dry_run:
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def limited(refresh_slice: RefreshSlice):
+                async with semaphore:
+                    return await crawl_slice(refresh_slice, language)
+
+            results = await asyncio.gather(*(limited(s) for s in slices))
+        else:
+            await create_db_and_tables()
+            scheduler.worker.concurrency = concurrency
+            await scheduler.run_slices(slices)
+            await engine.dispose()
+            results = [stored_slice(refresh_slice) for refresh_slice in slices]
+    finally:
+        await scheduler.github_service.close()
+        parsing.shutdown()
+    return summarize(list(results), time.perf_counter() - started, dry_run)
+
+
+def slice_page_rounds(pages: List[ArchivedPage]) -> List[List[ArchivedPage]]:
+    """The i-th archived page of every slice goes into round i."""
+    by_slice: Dict[tuple, List[ArchivedPage]] = {}
+    for page in pages:
+        by_slice.setdefault((page.kind, page.since), []).append(page)
+    return [
+        [queue[i] for queue in by_slice.values() if i < len(queue)]
+        for i in range(max(map(len, by_slice.values()), default=0))
+    ]
+
+
+async def replay(
+    kinds: List[AllowedTrendingKinds],
+    sinces: List[AllowedDateRanges],
+    start: Optional[datetime],
+    end: Optional[datetime],
+    dry_run: bool,
+) -> Dict[str, Any]:
+    pages = list(archive.pages(kinds, sinces, start, end))
+    results: List[Dict[str, Any]] = []
+    started = time.perf_counter()
+    try:
+        if dry_run:
+            semaphore = asyncio.Semaphore(max(Settings.app.PARSE_WORKERS, 1) * 2)
+
+            async def parse(page: ArchivedPage) -> Dict[str, Any]:
+                async with semaphore:
+                    page_started = time.perf_counter()
+                    items = await archive.parse(page)
+                return {
+                    "key": f"{page.kind}/{page.since}",
+                    "fetched_at": page.fetched_at,
+                    "language": page.language,
+                    "ok": bool(items),
+                    "seconds": round(time.perf_counter() - page_started, 3),
+                    "items": len(items),
+                }
+
+            results = list(await asyncio.gather(*(parse(page) for page in pages)))
+        else:
+            # 数据库只保存不分语言的榜单
+            pages = [page for page in pages if page.language is None]
+            await create_db_and_tables()
+            service = ReplayGitHubService(archive)
+            scheduler.github_service = service  # type: ignore
+            scheduler.ai_service = OfflineAIService()  # type: ignore
+            scheduler.is_offline = True
+            # 回放不调用模型，任务很快完成，缩短发布任务等待输入的间隔
+            scheduler.worker.poll_interval = 0.05
+            # 同一分片的页面按抓取顺序依次写入，不同分片并发
+            for round_pages in slice_page_rounds(pages):
+                round_started = time.perf_counter()
+                slices = []
+                for page in round_pages:
+                    service.pages[(page.kind, page.since)] = page
+                    slices.append(
+                        scheduler.slices[
+                            (
+                                AllowedTrendingKinds(page.kind),
+                                AllowedDateRanges(page.since),
+                            )
+                        ]
+                    )
+                await scheduler.run_slices(slices)
+                seconds = round(time.perf_counter() - round_started, 3)
+                results.extend(
+                    {
+                        "key": refresh_slice.key,
+                        "fetched_at": page.fetched_at,
+                        "ok": refresh_slice.failures == 0,
+                        "seconds": seconds,
+                    }
+                    for page, refresh_slice in zip(round_pages, slices)
+                )
+            await engine.dispose()
+    finally:
+        scheduler.worker.poll_interval = Settings.app.JOB_POLL_INTERVAL
+        parsing.shutdown()
+    seconds = time.perf_counter() - started
+    return {
+        "dry_run": dry_run,
+        "seconds": round(seconds, 3),
+        "pages_per_second": round(len(results) / seconds, 1) if seconds else None,
+        "pages": results,
+        "failures": [
+            f"{item['key']}@{item['fetched_at']}" for item in results if not item["ok"]
+        ],
+    }
+
+
+def database_size() -> Dict[str, Any]:
+    return {
+        "bytes": sum(state[0] for state in metric_values(DB_SIZE_BYTES).values()),
+        "free_bytes": sum(state[0] for state in metric_values(DB_FREE_BYTES).values()),
+    }
+
+
+async def compact(vacuum: bool) -> Dict[str, Any]:
+    started = time.perf_counter()
+    await create_db_and_tables()
+    try:
+        await record_database_size()
+        before = database_size()
+        deleted = await retention.run_once()
+        if vacuum:
+            await full_vacuum()
+        rows = await record_database_size()
+    finally:
+        await engine.dispose()
+    return {
+        "seconds": round(time.perf_counter() - started, 3),
+        "deleted": deleted,
+        "rows": rows,
+        "before": before,
+        "after": database_size(),
+    }
+
+
+def utc_datetime(value: str) -> datetime:
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected an ISO date or datetime")
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=UTC)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    crawl_parser = commands.add_parser("crawl", help="run one refresh cycle")
+    crawl_parser.add_argument(
+        "--since",
+        type=comma_separated(AllowedDateRanges),
+        default=list(AllowedDateRanges),
+        help="comma separated date ranges (default: all)",
+    )
+    crawl_parser.add_argument(
+        "--kind",
+        type=comma_separated(AllowedTrendingKinds),
+        default=list(AllowedTrendingKinds),
+        help="comma separated trending kinds (default: all)",
+    )
+    crawl_parser.add_argument(
+        "--language",
+        type=AllowedProgrammingLanguages,
+        help="programming language, only with --dry-run",
+    )
+    crawl_parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=Settings.app.JOB_CONCURRENCY,
+        help="concurrent requests or refresh jobs",
+    )
+    crawl_parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="only fetch and parse, without the database and the LLM",
+    )
+    replay_parser = commands.add_parser(
+        "replay", help="re-run archived pages through the parser and the database"
+    )
+    replay_parser.add_argument(
+        "--since",
+        type=comma_separated(AllowedDateRanges),
+        default=list(AllowedDateRanges),
+        help="comma separated date ranges (default: all)",
+    )
+    replay_parser.add_argument(
+        "--kind",
+        type=comma_separated(AllowedTrendingKinds),
+        default=list(AllowedTrendingKinds),
+        help="comma separated trending kinds (default: all)",
+    )
+    replay_parser.add_argument(
+        "--start", type=utc_datetime, help="only pages fetched at or after this time"
+    )
+    replay_parser.add_argument(
+        "--end", type=utc_datetime, help="only pages fetched before this time"
+    )
+    replay_parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="only parse the archived pages, without the database",
+    )
+    compact_parser = commands.add_parser(
+        "compact", help="apply the retention policies once"
+    )
+    compact_parser.add_argument(
+        "--vacuum",
+        action="store_true",
+        help="rebuild the SQLite file afterwards (blocks other connections)",
+    )
+    args = parser.parse_args(argv)
+    # 标准输出只留给 JSON 摘要
+    engine.echo = False
+    if args.command == "compact":
+        summary = asyncio.run(compact(args.vacuum))
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+        return 0
+    if args.command == "replay":
+        if not archive.is_enabled:
+            parser.error("replay requires ARCHIVE_DIR")
+        summary = asyncio.run(
+            replay(args.kind, args.since, args.start, args.end, args.dry_run)
+        )
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+        return 1 if summary["failures"] else 0
+
+    if args.language and not args.dry_run:
+        # 数据库只保存不分语言的榜单，按语言抓取的结果不能写入
+        parser.error("--language requires --dry-run")
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+
+    summary = asyncio.run(
+        crawl(args.kind, args.since, args.language, args.concurrency, args.dry_run)
+    )
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    return 1 if summary["failures"] else 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=Settings.app.LOG_LEVEL.upper(), stream=sys.stderr)
+    sys.exit(main())
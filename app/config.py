@@ -1,5 +1,5 @@
 import os
-from typing import Optional
+from typing import Literal, Optional
 
 from dotenv import load_dotenv
 from pydantic_settings import BaseSettings
@@ -14,11 +14,26 @@ class AISettings:
     OPENAI_API_KEY: str | None = os.getenv("OPENAI_API_KEY")
     OPENAI_API_BASE: str | None = os.getenv("OPENAI_API_BASE")
     OPENAI_MODEL: str = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
-    SUMMARY_LANGUAGE: str = os.getenv("SUMMARY_LANGUAGE", "简体中文")
+    # 第一个语言为主语言，其余语言由主语言总结翻译得到
+    SUMMARY_LANGUAGES: list[str] = [
+        language.strip()
+        for language in os.getenv(
+            "SUMMARY_LANGUAGES", os.getenv("SUMMARY_LANGUAGE", "简体中文")
+        ).split(",")
+        if language.strip()
+    ]
+    SUMMARY_LANGUAGE: str = SUMMARY_LANGUAGES[0]
 
 
 class DatabaseSettings(BaseSettings):
     DATABASE_URL: str = "sqlite+aiosqlite:///github_trending.db"
+    # 以下只用于 PostgreSQL（postgresql+asyncpg://），每个进程一个连接池
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = 1800
+    # asyncpg 每个连接缓存的预编译语句数，经 pgbouncer 事务模式连接时设为 0
+    DB_STATEMENT_CACHE_SIZE: int = 500
 
 
 class AppSettings(BaseSettings):
@@ -33,6 +48,89 @@ class AppSettings(BaseSettings):
     LOG_LEVEL: str = "info"
     UPDATE_INTERVAL: int = 6
     OPENAI_API_KEY: Optional[str] = None
+    # 各时间范围的基础刷新间隔（小时），内容未变化时逐步放宽
+    DAILY_REFRESH_INTERVAL: float = 1
+    WEEKLY_REFRESH_INTERVAL: float = 6
+    MONTHLY_REFRESH_INTERVAL: float = 24
+    MAX_REFRESH_INTERVAL_FACTOR: float = 4
+    # 失败分片的重试退避（秒）
+    RETRY_DELAY: int = 60
+    MAX_RETRY_DELAY: int = 3600
+    # 是否在本进程参与调度器选主，独立运行 app.worker 时可在 Web 进程关闭
+    SCHEDULER_ENABLED: bool = True
+    LEADER_LEASE_TTL: int = 60
+    # 刷新任务队列：每个进程的并发数、租约时长与空闲轮询间隔（秒）
+    JOB_CONCURRENCY: int = 4
+    JOB_LEASE_TTL: int = 300
+    JOB_POLL_INTERVAL: float = 2
+    # 检查其他进程是否发布了新快照的间隔（秒）
+    READ_MODEL_POLL_INTERVAL: float = 5
+    # 并发的缓存未命中合并为一次计算，等待者最多等待的时间（秒）
+    SINGLE_FLIGHT_TIMEOUT: float = 30
+    # 设置后每次发布都把页面和 feed 静态导出到该目录
+    EXPORT_DIR: Optional[str] = None
+    # 多进程部署时共享的指标目录，各进程每隔 METRICS_FLUSH_INTERVAL 秒写入一次
+    METRICS_DIR: Optional[str] = None
+    METRICS_FLUSH_INTERVAL: float = 10
+    # 每轮调度写出一份 Chrome trace 文件，只保留最近 TRACE_KEEP 份，可通过管理接口随时开关
+    TRACE_ENABLED: bool = False
+    TRACE_DIR: str = "traces"
+    TRACE_KEEP: int = 20
+    # 按需性能分析：结果目录与保留份数、采样间隔、单次最长时长与预约的有效期（秒）
+    PROFILE_DIR: str = "profiles"
+    PROFILE_KEEP: int = 20
+    PROFILE_SAMPLE_INTERVAL: float = 0.005
+    PROFILE_MAX_SECONDS: float = 120
+    PROFILE_ARM_TTL: float = 600
+    PROFILE_TOP: int = 30
+    # 抓取 GitHub 的总超时、连接超时与读取超时（秒）
+    HTTP_TIMEOUT: float = 30
+    HTTP_CONNECT_TIMEOUT: float = 10
+    HTTP_READ_TIMEOUT: float = 15
+    # 失败请求的重试次数与带抖动的指数退避（秒），Retry-After 超过上限时交给任务队列重试
+    HTTP_RETRIES: int = 3
+    HTTP_BACKOFF: float = 1
+    HTTP_MAX_BACKOFF: float = 30
+    # 连续失败多少次后熔断，以及熔断的冷却时间（秒）
+    BREAKER_THRESHOLD: int = 5
+    BREAKER_COOLDOWN: float = 60
+    # 设置后把抓取到的页面压缩去重后归档到该目录，可用 app.cli replay 回放
+    ARCHIVE_DIR: Optional[str] = None
+    # 解析抓取页面的位置：inline（事件循环内）、thread 或 process 池，以及池大小
+    PARSE_EXECUTOR: Literal["inline", "thread", "process"] = "thread"
+    PARSE_WORKERS: int = 2
+    # 数据保留：清理间隔（秒，0 关闭）；不在榜单上的仓库、开发者和已结束任务的保留天数（0 永久保留）
+    RETENTION_INTERVAL: float = 3600
+    RETENTION_REPOSITORY_DAYS: float = 30
+    RETENTION_DEVELOPER_DAYS: float = 30
+    RETENTION_JOB_DAYS: float = 7
+    # 每个事务删除的行数、批次之间的停顿（秒）以及每批后归还给文件系统的 SQLite 页数
+    RETENTION_BATCH_SIZE: int = 500
+    RETENTION_BATCH_PAUSE: float = 0.05
+    RETENTION_VACUUM_PAGES: int = 1000
+    # /img/ 图片代理：缓存目录与容量上限（字节）、头像缓存时长（秒）、Open Graph 图片缩放宽度
+    IMAGE_CACHE_DIR: str = "image_cache"
+    IMAGE_CACHE_MAX_BYTES: int = 256 * 1024 * 1024
+    IMAGE_AVATAR_TTL: float = 86400
+    IMAGE_OG_WIDTH: int = 800
+    # 图片源站、请求超时（秒）与单张图片的大小上限（字节）
+    IMAGE_AVATAR_ORIGIN: str = "https://github.com"
+    IMAGE_OG_ORIGIN: str = "https://opengraph.githubassets.com"
+    IMAGE_TIMEOUT: float = 10
+    IMAGE_MAX_BYTES: int = 5 * 1024 * 1024
+    # 相似仓库：每个仓库列出的数量（0 关闭）、最低余弦相似度与哈希特征维数
+    SIMILAR_REPOSITORIES: int = 5
+    SIMILARITY_MIN_SCORE: float = 0.1
+    SIMILARITY_FEATURES: int = 2**20
+    # 文档数变化超过该比例时重新计算全部 IDF 权重；召回候选时每个仓库使用的特征数
+    SIMILARITY_REWEIGHT_RATIO: float = 0.1
+    SIMILARITY_QUERY_FEATURES: int = 32
+    # 事件循环延迟的采样间隔（秒）
+    LOOP_LAG_INTERVAL: float = 0.5
+    # /api/stream 的心跳间隔（秒）
+    STREAM_HEARTBEAT_INTERVAL: float = 15
+    # 管理接口令牌，未设置时管理接口不可用
+    ADMIN_TOKEN: Optional[str] = None
 
 
 class Settings:
@@ -1,15 +1,71 @@
+import time
 from contextlib import asynccontextmanager
-from typing import AsyncGenerator
+from typing import Any, AsyncGenerator, Dict
 
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import event, make_url, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
 from sqlmodel import SQLModel
 
 from app.config import Settings
-from app.models import Developer, Repository  # noqa: F401
+from app.models import Developer, Repository, TrendingDeveloper  # noqa: F401
+from app.services.metrics import DB_COMMIT_SECONDS, DB_STATEMENTS
+from app.services.search import create_search_index
+from app.services.tracing import tracer
+from app.services.tags import migrate_legacy_keywords
+
+
+def engine_options(database_url: str) -> Dict[str, Any]:
+    url = make_url(database_url)
+    if url.get_backend_name() != "postgresql":
+        return {"url": url}
+    # asyncpg 在服务端预编译语句，并按连接缓存
+    url = url.update_query_dict(
+        {"prepared_statement_cache_size": str(Settings.db.DB_STATEMENT_CACHE_SIZE)}
+    )
+    return {
+        "url": url,
+        "pool_size": Settings.db.DB_POOL_SIZE,
+        "max_overflow": Settings.db.DB_MAX_OVERFLOW,
+        "pool_timeout": Settings.db.DB_POOL_TIMEOUT,
+        "pool_recycle": Settings.db.DB_POOL_RECYCLE,
+        "pool_pre_ping": True,
+    }
+
 
 # 创建异步引擎
-engine = create_async_engine(Settings.db.DATABASE_URL, echo=True)
+engine = create_async_engine(**engine_options(Settings.db.DATABASE_URL), echo=True)
+
+if engine.dialect.name == "sqlite":
+    # WAL 模式下读者不会被调度器的写入阻塞
+    @event.listens_for(engine.sync_engine, "connect")
+    def _set_sqlite_pragma(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        # 只对新建的数据库立即生效，已有数据库需要执行一次 VACUUM
+        cursor.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA busy_timeout=5000")
+        cursor.close()
+
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    DB_STATEMENTS.inc()
+
+
+@event.listens_for(Session, "before_commit")
+def _start_commit_timer(session):
+    session.info["commit_started"] = time.perf_counter()
+
+
+@event.listens_for(Session, "after_commit")
+def _observe_commit(session):
+    started = session.info.pop("commit_started", None)
+    if started is not None:
+        ended = time.perf_counter()
+        DB_COMMIT_SECONDS.observe(ended - started)
+        tracer.add("commit", "db", started, ended)
+
 
 # 创建异步会话工厂
 async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
@@ -21,6 +77,32 @@ async def get_session() -> AsyncGenerator[AsyncSession, None]:
         yield session
 
 
+async def migrate_duplicate_developers(conn: AsyncConnection):
+    """Merge developers stored more than once per summary language, then
+    add the unique index that ``create_all`` skips on existing tables.
+    """
+    duplicate = """EXISTS (SELECT 1 FROM developer AS kept
+        WHERE kept.username = developer.username
+            AND kept.summary_language = developer.summary_language
+            AND kept.id < developer.id)"""
+    # 排名快照改指向保留的最早一行
+    await conn.execute(text(f"""UPDATE trendingdeveloper SET developer_id = (
+            SELECT min(kept.id) FROM developer
+            JOIN developer AS kept
+                ON kept.username = developer.username
+                AND kept.summary_language = developer.summary_language
+            WHERE developer.id = trendingdeveloper.developer_id
+        )
+        WHERE developer_id IN (SELECT id FROM developer WHERE {duplicate})"""))
+    await conn.execute(text(f"DELETE FROM developer WHERE {duplicate}"))
+    await conn.execute(text("""CREATE UNIQUE INDEX IF NOT EXISTS
+            uq_developer_username_language
+            ON developer (username, summary_language)"""))
+
+
 async def create_db_and_tables():
     async with engine.begin() as conn:
         await conn.run_sync(SQLModel.metadata.create_all)
+        await migrate_duplicate_developers(conn)
+        await migrate_legacy_keywords(conn)
+        await create_search_index(conn)
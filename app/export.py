@@ -0,0 +1,43 @@
+"""
+Static export.
+
+Run ``python -m app.export --output dist`` to write the index pages and the
+RSS, Atom and JSON feeds of every date range and language, with
+precompressed siblings, into ``dist``. Run it again to update only the
+files that changed. Set ``EXPORT_DIR`` to export automatically after each
+scheduler publish.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+from pathlib import Path
+
+from app.config import Settings
+from app.database import create_db_and_tables
+from app.enums import AllowedDateRanges
+from app.services.export import export_site
+
+
+async def main(output: Path, sinces: list[AllowedDateRanges]):
+    await create_db_and_tables()
+    stats = await export_site(output, sinces)
+    print(json.dumps(stats.summary()))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=Settings.app.LOG_LEVEL.upper())
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--output", type=Path, default=Path(Settings.app.EXPORT_DIR or "dist")
+    )
+    parser.add_argument(
+        "--since",
+        type=AllowedDateRanges,
+        action="append",
+        choices=list(AllowedDateRanges),
+        help="date range to export, repeatable (default: all)",
+    )
+    args = parser.parse_args()
+    asyncio.run(main(args.output, args.since or list(AllowedDateRanges)))
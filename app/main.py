@@ -1,17 +1,27 @@
 import asyncio
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, Request
+from fastapi import Depends, FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
 
-from app.api import routes
+from app.api import admin, images, routes
+from app.api.routes import summary_language
 from app.config import Settings
-from app.database import create_db_and_tables, get_session
+from app.database import create_db_and_tables
 from app.enums import AllowedDateRanges
-from app.services.github_trending import get_trending_repos
+from app.services import parsing
+from app.services.cache import RenderedPage, feed_cache
+from app.services.images import image_proxy
+from app.services.leader import leader
+from app.services.metrics import RENDER_SECONDS, loop_lag, metrics
+from app.services.pages import render_index
+from app.services.profiling import ProfilingMiddleware
+from app.services.read_model import TrendingSnapshot, read_model
+from app.services.retention import retention
 from app.services.scheduler import scheduler
+from app.services.singleflight import SingleFlightTimeout
 
 
 @asynccontextmanager
@@ -19,13 +29,44 @@ async def lifespan(app: FastAPI):
     # 创建数据库表
     await create_db_and_tables()
 
-    # 启动调度器
-    asyncio.create_task(scheduler.start())
+    # 定期写出本进程的指标，供 /metrics 汇总
+    metrics_task = asyncio.create_task(metrics.run())
+    loop_lag_task = asyncio.create_task(loop_lag.run())
+
+    # 轮询其他进程发布的新快照
+    read_model_task = asyncio.create_task(read_model.watch())
+
+    # 参与选主，只有持有租约的进程运行调度器
+    # 同时运行任务 worker，领取任意进程提交的刷新任务
+    # 持有租约的进程同时负责清理过期数据
+    leader_task = worker_task = retention_task = None
+    if Settings.app.SCHEDULER_ENABLED:
+        leader_task = asyncio.create_task(leader.run(scheduler))
+        worker_task = asyncio.create_task(scheduler.worker.run())
+        retention_task = asyncio.create_task(retention.run(lambda: leader.is_leader))
 
     yield
 
-    # 停止调度器
-    scheduler.stop()
+    # 停止调度器并释放租约，进行中的任务租约过期后由其他 worker 接手
+    if leader_task is not None:
+        leader.stop()
+        await leader_task
+    if worker_task is not None:
+        scheduler.worker.stop()
+        worker_task.cancel()
+        # 等取消真正完成，再关闭它用到的连接
+        await asyncio.gather(worker_task, return_exceptions=True)
+    if retention_task is not None:
+        retention.stop()
+        await retention_task
+    read_model.stop()
+    await read_model_task
+    metrics.stop()
+    loop_lag.stop()
+    await asyncio.gather(metrics_task, loop_lag_task)
+    await scheduler.github_service.close()
+    await image_proxy.close()
+    parsing.shutdown()
 
 
 app = FastAPI(
@@ -43,33 +84,56 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(ProfilingMiddleware)
 
 # 挂载静态文件目录
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
 
-# 配置模板
-templates = Jinja2Templates(directory="app/templates")
-
 # Register routes
 app.include_router(routes.apiRouter, prefix="/api")
+app.include_router(admin.adminRouter, prefix="/api/admin")
+app.include_router(images.imageRouter, prefix="/img")
+
+
+def render_index_page(
+    snapshot: TrendingSnapshot, tag: str | None, lang: str
+) -> RenderedPage:
+    with RENDER_SECONDS.time("index"):
+        html = render_index(snapshot, tag, lang)
+        return RenderedPage.build(html.encode("utf-8"), snapshot.published_at)
+
+
+@app.exception_handler(SingleFlightTimeout)
+async def single_flight_timeout_handler(request: Request, exc: SingleFlightTimeout):
+    return JSONResponse(status_code=503, content={"detail": "Service busy"})
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus text exposition of all processes' metrics."""
+    return PlainTextResponse(
+        metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
 
 
 @app.get("/")
 async def root(
     request: Request,
     since: AllowedDateRanges = AllowedDateRanges.daily,
+    tag: str | None = None,
+    lang: str = Depends(summary_language),
 ):
     """
     Root endpoint to fetch trending repositories.
     """
-    async with get_session() as session:
-        # Fetch trending repositories from the database
-        repositories = await get_trending_repos(since=since, session=session)
-
-        return templates.TemplateResponse(
-            "index.html",
-            {"request": request, "repositories": repositories, "since": since},
-        )
+    snapshot = await read_model.get(since)
+    page = await feed_cache.get_or_create(
+        ("index", since, tag, lang, snapshot.version),
+        lambda: asyncio.to_thread(render_index_page, snapshot, tag, lang),
+        # 只缓存存在的标签，避免任意 tag 参数撑大缓存
+        cacheable=not tag or tag in snapshot.by_tag,
+    )
+    return page.response(request, media_type="text/html; charset=utf-8")
 
 
 if __name__ == "__main__":
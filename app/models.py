@@ -1,9 +1,22 @@
 from datetime import UTC, datetime
 from typing import Optional
 
+from sqlalchemy import JSON, DateTime, Index, UniqueConstraint
 from sqlmodel import Field, Relationship, SQLModel
 
-from app.enums import AllowedDateRanges
+from app.enums import AllowedDateRanges, AllowedTrendingKinds, JobKind, JobStatus
+
+# PostgreSQL 上保存为 timestamptz；SQLite 按原样保存 UTC 时间
+UTCDateTime = DateTime(timezone=True)
+
+
+class RepositoryKeywordLink(SQLModel, table=True):
+    repository_id: int | None = Field(
+        default=None, foreign_key="repository.id", primary_key=True
+    )
+    keyword_id: int | None = Field(
+        default=None, foreign_key="keyword.id", primary_key=True, index=True
+    )
 
 
 class Repository(SQLModel, table=True):
@@ -20,25 +33,32 @@ class Repository(SQLModel, table=True):
     stars_since: Optional[int] = None
     ai_summary: Optional[str] = None
     summary_language: Optional[str] = None
-    created_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
-    updated_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
+    created_at: datetime = Field(
+        default_factory=lambda: datetime.now(UTC), sa_type=UTCDateTime
+    )
+    updated_at: datetime = Field(
+        default_factory=lambda: datetime.now(UTC), sa_type=UTCDateTime
+    )
     since: AllowedDateRanges | None = Field(default=None, index=True)
 
     # Relationships
     trending_repo: Optional["TrendingRepository"] = Relationship(back_populates="repo")
-    keywords: list["RepositoryKeyword"] = Relationship(
-        back_populates="repository",
-        sa_relationship_kwargs={"cascade": "all, delete-orphan"},
-    )
+    keywords: list["Keyword"] = Relationship(link_model=RepositoryKeywordLink)
+
 
+class Keyword(SQLModel, table=True):
+    """A unique, interned keyword shared by every repository tagged with it."""
 
-class RepositoryKeyword(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    keyword: str
-    repository_id: int | None = Field(foreign_key="repository.id")
+    keyword: str = Field(unique=True)
 
-    # Relationships
-    repository: Repository = Relationship(back_populates="keywords")
+
+class KeywordCount(SQLModel, table=True):
+    """Number of currently trending repositories per keyword and date range."""
+
+    since: AllowedDateRanges = Field(primary_key=True)
+    keyword_id: int = Field(foreign_key="keyword.id", primary_key=True)
+    count: int = Field(default=0, index=True)
 
 
 class TrendingRepository(SQLModel, table=True):
@@ -51,10 +71,35 @@ class TrendingRepository(SQLModel, table=True):
     repo: Repository = Relationship(back_populates="trending_repo")
 
 
+class RelatedRepository(SQLModel, table=True):
+    """A similar repository of a trending repository, computed when the
+    date range is published.
+    """
+
+    since: AllowedDateRanges = Field(primary_key=True)
+    repository_id: int = Field(primary_key=True)
+    position: int = Field(primary_key=True)
+    related_id: int
+    username: str
+    repository_name: str
+    url: str
+    score: float
+
+
 class Developer(SQLModel, table=True):
+    # 多个分片并行刷新时靠它合并同一开发者，已有数据库由 create_db_and_tables 补建
+    __table_args__ = (
+        Index(
+            "uq_developer_username_language",
+            "username",
+            "summary_language",
+            unique=True,
+        ),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     rank: int
-    username: str
+    username: str = Field(index=True)
     name: Optional[str] = None
     url: str
     avatar: Optional[str] = None
@@ -63,5 +108,91 @@ class Developer(SQLModel, table=True):
     popular_repo_url: Optional[str] = None
     ai_summary: Optional[str] = None
     summary_language: Optional[str] = None
-    created_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
-    updated_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
+    created_at: datetime = Field(
+        default_factory=lambda: datetime.now(UTC), sa_type=UTCDateTime
+    )
+    updated_at: datetime = Field(
+        default_factory=lambda: datetime.now(UTC), sa_type=UTCDateTime
+    )
+
+
+class TrendingDeveloper(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    since: AllowedDateRanges = Field(index=True)
+    rank: int
+    developer_id: int | None = Field(foreign_key="developer.id")
+
+    # Relationships
+    developer: Developer = Relationship()
+
+
+class SummaryTranslation(SQLModel, table=True):
+    """An AI summary translated into another language, keyed by a hash of
+    the primary-language summary so repositories and developers share it.
+    """
+
+    __table_args__ = (UniqueConstraint("source_hash", "language"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    source_hash: str = Field(index=True)
+    language: str
+    ai_summary: str
+    created_at: datetime = Field(
+        default_factory=lambda: datetime.now(UTC), sa_type=UTCDateTime
+    )
+
+
+class SchedulerLease(SQLModel, table=True):
+    """Lease row granting one process the right to run the scheduler."""
+
+    name: str = Field(primary_key=True)
+    holder: str
+    expires_at: datetime = Field(sa_type=UTCDateTime)
+
+
+class RefreshRequest(SQLModel, table=True):
+    """A manual refresh forwarded to the process holding the scheduler lease."""
+
+    key: str = Field(primary_key=True)
+    kind: AllowedTrendingKinds
+    since: AllowedDateRanges
+    requested_at: datetime = Field(
+        default_factory=lambda: datetime.now(UTC), sa_type=UTCDateTime
+    )
+
+
+class SnapshotVersion(SQLModel, table=True):
+    """Bumped whenever a date range is republished, so every process knows
+    when to reload its in-memory read model.
+    """
+
+    since: AllowedDateRanges = Field(primary_key=True)
+    version: int = 0
+    published_at: datetime = Field(
+        default_factory=lambda: datetime.now(UTC), sa_type=UTCDateTime
+    )
+
+
+class RefreshJob(SQLModel, table=True):
+    """One durable step of a refresh, claimed by workers through a lease."""
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    kind: JobKind = Field(index=True)
+    idempotency_key: str = Field(unique=True)
+    payload: dict = Field(default_factory=dict, sa_type=JSON)
+    result: Optional[dict] = Field(default=None, sa_type=JSON)
+    status: JobStatus = Field(default=JobStatus.pending, index=True)
+    attempts: int = 0
+    max_attempts: int = 3
+    run_after: datetime = Field(
+        default_factory=lambda: datetime.now(UTC), index=True, sa_type=UTCDateTime
+    )
+    lease_owner: Optional[str] = None
+    lease_expires_at: Optional[datetime] = Field(default=None, sa_type=UTCDateTime)
+    last_error: Optional[str] = None
+    created_at: datetime = Field(
+        default_factory=lambda: datetime.now(UTC), sa_type=UTCDateTime
+    )
+    updated_at: datetime = Field(
+        default_factory=lambda: datetime.now(UTC), sa_type=UTCDateTime
+    )
@@ -1,17 +1,53 @@
-from openai import AsyncOpenAI
+import json
+import time
+from dataclasses import asdict
+from functools import cached_property
+from typing import TYPE_CHECKING
 
 from app.config import settings
-from app.models import Developer, Repository
+from app.services.metrics import LLM_ERRORS, LLM_REQUEST_SECONDS, LLM_TOKENS
+from app.services.scraping import ScrapedDeveloper, ScrapedRepository
+from app.services.tracing import tracer
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
 
 
 class AISummaryService:
-    def __init__(self):
-        self.client = AsyncOpenAI(
+    @cached_property
+    def client(self) -> "AsyncOpenAI":
+        # openai 导入耗时较长，只读进程从不调用，首次使用时再创建客户端
+        from openai import AsyncOpenAI
+
+        return AsyncOpenAI(
             api_key=settings.ai.OPENAI_API_KEY, base_url=settings.ai.OPENAI_API_BASE
         )
 
+    async def _complete(self, call: str, system_prompt: str, prompt: str):
+        """Run one chat completion and record its latency, tokens and errors."""
+        started = time.perf_counter()
+        try:
+            response = await self.client.chat.completions.create(
+                model=settings.ai.OPENAI_MODEL,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": prompt},
+                ],
+            )
+        except Exception:
+            LLM_ERRORS.inc(call)
+            raise
+        finally:
+            ended = time.perf_counter()
+            LLM_REQUEST_SECONDS.observe(ended - started, call)
+            tracer.add(call, "llm", started, ended)
+        if response.usage:
+            LLM_TOKENS.inc(call, "prompt", amount=response.usage.prompt_tokens)
+            LLM_TOKENS.inc(call, "completion", amount=response.usage.completion_tokens)
+        return response.choices[0].message.content
+
     async def generate_summary(
-        self, data: Repository | Developer, language: str = "简体中文"
+        self, data: ScrapedRepository | ScrapedDeveloper, language: str = "简体中文"
     ) -> str:
         system_prompt = f"""<instruction>
 <task_description>
@@ -57,18 +93,10 @@ Output (in 简体中文):
 4. MAKE SURE TO OUTPUT IN {language}.
 
 Input data:
-{data.model_dump_json()}
+{json.dumps(asdict(data), ensure_ascii=False)}
         """
 
-        response = await self.client.chat.completions.create(
-            model=settings.ai.OPENAI_MODEL,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": prompt},
-            ],
-        )
-
-        content = response.choices[0].message.content
+        content = await self._complete("summary", system_prompt, prompt)
         if content is None:
             return ""
 
@@ -77,7 +105,7 @@ Input data:
         return content
 
     async def generate_tags(
-        self, data: Repository | Developer, language: str = "简体中文"
+        self, data: ScrapedRepository | ScrapedDeveloper, language: str = "简体中文"
     ) -> list[str]:
         system_prompt = """<instruction>
 <task_description>
@@ -117,18 +145,10 @@ Kubernetes,AI 助手,云计算,DevOps
 4. DO NOT include programming languages like Python, Java, etc. We already have a field for that.
 
 Input data:
-{data.model_dump_json()}
+{json.dumps(asdict(data), ensure_ascii=False)}
         """
 
-        response = await self.client.chat.completions.create(
-            model=settings.ai.OPENAI_MODEL,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": prompt},
-            ],
-        )
-
-        content = response.choices[0].message.content
+        content = await self._complete("tags", system_prompt, prompt)
         if content is None:
             return []
         content = content.split("</think>")[-1].strip()
@@ -145,3 +165,41 @@ Input data:
         if len(tags) > 3:
             tags = tags[:3]
         return tags
+
+    async def translate_summary(
+        self, summary: str, languages: list[str]
+    ) -> dict[str, str]:
+        """Translate an existing summary into several languages in one call."""
+        system_prompt = """<instruction>
+<task_description>
+Translate a short RSS summary of a GitHub trending entry into each requested language.
+</task_description>
+
+<instructions>
+1. Keep the meaning, emojis and numbers of the original summary.
+2. Keep the allowed html tags (<br/>, <strong>, <em>) exactly where they are.
+3. Technical terms should stay in English (e.g. DevOps, Kubernetes, etc.).
+4. Output ONLY a JSON object whose keys are the requested language names and whose values are the translated summaries.
+</instructions>
+</instruction>"""
+        prompt = f"""Translate this summary into: {", ".join(languages)}.
+
+Summary:
+{summary}
+        """
+
+        content = await self._complete("translation", system_prompt, prompt)
+        if content is None:
+            return {}
+        content = content.split("</think>")[-1].strip()
+
+        # Strip an optional ```json fence around the object
+        start, end = content.find("{"), content.rfind("}")
+        if start == -1 or end == -1:
+            return {}
+        translations = json.loads(content[start : end + 1])
+        return {
+            language: str(translations[language]).strip()
+            for language in languages
+            if translations.get(language)
+        }
@@ -0,0 +1,210 @@
+"""Archive
+===================
+Compressed archive of the fetched trending pages, for re-parsing and
+backfills without the network.
+
+With ``ARCHIVE_DIR`` set, the filtered article HTML of every fetched page
+is stored under ``pages/`` as a gzip file named after its SHA-256, so an
+unchanged page is stored once however often it is fetched. Every fetch
+appends one line (fetch time, kind, date range, language, URL, params and
+digest) to ``index.jsonl``.
+
+``python -m app.cli replay`` runs the archived pages through the parser
+and the normal refresh pipeline, each slice in fetch order.
+``ReplayGitHubService`` serves the archived pages instead of GitHub, and
+``OfflineAIService`` stands in for the LLM: repositories and developers already in the
+database keep their summaries, new ones are stored without one and get
+it on the next live refresh.
+"""
+
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+from dataclasses import asdict, dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from app.config import Settings
+from app.enums import AllowedDateRanges, AllowedTrendingKinds
+from app.services.metrics import CACHE_REQUESTS
+from app.services.parsing import run_parser
+from app.services.scraping import (
+    ScrapedDeveloper,
+    ScrapedRepository,
+    parse_developers,
+    parse_repositories,
+)
+
+
+@dataclass(frozen=True, slots=True)
+class ArchivedPage:
+    """One line of ``index.jsonl``."""
+
+    fetched_at: str
+    kind: str
+    since: str
+    language: Optional[str]
+    url: str
+    params: Dict[str, str]
+    digest: str
+    size: int
+
+
+class PageArchive:
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = Path(directory) if directory else None
+
+    @property
+    def is_enabled(self) -> bool:
+        return self.directory is not None
+
+    def _page_path(self, digest: str) -> Path:
+        return self.directory / "pages" / digest[:2] / f"{digest}.html.gz"  # type: ignore
+
+    async def store(
+        self,
+        kind: AllowedTrendingKinds,
+        url: str,
+        params: Dict[str, str],
+        language: Optional[str],
+        articles_html: str,
+    ):
+        """Archive a fetched page; errors are logged, never raised."""
+        if not self.is_enabled:
+            return
+        try:
+            await asyncio.to_thread(
+                self._store, kind, url, params, language, articles_html
+            )
+        except Exception as e:
+            logging.error(f"Error archiving {url}: {e}")
+
+    def _store(
+        self,
+        kind: AllowedTrendingKinds,
+        url: str,
+        params: Dict[str, str],
+        language: Optional[str],
+        articles_html: str,
+    ):
+        data = articles_html.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._page_path(digest)
+        if path.exists():
+            CACHE_REQUESTS.inc("archive", "hit")
+        else:
+            CACHE_REQUESTS.inc("archive", "miss")
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # 先写临时文件再改名，并发写入同一页面时不会留下半个文件
+            temp = path.with_suffix(f".{os.getpid()}.tmp")
+            temp.write_bytes(gzip.compress(data, mtime=0))
+            temp.replace(path)
+
+        page = ArchivedPage(
+            fetched_at=datetime.now(UTC).isoformat(),
+            kind=kind.value,
+            since=params.get("since", AllowedDateRanges.daily.value),
+            language=language,
+            url=url,
+            params=params,
+            digest=digest,
+            size=len(data),
+        )
+        # 每次追加一整行，多个进程同时写入也不会交错
+        with open(self.directory / "index.jsonl", "a", encoding="utf-8") as f:  # type: ignore
+            f.write(json.dumps(asdict(page), ensure_ascii=False) + "\n")
+
+    def pages(
+        self,
+        kinds: Optional[List[AllowedTrendingKinds]] = None,
+        sinces: Optional[List[AllowedDateRanges]] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> Iterator[ArchivedPage]:
+        """Archived fetches in fetch order, optionally filtered."""
+        index = self.directory / "index.jsonl" if self.directory else None
+        if index is None or not index.exists():
+            return
+        kind_values = {kind.value for kind in kinds} if kinds else None
+        since_values = {since.value for since in sinces} if sinces else None
+        with open(index, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                page = ArchivedPage(**json.loads(line))
+                fetched_at = datetime.fromisoformat(page.fetched_at)
+                if (
+                    (kind_values and page.kind not in kind_values)
+                    or (since_values and page.since not in since_values)
+                    or (start and fetched_at < start)
+                    or (end and fetched_at >= end)
+                ):
+                    continue
+                yield page
+
+    def read(self, page: ArchivedPage) -> str:
+        return gzip.decompress(self._page_path(page.digest).read_bytes()).decode(
+            "utf-8"
+        )
+
+    async def parse(
+        self, page: ArchivedPage
+    ) -> List[ScrapedRepository] | List[ScrapedDeveloper]:
+        """Run an archived page through the current parser."""
+        articles_html = await asyncio.to_thread(self.read, page)
+        if page.kind == AllowedTrendingKinds.repositories.value:
+            return await run_parser(parse_repositories, articles_html)
+        return await run_parser(parse_developers, articles_html)
+
+
+class ReplayGitHubService:
+    """Serves archived pages in place of ``GitHubTrendingService``.
+
+    ``pages`` holds the page to return next for each (kind, since).
+    """
+
+    def __init__(self, archive: PageArchive):
+        self.archive = archive
+        self.pages: Dict[Tuple[str, str], ArchivedPage] = {}
+
+    async def _parse(self, kind: AllowedTrendingKinds, since: AllowedDateRanges):
+        page = self.pages.get((kind.value, since.value))
+        if page is None:
+            raise RuntimeError(f"No archived {kind.value} page for {since.value}")
+        return await self.archive.parse(page)
+
+    async def get_trending_repositories(
+        self, since: AllowedDateRanges, **kwargs
+    ) -> List[ScrapedRepository]:
+        return await self._parse(AllowedTrendingKinds.repositories, since)  # type: ignore
+
+    async def get_trending_developers(
+        self, since: AllowedDateRanges, **kwargs
+    ) -> List[ScrapedDeveloper]:
+        return await self._parse(AllowedTrendingKinds.developers, since)  # type: ignore
+
+    async def close(self):
+        pass
+
+
+class OfflineAIService:
+    """Stands in for ``AISummaryService`` without calling the LLM."""
+
+    async def generate_summary(self, data, language: str = "简体中文") -> None:
+        return None
+
+    async def generate_tags(self, data, language: str = "简体中文") -> List[str]:
+        return []
+
+    async def translate_summary(
+        self, summary: str, languages: List[str]
+    ) -> Dict[str, str]:
+        return {}
+
+
+# 创建全局归档实例，未设置 ARCHIVE_DIR 时不归档
+archive = PageArchive(Settings.app.ARCHIVE_DIR)
@@ -0,0 +1,168 @@
+"""Cache
+===================
+In-process cache for rendered feeds and pages. Entries are keyed by a tuple
+whose first two items are the feed kind and the date range, so the
+scheduler can drop everything it just republished.
+
+Pages are stored as ``RenderedPage``: the body together with its gzip (and,
+when the ``brotli`` package is installed, brotli) variant and validators,
+so a cache hit never renders or compresses anything.
+"""
+
+import gzip
+import hashlib
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    Optional,
+    Tuple,
+)
+
+from app.config import Settings
+from app.enums import AllowedDateRanges
+from app.services.metrics import CACHE_REQUESTS
+from app.services.singleflight import single_flight
+
+if TYPE_CHECKING:
+    from fastapi import Request, Response
+
+try:
+    import brotli
+except ImportError:  # 未安装时只提供 gzip 版本
+    brotli = None
+
+
+def accepted_encodings(accept_encoding: str) -> Dict[str, float]:
+    """Map each coding of an ``Accept-Encoding`` header to its q-value."""
+    accepted = {}
+    for item in accept_encoding.split(","):
+        coding, *params = [part.strip() for part in item.split(";")]
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[coding.lower()] = quality
+    return accepted
+
+
+def accepts(accepted: Dict[str, float], coding: str) -> bool:
+    # 没有单独列出的编码按 * 的权重处理
+    return accepted.get(coding, accepted.get("*", 0.0)) > 0
+
+
+@dataclass(frozen=True)
+class RenderedPage:
+    body: bytes
+    gzip_body: bytes
+    brotli_body: Optional[bytes]
+    etag: str
+    last_modified: datetime
+
+    @classmethod
+    def build(cls, body: bytes, last_modified: datetime) -> "RenderedPage":
+        return cls(
+            body=body,
+            gzip_body=gzip.compress(body, compresslevel=9, mtime=0),
+            brotli_body=brotli.compress(body) if brotli else None,
+            etag=f'W/"{hashlib.sha1(body).hexdigest()}"',
+            last_modified=last_modified.replace(tzinfo=UTC, microsecond=0),
+        )
+
+    def is_not_modified(self, request: "Request") -> bool:
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            etags = {etag.strip() for etag in if_none_match.split(",")}
+            return "*" in etags or self.etag in etags
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since:
+            try:
+                since = parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                return False
+            if since.tzinfo is None:
+                # "-0000" 时区解析为不带时区的时间，按 UTC 处理
+                since = since.replace(tzinfo=UTC)
+            return self.last_modified <= since
+        return False
+
+    def response(self, request: "Request", media_type: str) -> "Response":
+        """Answer with 304, or with the best encoding the client accepts."""
+        # 调度器和命令行也会导入本模块，Web 框架只在生成响应时加载
+        from fastapi import Response
+
+        headers = {
+            "ETag": self.etag,
+            "Last-Modified": format_datetime(self.last_modified, usegmt=True),
+            "Cache-Control": "no-cache",
+            "Vary": "Accept-Encoding",
+        }
+        if self.is_not_modified(request):
+            return Response(status_code=304, headers=headers)
+
+        accepted = accepted_encodings(request.headers.get("accept-encoding", ""))
+        body = self.body
+        if self.brotli_body is not None and accepts(accepted, "br"):
+            body = self.brotli_body
+            headers["Content-Encoding"] = "br"
+        elif accepts(accepted, "gzip"):
+            body = self.gzip_body
+            headers["Content-Encoding"] = "gzip"
+        return Response(content=body, media_type=media_type, headers=headers)
+
+
+class FeedCache:
+    def __init__(self):
+        self._entries: Dict[Tuple[Hashable, ...], Any] = {}
+
+    def get(self, key: Tuple[Hashable, ...]) -> Optional[Any]:
+        return self._entries.get(key)
+
+    def set(self, key: Tuple[Hashable, ...], value: Any):
+        self._entries[key] = value
+
+    async def get_or_create(
+        self,
+        key: Tuple[Hashable, ...],
+        create: Callable[[], Awaitable[Any]],
+        cacheable: bool = True,
+        timeout: Optional[float] = None,
+    ) -> Any:
+        """Return the cached value, or build it once for all concurrent misses."""
+        value = self._entries.get(key)
+        if value is not None:
+            CACHE_REQUESTS.inc(str(key[0]), "hit")
+            return value
+        CACHE_REQUESTS.inc(str(key[0]), "miss")
+
+        async def fill():
+            value = await create()
+            if cacheable:
+                self._entries[key] = value
+            return value
+
+        return await single_flight.do(
+            key, fill, timeout or Settings.app.SINGLE_FLIGHT_TIMEOUT
+        )
+
+    def invalidate(self, kind: str, since: AllowedDateRanges | None = None):
+        """Drop cached entries of ``kind``, optionally only for ``since``."""
+        for key in list(self._entries):
+            if key[0] == kind and (since is None or key[1] == since):
+                del self._entries[key]
+
+
+# 全局 feed 缓存
+feed_cache = FeedCache()
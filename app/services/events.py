@@ -0,0 +1,76 @@
+"""Events
+===================
+Server-Sent Events fan-out for published trending updates.
+
+Each event is serialized once and kept in a short ring buffer with an
+increasing id. A connection only remembers the last id it has sent and
+waits on a shared event, so an idle connection costs a suspended
+generator and nothing else. Clients reconnecting with ``Last-Event-ID``
+receive what they missed if it is still in the buffer; ids from before a
+restart or older than the buffer cannot be resumed.
+"""
+
+import asyncio
+import json
+from collections import deque
+from typing import Any, AsyncIterator, Container, Deque, Dict, Optional, Tuple
+
+
+def format_event(event_id: int, event: str, data: Dict[str, Any]) -> str:
+    payload = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+    return f"id: {event_id}\nevent: {event}\ndata: {payload}\n\n"
+
+
+class EventBroadcaster:
+    def __init__(self, history: int = 64):
+        self.last_id = 0
+        self.connections = 0
+        # (id, 时间范围, 已序列化的消息)
+        self._events: Deque[Tuple[int, str, str]] = deque(maxlen=history)
+        self._published = asyncio.Event()
+
+    def publish(self, since: str, event: str, data: Dict[str, Any]):
+        self.last_id += 1
+        self._events.append(
+            (self.last_id, since, format_event(self.last_id, event, data))
+        )
+        # 唤醒所有等待中的连接，再换一个新的事件对象给下一轮等待
+        published, self._published = self._published, asyncio.Event()
+        published.set()
+
+    def can_resume(self, last_event_id: int) -> bool:
+        """Whether every event after ``last_event_id`` is still buffered."""
+        if last_event_id > self.last_id:
+            # 重启前或其他进程发出的 id
+            return False
+        oldest_id = self._events[0][0] if self._events else self.last_id + 1
+        return last_event_id >= oldest_id - 1
+
+    async def stream(
+        self,
+        sinces: Container[str],
+        last_event_id: Optional[int] = None,
+        heartbeat: float = 15.0,
+    ) -> AsyncIterator[str]:
+        last_id = self.last_id if last_event_id is None else last_event_id
+        self.connections += 1
+        try:
+            while True:
+                published = self._published
+                # 只推进到本轮实际遍历过的 id，遍历期间新发布的事件留给下一轮
+                for event_id, since, message in list(self._events):
+                    if event_id <= last_id:
+                        continue
+                    last_id = event_id
+                    if since in sinces:
+                        yield message
+                try:
+                    await asyncio.wait_for(published.wait(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    yield ": heartbeat\n\n"
+        finally:
+            self.connections -= 1
+
+
+# 全局事件广播
+broadcaster = EventBroadcaster()
@@ -0,0 +1,206 @@
+"""Export
+===================
+Static export of every page and feed, for deployments that only need the
+output. Files are laid out so nginx or an object store can serve them
+as-is:
+
+    index.html                      daily index in the primary language
+    {since}/index.html              index page
+    {since}/tag/{tag}/index.html    index page filtered by tag
+    {since}/feed.xml, atom.xml, feed.json, developers.xml
+    {since}/lang/{lang}/...         the same for every other language
+    static/...                      assets with content-hashed names
+
+Text files get ``.gz`` (and, with ``brotli`` installed, ``.br``) siblings.
+Files whose content did not change are not rewritten, and files that an
+earlier export produced but this one did not are removed, as recorded in
+``.export-manifest.json``.
+"""
+
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+from app.config import Settings
+from app.enums import AllowedDateRanges
+from app.services.cache import brotli
+from app.services.pages import StaticSiteUrls, render_index
+from app.services.read_model import TrendingSnapshot, read_model
+from app.services.rss import RSSService
+
+STATIC_DIR = Path("app/static")
+MANIFEST = ".export-manifest.json"
+COMPRESSIBLE_SUFFIXES = {".html", ".xml", ".json", ".css", ".js", ".svg"}
+
+
+@dataclass
+class ExportStats:
+    written: int = 0
+    unchanged: int = 0
+    removed: int = 0
+    files: Dict[str, Set[str]] = field(default_factory=dict, repr=False)
+
+    def summary(self) -> dict:
+        return {key: value for key, value in asdict(self).items() if key != "files"}
+
+
+class SiteExporter:
+    def __init__(self, output: Path):
+        self.output = output
+        self.rss_service = RSSService(Settings.app.BASE_URL, image_proxy=False)
+        self.stats = ExportStats()
+
+    def write(self, group: str, path: str, content: bytes):
+        """Write ``path`` and its compressed siblings unless unchanged."""
+        self.stats.files.setdefault(group, set()).add(path)
+        changed = self._write_if_changed(path, content)
+        if Path(path).suffix not in COMPRESSIBLE_SUFFIXES:
+            return
+
+        variants = {".gz": lambda: gzip.compress(content, compresslevel=9, mtime=0)}
+        if brotli:
+            variants[".br"] = lambda: brotli.compress(content)
+        for suffix, compress in variants.items():
+            self.stats.files[group].add(path + suffix)
+            if changed or not (self.output / (path + suffix)).exists():
+                self._write_if_changed(path + suffix, compress())
+
+    def _write_if_changed(self, path: str, content: bytes) -> bool:
+        target = self.output / path
+        if target.exists() and target.read_bytes() == content:
+            self.stats.unchanged += 1
+            return False
+        target.parent.mkdir(parents=True, exist_ok=True)
+        # 先写临时文件再替换，避免被读到写了一半的文件
+        temporary = target.with_name(target.name + ".tmp")
+        temporary.write_bytes(content)
+        os.replace(temporary, target)
+        self.stats.written += 1
+        return True
+
+    def export_assets(self) -> Dict[str, str]:
+        """Copy static files under content-hashed names, CSS last so that
+        it can refer to the hashed images.
+        """
+        assets: Dict[str, str] = {}
+        files = sorted(
+            (path for path in STATIC_DIR.rglob("*") if path.is_file()),
+            key=lambda path: (path.suffix == ".css", path.as_posix()),
+        )
+        for path in files:
+            name = path.relative_to(STATIC_DIR).as_posix()
+            content = path.read_bytes()
+            if path.suffix == ".css":
+                text = content.decode("utf-8")
+                for source, hashed in assets.items():
+                    text = text.replace(f"/static/{source}", f"/static/{hashed}")
+                content = text.encode("utf-8")
+            digest = hashlib.sha256(content).hexdigest()[:10]
+            hashed = path.relative_to(STATIC_DIR).with_name(
+                f"{path.stem}.{digest}{path.suffix}"
+            )
+            assets[name] = hashed.as_posix()
+            self.write("assets", f"static/{assets[name]}", content)
+        return assets
+
+    def export_range(self, snapshot: TrendingSnapshot, urls: StaticSiteUrls):
+        since = snapshot.since
+        group = since.value
+        for lang in Settings.ai.SUMMARY_LANGUAGES:
+            directory = urls.directory(since, lang)
+            translations = snapshot.translations_for(lang)
+
+            index = render_index(snapshot, None, lang, urls).encode("utf-8")
+            self.write(group, f"{directory}index.html", index)
+            if since == AllowedDateRanges.daily and directory == f"{since.value}/":
+                self.write("root", "index.html", index)
+            for tag in snapshot.by_tag:
+                self.write(
+                    group,
+                    f"{directory}tag/{urls.tag_segment(tag)}/index.html",
+                    render_index(snapshot, tag, lang, urls).encode("utf-8"),
+                )
+
+            repositories = snapshot.repositories
+            self.write(
+                group,
+                f"{directory}feed.xml",
+                self.rss_service.generate_repository_feed(
+                    repositories, since, translations, snapshot.published_at
+                ).encode("utf-8"),
+            )
+            self.write(
+                group,
+                f"{directory}atom.xml",
+                self.rss_service.generate_repository_atom_feed(
+                    repositories, since, translations, snapshot.published_at
+                ).encode("utf-8"),
+            )
+            self.write(
+                group,
+                f"{directory}feed.json",
+                self.rss_service.generate_repository_json_feed(
+                    repositories,
+                    since,
+                    translations,
+                    feed_url=f"{Settings.app.BASE_URL}/{directory}feed.json",
+                ).encode("utf-8"),
+            )
+            self.write(
+                group,
+                f"{directory}developers.xml",
+                self.rss_service.generate_developer_feed(
+                    snapshot.developers,
+                    since.value,
+                    translations,
+                    snapshot.published_at,
+                ).encode("utf-8"),
+            )
+
+    def prune(self):
+        """Remove files of the exported groups that were not produced again,
+        and record what this export produced.
+        """
+        manifest_path = self.output / MANIFEST
+        manifest: Dict[str, List[str]] = {}
+        if manifest_path.exists():
+            manifest = json.loads(manifest_path.read_text("utf-8"))
+        for group, files in self.stats.files.items():
+            for path in set(manifest.get(group, [])) - files:
+                target = self.output / path
+                if target.exists():
+                    target.unlink()
+                    self.stats.removed += 1
+            manifest[group] = sorted(files)
+        self._write_if_changed(
+            MANIFEST, json.dumps(manifest, ensure_ascii=False, indent=2).encode("utf-8")
+        )
+
+    def export(self, snapshots: Iterable[TrendingSnapshot]) -> ExportStats:
+        urls = StaticSiteUrls(self.export_assets())
+        for snapshot in snapshots:
+            self.export_range(snapshot, urls)
+        self.prune()
+        return self.stats
+
+
+_export_lock = asyncio.Lock()
+
+
+async def export_site(
+    output: Path, sinces: Optional[Iterable[AllowedDateRanges]] = None
+) -> ExportStats:
+    """Export ``sinces`` (all ranges by default) from the read model."""
+    snapshots = [
+        await read_model.get(since) for since in (sinces or list(AllowedDateRanges))
+    ]
+    async with _export_lock:
+        stats = await asyncio.to_thread(SiteExporter(output).export, snapshots)
+    logging.info(f"Exported {len(snapshots)} range(s) to {output}: {stats.summary()}")
+    return stats
@@ -1,32 +1,55 @@
 import asyncio
-from typing import List
+from typing import TYPE_CHECKING, List, Optional
 
-from app.enums import (
-    AllowedDateRanges,
-    AllowedProgrammingLanguages,
-    AllowedSpokenLanguages,
-)
-from app.models import Developer, Repository
+from app.enums import AllowedDateRanges, AllowedTrendingKinds
+from app.services.archive import archive
+from app.services.metrics import PARSE_SECONDS
+from app.services.parsing import run_parser
 from app.services.scraping import (
+    ScrapedDeveloper,
+    ScrapedRepository,
     filter_articles,
     get_request,
-    make_soup,
-    scraping_developers,
-    scraping_repositories,
+    parse_developers,
+    parse_repositories,
 )
+from app.services.tracing import tracer
+
+if TYPE_CHECKING:
+    import aiohttp
+
+    from app.languages import AllowedProgrammingLanguages, AllowedSpokenLanguages
 
 
 class GitHubTrendingService:
     BASE_URL = "https://github.com/trending"
 
+    def __init__(self):
+        self._session: Optional["aiohttp.ClientSession"] = None
+
+    @property
+    def session(self) -> "aiohttp.ClientSession":
+        """HTTP client shared by every request of this service."""
+        if self._session is None or self._session.closed:
+            import aiohttp
+
+            self._session = aiohttp.ClientSession()
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
     async def get_trending_repositories(
         self,
         since: AllowedDateRanges | None = None,
-        spoken_language: AllowedSpokenLanguages | None = None,
-        language: AllowedProgrammingLanguages | None = None,
-    ) -> List[Repository]:
+        spoken_language: Optional["AllowedSpokenLanguages"] = None,
+        language: Optional["AllowedProgrammingLanguages"] = None,
+    ) -> List[ScrapedRepository]:
         """Returns data about trending repositories (all programming
-        languages, cannot be specified on this endpoint).
+        languages, cannot be specified on this endpoint). Raises a
+        ``TransportError`` if the page cannot be fetched.
         """
         payload = {"since": "daily"}
         if since:
@@ -40,21 +63,33 @@ class GitHubTrendingService:
 
         sem = asyncio.Semaphore()
         async with sem:
-            raw_html = await get_request(url, compress=True, params=payload)
-        if not isinstance(raw_html, str):
-            return []
+            raw_html = await get_request(
+                url, compress=True, params=payload, session=self.session
+            )
 
-        articles_html = filter_articles(raw_html)
-        soup = make_soup(articles_html)
-        return scraping_repositories(soup)
+        with PARSE_SECONDS.time("repositories"), tracer.span(
+            "parse repositories", "parse"
+        ):
+            # 只把文章部分交给解析池，避免阻塞事件循环
+            articles_html = filter_articles(raw_html)
+            records = await run_parser(parse_repositories, articles_html)
+        await archive.store(
+            AllowedTrendingKinds.repositories,
+            url,
+            payload,
+            language.value if language else None,
+            articles_html,
+        )
+        return records
 
     async def get_trending_developers(
         self,
         since: AllowedDateRanges | None = None,
-        language: AllowedProgrammingLanguages | None = None,
-    ) -> List[Developer]:
+        language: Optional["AllowedProgrammingLanguages"] = None,
+    ) -> List[ScrapedDeveloper]:
         """Returns data about trending developers. A specific programming
-        language can be added as path parameter to specify search.
+        language can be added as path parameter to specify search. Raises a
+        ``TransportError`` if the page cannot be fetched.
         """
         payload = {"since": "daily"}
         if since:
@@ -65,13 +100,22 @@ class GitHubTrendingService:
             url = f"{url}/{language.value}"
         sem = asyncio.Semaphore()
         async with sem:
-            raw_html = await get_request(url, compress=True, params=payload)
-        if not isinstance(raw_html, str):
-            return []
+            raw_html = await get_request(
+                url, compress=True, params=payload, session=self.session
+            )
 
-        articles_html = filter_articles(raw_html)
-        soup = make_soup(articles_html)
-        return scraping_developers(soup)
+        with PARSE_SECONDS.time("developers"), tracer.span("parse developers", "parse"):
+            # 只把文章部分交给解析池，避免阻塞事件循环
+            articles_html = filter_articles(raw_html)
+            records = await run_parser(parse_developers, articles_html)
+        await archive.store(
+            AllowedTrendingKinds.developers,
+            url,
+            payload,
+            language.value if language else None,
+            articles_html,
+        )
+        return records
 
 
 if __name__ == "__main__":
@@ -84,4 +128,6 @@ if __name__ == "__main__":
             )
         )
 
+        await github_service.close()
+
     asyncio.run(main())
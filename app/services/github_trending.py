@@ -5,7 +5,12 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from app.enums import AllowedDateRanges
-from app.models import Repository, TrendingRepository
+from app.models import (
+    RelatedRepository,
+    Repository,
+    TrendingDeveloper,
+    TrendingRepository,
+)
 
 
 async def get_trending_repos(
@@ -25,3 +30,38 @@ async def get_trending_repos(
     trending_repos: Sequence[TrendingRepository] = result.scalars().all()
 
     return [trending_repo.repo for trending_repo in trending_repos]
+
+
+async def get_trending_devs(
+    since: AllowedDateRanges, session: AsyncSession
+) -> List[TrendingDeveloper]:
+    """Trending slots of ``since`` with their developer loaded.
+
+    ``Developer.rank`` is shared by every date range, the slot's own rank is
+    the one for ``since``.
+    """
+    query = (
+        select(TrendingDeveloper)
+        .options(selectinload(TrendingDeveloper.developer))
+        .where(
+            TrendingDeveloper.since == since,
+        )
+        .order_by(TrendingDeveloper.rank)  # type: ignore
+    )
+    result = await session.execute(query)
+    trending_devs: Sequence[TrendingDeveloper] = result.scalars().all()
+
+    return [trending_dev for trending_dev in trending_devs if trending_dev.developer]
+
+
+async def get_related_repos(
+    since: AllowedDateRanges, session: AsyncSession
+) -> List[RelatedRepository]:
+    """Similar repositories stored for the trending repositories of ``since``."""
+    query = (
+        select(RelatedRepository)
+        .where(RelatedRepository.since == since)
+        .order_by(RelatedRepository.repository_id, RelatedRepository.position)  # type: ignore
+    )
+    result = await session.execute(query)
+    return list(result.scalars().all())
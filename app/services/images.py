@@ -0,0 +1,326 @@
+"""Images
+===================
+Caching proxy for the third-party images on the index page and in the
+feeds, served under ``/img/``.
+
+* ``/img/avatar/{username}?size=80``: a GitHub avatar, requested from the
+  origin at one of ``AVATAR_SIZES`` and kept for ``IMAGE_AVATAR_TTL``.
+* ``/img/og/{username}/{repository_name}?v=...``: a repository's Open Graph
+  card. ``v`` changes whenever the repository is updated, so a cached card
+  never goes stale. Only the version of a trending repository is fetched,
+  an outdated one is redirected to it. Cards are scaled down to
+  ``IMAGE_OG_WIDTH`` when Pillow is installed.
+
+Fetched images are stored in ``IMAGE_CACHE_DIR``, one file per image named
+after the SHA-256 of its origin URL and width. The least recently used
+files are removed once the directory exceeds ``IMAGE_CACHE_MAX_BYTES``.
+Each process keeps its own LRU order over the shared directory, rebuilt
+from file modification times in a thread on the first request. Concurrent misses for the same
+image share a single origin request. If a refetch fails, the stale copy
+is served.
+"""
+
+import asyncio
+import hashlib
+import io
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+from app.config import Settings
+from app.services.metrics import CACHE_REQUESTS, IMAGE_CACHE_BYTES, IMAGE_FETCH_SECONDS
+from app.services.singleflight import single_flight
+
+if TYPE_CHECKING:
+    import aiohttp
+
+    from app.services.read_model import RepositoryRecord
+
+# 头像只按这些尺寸请求和缓存，避免任意 size 参数产生大量变体
+AVATAR_SIZES = (40, 80, 160, 240, 460)
+
+CONTENT_TYPE_SUFFIXES = {
+    "image/png": ".png",
+    "image/jpeg": ".jpg",
+    "image/gif": ".gif",
+    "image/webp": ".webp",
+}
+SUFFIX_CONTENT_TYPES = {
+    suffix: content_type for content_type, suffix in CONTENT_TYPE_SUFFIXES.items()
+}
+
+
+class ImageUnavailable(Exception):
+    """The origin did not return a usable image."""
+
+    def __init__(self, url: str, message: str, status: Optional[int] = None):
+        super().__init__(f"{message} ({url})")
+        self.status = status
+
+
+@dataclass(frozen=True, slots=True)
+class CachedImage:
+    path: Path
+    size: int
+    content_type: str
+    fetched_at: float
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.path.stem[:16]}-{int(self.fetched_at)}"'
+
+
+def open_graph_version(repo: "RepositoryRecord") -> str:
+    """Cache buster of a repository's Open Graph card, stable until it is
+    updated.
+    """
+    return hashlib.sha1(f"{repo.url}{repo.updated_at}".encode()).hexdigest()
+
+
+def avatar_size(size: int) -> int:
+    """The smallest cached avatar size at least ``size`` pixels wide."""
+    for candidate in AVATAR_SIZES:
+        if candidate >= size:
+            return candidate
+    return AVATAR_SIZES[-1]
+
+
+def resize_image(data: bytes, content_type: str, width: int) -> Tuple[bytes, str]:
+    """Scale an image down to ``width`` pixels; unchanged without Pillow."""
+    try:
+        from PIL import Image
+    except ImportError:  # 未安装 Pillow 时原样返回
+        return data, content_type
+
+    with Image.open(io.BytesIO(data)) as image:
+        if image.width <= width or getattr(image, "is_animated", False):
+            return data, content_type
+        height = max(round(image.height * width / image.width), 1)
+        resized = image.resize((width, height), Image.Resampling.LANCZOS)
+        output = io.BytesIO()
+        if resized.mode in ("RGBA", "LA", "P"):
+            # 保留透明通道
+            resized.save(output, format="PNG", optimize=True)
+            return output.getvalue(), "image/png"
+        resized.convert("RGB").save(output, format="JPEG", quality=85, optimize=True)
+        return output.getvalue(), "image/jpeg"
+
+
+class ImageCache:
+    """Size-bounded LRU of image files in ``directory``."""
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries: "OrderedDict[str, CachedImage]" = OrderedDict()
+        self._is_loaded = False
+
+    async def load(self):
+        """Rebuild the LRU order from the directory without blocking the loop."""
+        if self._is_loaded:
+            return
+        found = await asyncio.to_thread(self._scan)
+        # 并发的首次请求各扫描一次，只采用先完成的结果
+        if not self._is_loaded:
+            self._is_loaded = True
+            stale = []
+            for entry in sorted(found, key=lambda entry: entry.fetched_at):
+                stale += self._add(entry.path.stem, entry)
+            await self._remove(stale + self._evict())
+
+    def _scan(self) -> List[CachedImage]:
+        if not self.directory.exists():
+            return []
+        found = []
+        for path in self.directory.glob("*/*"):
+            if path.suffix not in SUFFIX_CONTENT_TYPES:
+                # 中断写入留下的临时文件
+                path.unlink(missing_ok=True)
+                continue
+            stat = path.stat()
+            found.append(
+                CachedImage(
+                    path, stat.st_size, SUFFIX_CONTENT_TYPES[path.suffix], stat.st_mtime
+                )
+            )
+        return found
+
+    def _add(self, digest: str, entry: CachedImage) -> List[Path]:
+        """Track ``entry``; returns the file it replaced, to be removed."""
+        previous = self._entries.pop(digest, None)
+        self._entries[digest] = entry
+        self.total_bytes += entry.size
+        if previous is None:
+            return []
+        self.total_bytes -= previous.size
+        return [previous.path] if previous.path != entry.path else []
+
+    def _evict(self) -> List[Path]:
+        """Drop the least recently used entries; returns their files."""
+        evicted = []
+        while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+            _, entry = self._entries.popitem(last=False)
+            self.total_bytes -= entry.size
+            evicted.append(entry.path)
+        IMAGE_CACHE_BYTES.set(self.total_bytes)
+        return evicted
+
+    async def _remove(self, paths: List[Path]):
+        if paths:
+            await asyncio.to_thread(remove_files, paths)
+
+    async def get(self, digest: str) -> Optional[CachedImage]:
+        """The cached image, without touching the disk on a hit.
+
+        An entry whose file another process has evicted is noticed when it
+        is served, see ``discard``.
+        """
+        await self.load()
+        entry = self._entries.get(digest)
+        if entry is None:
+            # 其他进程可能已经缓存了这张图片
+            entry = await asyncio.to_thread(self._find, digest)
+            if entry is None:
+                return None
+            await self.add(digest, entry)
+        if digest in self._entries:
+            self._entries.move_to_end(digest)
+        return entry
+
+    def discard(self, entry: CachedImage):
+        """Forget ``entry`` after its file turned out to be gone."""
+        digest = entry.path.stem
+        if self._entries.get(digest) == entry:
+            del self._entries[digest]
+            self.total_bytes -= entry.size
+            IMAGE_CACHE_BYTES.set(self.total_bytes)
+
+    def _find(self, digest: str) -> Optional[CachedImage]:
+        for suffix, content_type in SUFFIX_CONTENT_TYPES.items():
+            path = self.directory / digest[:2] / f"{digest}{suffix}"
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            return CachedImage(path, stat.st_size, content_type, stat.st_mtime)
+        return None
+
+    def write(self, digest: str, data: bytes, content_type: str) -> CachedImage:
+        """Write an image file in a thread; then ``add`` the result."""
+        path = (
+            self.directory
+            / digest[:2]
+            / f"{digest}{CONTENT_TYPE_SUFFIXES[content_type]}"
+        )
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # 先写临时文件再改名，读者不会读到半个文件
+        temp = path.with_suffix(f".{os.getpid()}.tmp")
+        temp.write_bytes(data)
+        temp.replace(path)
+        return CachedImage(path, len(data), content_type, time.time())
+
+    async def add(self, digest: str, entry: CachedImage):
+        await self.load()
+        stale = self._add(digest, entry)
+        await self._remove(stale + self._evict())
+
+
+def remove_files(paths: List[Path]):
+    for path in paths:
+        path.unlink(missing_ok=True)
+
+
+class ImageProxy:
+    def __init__(self, cache: ImageCache):
+        self.cache = cache
+        self._session: Optional["aiohttp.ClientSession"] = None
+
+    async def avatar(self, username: str, size: int) -> CachedImage:
+        url = f"{Settings.app.IMAGE_AVATAR_ORIGIN}/{username}.png?size={size}"
+        return await self._get("avatar", url, size, Settings.app.IMAGE_AVATAR_TTL)
+
+    async def open_graph(
+        self, version: str, username: str, repository_name: str
+    ) -> CachedImage:
+        url = f"{Settings.app.IMAGE_OG_ORIGIN}/{version}/{username}/{repository_name}"
+        # 地址中带版本号，缓存的图片不会过期
+        return await self._get("og", url, Settings.app.IMAGE_OG_WIDTH, None)
+
+    async def _get(
+        self, kind: str, url: str, width: int, ttl: Optional[float]
+    ) -> CachedImage:
+        digest = hashlib.sha256(f"{url} {width}".encode("utf-8")).hexdigest()
+        entry = await self.cache.get(digest)
+        if entry is not None and (ttl is None or time.time() - entry.fetched_at < ttl):
+            CACHE_REQUESTS.inc("image", "hit")
+            return entry
+        CACHE_REQUESTS.inc("image", "miss")
+
+        async def fill() -> CachedImage:
+            try:
+                return await self._fetch(kind, digest, url, width)
+            except ImageUnavailable as e:
+                if entry is None or e.status == 404:
+                    raise
+                logging.error(f"Serving a stale image: {e}")
+                return entry
+
+        return await single_flight.do(
+            ("image", digest), fill, Settings.app.SINGLE_FLIGHT_TIMEOUT
+        )
+
+    async def _fetch(self, kind: str, digest: str, url: str, width: int) -> CachedImage:
+        import aiohttp
+
+        if self._session is None:
+            self._session = aiohttp.ClientSession()
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            async with self._session.get(
+                url, timeout=aiohttp.ClientTimeout(total=Settings.app.IMAGE_TIMEOUT)
+            ) as resp:
+                if resp.status != 200:
+                    raise ImageUnavailable(url, f"HTTP {resp.status}", resp.status)
+                if resp.content_type not in CONTENT_TYPE_SUFFIXES:
+                    raise ImageUnavailable(url, f"unexpected {resp.content_type}")
+                if (resp.content_length or 0) > Settings.app.IMAGE_MAX_BYTES:
+                    raise ImageUnavailable(url, "image too large")
+                data = await resp.read()
+                content_type = resp.content_type
+            if len(data) > Settings.app.IMAGE_MAX_BYTES:
+                raise ImageUnavailable(url, "image too large")
+            outcome = "ok"
+        except asyncio.TimeoutError as e:
+            raise ImageUnavailable(url, "request timed out") from e
+        except aiohttp.ClientError as e:
+            raise ImageUnavailable(url, f"{type(e).__name__}: {e}") from e
+        finally:
+            IMAGE_FETCH_SECONDS.observe(time.perf_counter() - started, kind, outcome)
+
+        try:
+            data, content_type = await asyncio.to_thread(
+                resize_image, data, content_type, width
+            )
+        except Exception as e:
+            # 无法解码时原样缓存，交给浏览器处理
+            logging.error(f"Error resizing {url}: {e}")
+        entry = await asyncio.to_thread(self.cache.write, digest, data, content_type)
+        await self.cache.add(digest, entry)
+        return entry
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+# 创建全局图片代理实例
+image_proxy = ImageProxy(
+    ImageCache(Settings.app.IMAGE_CACHE_DIR, Settings.app.IMAGE_CACHE_MAX_BYTES)
+)
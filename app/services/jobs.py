@@ -0,0 +1,348 @@
+"""Jobs
+===================
+Durable refresh jobs stored in the database.
+
+Every job has an idempotency key (enqueueing the same key twice is a
+no-op), a lease that its worker keeps renewing while it runs, and an
+attempt counter. A job whose lease expires, because its worker died or
+was redeployed, is picked up again by any other worker. Completed results
+stay in the table so a restarted refresh resumes where it stopped, until
+the retention job removes them after ``RETENTION_JOB_DAYS``.
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import time
+from contextlib import asynccontextmanager
+from datetime import UTC, datetime, timedelta
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict, List, Optional
+from uuid import uuid4
+
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import Settings
+from app.database import get_session
+from app.enums import JobKind, JobStatus
+from app.models import RefreshJob
+from app.services.metrics import JOB_SECONDS
+from app.services.tracing import tracer
+
+TERMINAL_STATUSES = (JobStatus.done, JobStatus.failed)
+
+
+class JobNotReady(Exception):
+    """Raised by a handler whose inputs are not finished yet. The job is put
+    back without counting an attempt.
+    """
+
+    def __init__(self, delay: float = 2.0):
+        super().__init__(f"job not ready, retry in {delay}s")
+        self.delay = delay
+
+
+JobHandler = Callable[[RefreshJob], Awaitable[Optional[Dict[str, Any]]]]
+
+
+class JobQueue:
+    def __init__(self):
+        self.lease_ttl = Settings.app.JOB_LEASE_TTL
+        self._enqueued = asyncio.Event()
+        # 每次有任务结束时置位并换成新的事件，唤醒本进程内等待结果的协程
+        self._finished = asyncio.Event()
+
+    async def enqueue(
+        self,
+        session: AsyncSession,
+        kind: JobKind,
+        key: str,
+        payload: Dict[str, Any],
+        max_attempts: int = 3,
+    ):
+        """Add a job unless one with the same idempotency key exists.
+
+        The insert joins the caller's transaction and is visible to workers
+        once the caller commits.
+        """
+        values = dict(
+            kind=kind,
+            idempotency_key=key,
+            payload=payload,
+            status=JobStatus.pending,
+            attempts=0,
+            max_attempts=max_attempts,
+            run_after=datetime.now(UTC),
+            created_at=datetime.now(UTC),
+            updated_at=datetime.now(UTC),
+        )
+        if session.bind.dialect.name == "postgresql":
+            statement = postgresql_insert(RefreshJob).values(**values)
+        else:
+            statement = sqlite_insert(RefreshJob).values(**values)
+        await session.execute(
+            statement.on_conflict_do_nothing(index_elements=["idempotency_key"])
+        )
+        self._enqueued.set()
+
+    async def get(self, session: AsyncSession, key: str) -> Optional[RefreshJob]:
+        result = await session.execute(
+            select(RefreshJob).where(RefreshJob.idempotency_key == key)
+        )
+        return result.scalar_one_or_none()
+
+    async def get_many(
+        self, session: AsyncSession, keys: List[str]
+    ) -> Dict[str, RefreshJob]:
+        if not keys:
+            return {}
+        result = await session.execute(
+            select(RefreshJob).where(
+                RefreshJob.idempotency_key.in_(keys)  # type: ignore
+            )
+        )
+        return {job.idempotency_key: job for job in result.scalars().all()}
+
+    async def find_active(
+        self, session: AsyncSession, key_prefix: str
+    ) -> Optional[RefreshJob]:
+        """Return the oldest unfinished job whose key starts with the prefix."""
+        result = await session.execute(
+            select(RefreshJob)
+            .where(
+                RefreshJob.idempotency_key.startswith(key_prefix),  # type: ignore
+                RefreshJob.status.not_in(TERMINAL_STATUSES),  # type: ignore
+            )
+            .order_by(RefreshJob.id)  # type: ignore
+            .limit(1)
+        )
+        return result.scalar_one_or_none()
+
+    async def claim(self, owner: str) -> Optional[RefreshJob]:
+        """Lease the oldest runnable job, pending or with an expired lease."""
+        now = datetime.now(UTC)
+        runnable = or_(
+            and_(RefreshJob.status == JobStatus.pending, RefreshJob.run_after <= now),
+            and_(
+                RefreshJob.status == JobStatus.running,
+                RefreshJob.lease_expires_at < now,
+            ),
+        )
+        async with get_session() as session:
+            result = await session.execute(
+                select(RefreshJob.id)
+                .where(runnable)
+                .order_by(RefreshJob.id)  # type: ignore
+                .limit(8)
+            )
+            for job_id in result.scalars().all():
+                # 条件更新，多个进程同时认领时只有一个成功
+                claimed = await session.execute(
+                    update(RefreshJob)
+                    .where(RefreshJob.id == job_id, runnable)
+                    .values(
+                        status=JobStatus.running,
+                        lease_owner=owner,
+                        lease_expires_at=now + timedelta(seconds=self.lease_ttl),
+                        attempts=RefreshJob.attempts + 1,
+                        updated_at=now,
+                    )
+                )
+                await session.commit()
+                if claimed.rowcount:
+                    return await session.get(RefreshJob, job_id)
+        return None
+
+    async def _finish(self, job: RefreshJob, owner: str, **values):
+        async with get_session() as session:
+            await session.execute(
+                update(RefreshJob)
+                .where(RefreshJob.id == job.id, RefreshJob.lease_owner == owner)
+                .values(
+                    lease_owner=None,
+                    lease_expires_at=None,
+                    updated_at=datetime.now(UTC),
+                    **values,
+                )
+            )
+            await session.commit()
+        self._finished.set()
+        self._finished = asyncio.Event()
+
+    async def renew(self, job: RefreshJob, owner: str):
+        async with get_session() as session:
+            await session.execute(
+                update(RefreshJob)
+                .where(RefreshJob.id == job.id, RefreshJob.lease_owner == owner)
+                .values(
+                    lease_expires_at=datetime.now(UTC)
+                    + timedelta(seconds=self.lease_ttl)
+                )
+            )
+            await session.commit()
+
+    async def complete(
+        self, job: RefreshJob, owner: str, result: Optional[Dict[str, Any]]
+    ):
+        await self._finish(job, owner, status=JobStatus.done, result=result or {})
+
+    async def fail(
+        self,
+        job: RefreshJob,
+        owner: str,
+        error: str,
+        retry_after: Optional[float] = None,
+    ):
+        """Put the job back with exponential backoff, or give up on it.
+
+        ``retry_after`` (e.g. from a throttled HTTP response) is the least
+        delay before the next attempt.
+        """
+        if job.attempts >= job.max_attempts:
+            await self._finish(job, owner, status=JobStatus.failed, last_error=error)
+            return
+        delay = min(
+            Settings.app.RETRY_DELAY * 2 ** (job.attempts - 1),
+            Settings.app.MAX_RETRY_DELAY,
+        )
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        await self._finish(
+            job,
+            owner,
+            status=JobStatus.pending,
+            run_after=datetime.now(UTC) + timedelta(seconds=delay),
+            last_error=error,
+        )
+
+    async def defer(self, job: RefreshJob, owner: str, delay: float):
+        await self._finish(
+            job,
+            owner,
+            status=JobStatus.pending,
+            run_after=datetime.now(UTC) + timedelta(seconds=delay),
+            attempts=job.attempts - 1,
+        )
+
+    async def wait(self, key: str, poll_interval: float = 1.0) -> RefreshJob:
+        """Wait until the job with ``key`` is done or has failed for good.
+
+        Jobs finished by this process wake the waiter at once, jobs run by
+        other processes are noticed within ``poll_interval``.
+        """
+        while True:
+            finished = self._finished
+            async with get_session() as session:
+                job = await self.get(session, key)
+            if job is not None and job.status in TERMINAL_STATUSES:
+                return job
+            try:
+                await asyncio.wait_for(finished.wait(), timeout=poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def wait_for_work(self, timeout: float):
+        try:
+            await asyncio.wait_for(self._enqueued.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._enqueued.clear()
+
+
+class JobWorker:
+    """Claims and runs jobs with ``JOB_CONCURRENCY`` concurrent loops."""
+
+    def __init__(self, queue: JobQueue, handlers: Dict[JobKind, JobHandler]):
+        self.queue = queue
+        self.handlers = handlers
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"
+        self.concurrency = Settings.app.JOB_CONCURRENCY
+        # 没有可领取的任务时的轮询间隔，也是发布任务等待输入的重试间隔
+        self.poll_interval = Settings.app.JOB_POLL_INTERVAL
+        self.is_running = False
+
+    async def run(self):
+        self.is_running = True
+        await asyncio.gather(*(self._loop() for _ in range(self.concurrency)))
+
+    def stop(self):
+        self.is_running = False
+
+    @asynccontextmanager
+    async def running(self) -> AsyncGenerator[None, None]:
+        """Run the worker for the duration of the block unless it already is."""
+        if self.is_running:
+            yield
+            return
+        task = asyncio.create_task(self.run())
+        try:
+            yield
+        finally:
+            self.stop()
+            await task
+
+    async def _loop(self):
+        while self.is_running:
+            try:
+                job = await self.queue.claim(self.owner)
+            except Exception as e:
+                logging.error(f"Error claiming refresh job: {e}")
+                job = None
+            if job is None:
+                await self.queue.wait_for_work(self.poll_interval)
+                continue
+            try:
+                await self._execute(job)
+            except Exception as e:
+                # 记录结果时出错（例如数据库被锁），租约过期后任务会被重新领取
+                logging.error(f"Error recording refresh job {job.idempotency_key}: {e}")
+
+    async def _execute(self, job: RefreshJob):
+        if job.attempts > job.max_attempts:
+            # 租约多次过期仍未完成，放弃该任务
+            await self.queue.fail(job, self.owner, "lease expired too many times")
+            return
+
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        started = time.perf_counter()
+        outcome = "done"
+        try:
+            result = await self.handlers[job.kind](job)
+        except JobNotReady as e:
+            outcome = "not_ready"
+            await self.queue.defer(job, self.owner, e.delay)
+        except Exception as e:
+            outcome = "error"
+            logging.error(
+                f"Error running job {job.idempotency_key} "
+                f"(attempt {job.attempts}/{job.max_attempts}): {e}"
+            )
+            await self.queue.fail(
+                job, self.owner, str(e), getattr(e, "retry_after", None)
+            )
+        else:
+            await self.queue.complete(job, self.owner, result)
+        finally:
+            heartbeat.cancel()
+            ended = time.perf_counter()
+            JOB_SECONDS.observe(ended - started, job.kind.value, outcome)
+            tracer.add(
+                job.kind.value,
+                "job",
+                started,
+                ended,
+                key=job.idempotency_key,
+                attempt=job.attempts,
+                outcome=outcome,
+            )
+
+    async def _heartbeat(self, job: RefreshJob):
+        while True:
+            await asyncio.sleep(self.queue.lease_ttl / 3)
+            try:
+                await self.queue.renew(job, self.owner)
+            except Exception as e:
+                logging.error(f"Error renewing lease of {job.idempotency_key}: {e}")
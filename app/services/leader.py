@@ -0,0 +1,176 @@
+"""Leader election
+===================
+Exactly one process (a web worker or ``python -m app.worker``) runs the
+``TrendingScheduler`` at a time. It holds a lease row in the database and
+renews it every third of ``LEADER_LEASE_TTL``. When the holder dies, the
+lease expires and another process takes over.
+"""
+
+import asyncio
+import logging
+import os
+import socket
+from datetime import UTC, datetime, timedelta
+from uuid import uuid4
+
+from sqlalchemy import delete, or_, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app.config import Settings
+from app.database import get_session
+from app.enums import AllowedDateRanges, AllowedTrendingKinds
+from app.models import RefreshRequest, SchedulerLease
+from app.services.scheduler import TrendingScheduler
+
+
+class LeaderElector:
+    def __init__(self, name: str = "scheduler"):
+        self.name = name
+        self.ttl = Settings.app.LEADER_LEASE_TTL
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"
+        self.is_leader = False
+        self.is_running = False
+        self._stopped = asyncio.Event()
+
+    async def acquire(self) -> bool:
+        """Take or renew the lease, return whether this process holds it."""
+        now = datetime.now(UTC)
+        expires_at = now + timedelta(seconds=self.ttl)
+        async with get_session() as session:
+            result = await session.execute(
+                update(SchedulerLease)
+                .where(
+                    SchedulerLease.name == self.name,
+                    or_(
+                        SchedulerLease.holder == self.holder,
+                        SchedulerLease.expires_at < now,
+                    ),
+                )
+                .values(holder=self.holder, expires_at=expires_at)
+            )
+            if result.rowcount:
+                await session.commit()
+                return True
+
+            session.add(
+                SchedulerLease(
+                    name=self.name, holder=self.holder, expires_at=expires_at
+                )
+            )
+            try:
+                await session.commit()
+            except IntegrityError:
+                # 租约被其他进程持有
+                await session.rollback()
+                return False
+            return True
+
+    async def release(self):
+        async with get_session() as session:
+            await session.execute(
+                delete(SchedulerLease).where(
+                    SchedulerLease.name == self.name,
+                    SchedulerLease.holder == self.holder,
+                )
+            )
+            await session.commit()
+
+    async def run(self, scheduler: TrendingScheduler):
+        """Keep competing for the lease and run ``scheduler`` while leading."""
+        self.is_running = True
+        self._stopped.clear()
+        task: asyncio.Task | None = None
+        try:
+            while self.is_running:
+                try:
+                    self.is_leader = await self.acquire()
+                except Exception as e:
+                    logging.error(f"Error renewing scheduler lease: {e}")
+                    self.is_leader = False
+
+                if self.is_leader and (task is None or task.done()):
+                    logging.info(f"{self.holder} is now running the scheduler")
+                    task = asyncio.create_task(scheduler.start())
+                elif not self.is_leader and task is not None:
+                    logging.warning(f"{self.holder} lost the scheduler lease")
+                    scheduler.stop()
+                    task.cancel()
+                    task = None
+
+                if self.is_leader:
+                    await self._drain_refresh_requests(scheduler)
+
+                try:
+                    await asyncio.wait_for(self._stopped.wait(), timeout=self.ttl / 3)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            if task is not None:
+                scheduler.stop()
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+            if self.is_leader:
+                self.is_leader = False
+                await self.release()
+
+    def stop(self):
+        self.is_running = False
+        self._stopped.set()
+
+    async def request_refresh(
+        self,
+        scheduler: TrendingScheduler,
+        kind: AllowedTrendingKinds | None = None,
+        since: AllowedDateRanges | None = None,
+    ) -> dict[str, list[str]]:
+        """Trigger a refresh on whichever process holds the lease."""
+        if self.is_leader:
+            return scheduler.request_refresh(kind=kind, since=since)
+
+        slices = [
+            refresh_slice
+            for refresh_slice in scheduler.slices.values()
+            if (not kind or refresh_slice.kind == kind)
+            and (not since or refresh_slice.since == since)
+        ]
+        queued, coalesced = [], []
+        async with get_session() as session:
+            result = await session.execute(select(RefreshRequest.key))
+            pending = set(result.scalars().all())
+            for refresh_slice in slices:
+                if refresh_slice.key in pending:
+                    coalesced.append(refresh_slice.key)
+                    continue
+                session.add(
+                    RefreshRequest(
+                        key=refresh_slice.key,
+                        kind=refresh_slice.kind,
+                        since=refresh_slice.since,
+                    )
+                )
+                queued.append(refresh_slice.key)
+            try:
+                await session.commit()
+            except IntegrityError:
+                # 其他进程刚刚写入了相同的请求
+                await session.rollback()
+                return {"queued": [], "coalesced": queued + coalesced}
+        return {"queued": queued, "coalesced": coalesced}
+
+    async def _drain_refresh_requests(self, scheduler: TrendingScheduler):
+        try:
+            async with get_session() as session:
+                result = await session.execute(select(RefreshRequest))
+                requests = result.scalars().all()
+                if not requests:
+                    return
+                for request in requests:
+                    scheduler.request_refresh(kind=request.kind, since=request.since)
+                    await session.delete(request)
+                await session.commit()
+        except Exception as e:
+            logging.error(f"Error reading forwarded refresh requests: {e}")
+
+
+# 创建全局选主实例
+leader = LeaderElector()
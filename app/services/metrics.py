@@ -0,0 +1,387 @@
+"""Metrics
+===================
+A small metrics registry rendered in the Prometheus text format at
+``/metrics``.
+
+Recording is a dictionary update on the hot path. With several processes
+(web workers, ``python -m app.worker``), set ``METRICS_DIR`` to a directory
+they share: each process periodically dumps its values to a file there and
+``/metrics`` adds up the files of all live processes.
+"""
+
+import asyncio
+import bisect
+import json
+import logging
+import os
+import socket
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+from app.config import Settings
+
+LabelValues = Tuple[str, ...]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+def _key(labels: LabelValues) -> str:
+    # 标签值序列化为 JSON 数组，作为跨进程合并时的键
+    return json.dumps(labels)
+
+
+class Counter:
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def dump(self) -> dict:
+        return {_key(labels): value for labels, value in self._values.items()}
+
+    @staticmethod
+    def merge(total: dict, dumped: dict):
+        for key, value in dumped.items():
+            total[key] = total.get(key, 0.0) + value
+
+    def render(self, merged: dict) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, json.loads(key))} {value}"
+            for key, value in sorted(merged.items())
+        ]
+
+
+class Histogram:
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # 每组标签: [各桶计数..., 超出最大桶的计数, 总和, 次数]
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, *labels: str):
+        state = self._values.get(labels)
+        if state is None:
+            state = self._values[labels] = [0.0] * (len(self.buckets) + 3)
+        state[bisect.bisect_left(self.buckets, value)] += 1
+        state[-2] += value
+        state[-1] += 1
+
+    @contextmanager
+    def time(self, *labels: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def dump(self) -> dict:
+        return {_key(labels): list(state) for labels, state in self._values.items()}
+
+    @staticmethod
+    def merge(total: dict, dumped: dict):
+        for key, state in dumped.items():
+            if key in total:
+                total[key] = [a + b for a, b in zip(total[key], state)]
+            else:
+                total[key] = list(state)
+
+    def render(self, merged: dict) -> List[str]:
+        lines = []
+        for key, state in sorted(merged.items()):
+            labels = json.loads(key)
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (float("inf"),), state):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                lines.append(
+                    f"{self.name}_bucket"
+                    f"{_format_labels(self.labelnames + ('le',), labels + [le])} {cumulative}"
+                )
+            lines.append(
+                f"{self.name}_sum{_format_labels(self.labelnames, labels)} {state[-2]}"
+            )
+            lines.append(
+                f"{self.name}_count{_format_labels(self.labelnames, labels)} {state[-1]}"
+            )
+        return lines
+
+
+class Gauge:
+    """A value that is set rather than added up.
+
+    Across processes the most recently set value wins, since gauges here
+    describe shared state (the database) measured by whichever process
+    holds the scheduler lease.
+    """
+
+    type = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        # 每组标签: [值, 设置时间]
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def set(self, value: float, *labels: str):
+        self._values[labels] = [float(value), time.time()]
+
+    def dump(self) -> dict:
+        return {_key(labels): list(state) for labels, state in self._values.items()}
+
+    @staticmethod
+    def merge(total: dict, dumped: dict):
+        for key, state in dumped.items():
+            if key not in total or state[1] > total[key][1]:
+                total[key] = list(state)
+
+    def render(self, merged: dict) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, json.loads(key))} {state[0]}"
+            for key, state in sorted(merged.items())
+        ]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics: Dict[str, Counter | Histogram | Gauge] = {}
+        self.directory = (
+            Path(Settings.app.METRICS_DIR) if Settings.app.METRICS_DIR else None
+        )
+        self.process = f"{socket.gethostname()}-{os.getpid()}"
+        self.is_running = False
+        self._stopped = asyncio.Event()
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def _register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def dump(self) -> dict:
+        return {name: metric.dump() for name, metric in self.metrics.items()}
+
+    def flush(self):
+        """Write this process's values to ``METRICS_DIR``."""
+        if self.directory is None:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        target = self.directory / f"{self.process}.json"
+        temporary = target.with_suffix(".tmp")
+        temporary.write_text(json.dumps(self.dump()))
+        os.replace(temporary, target)
+
+    def _collect(self) -> List[dict]:
+        if self.directory is None:
+            return [self.dump()]
+        self.flush()
+        dumps = []
+        hostname = socket.gethostname()
+        for path in self.directory.glob("*.json"):
+            host, _, pid = path.stem.rpartition("-")
+            if host == hostname and not _is_alive(int(pid)):
+                # 已退出进程的数据不再计入
+                path.unlink(missing_ok=True)
+                continue
+            try:
+                dumps.append(json.loads(path.read_text()))
+            except (OSError, ValueError):
+                continue
+        return dumps
+
+    def render(self) -> str:
+        merged: Dict[str, dict] = {name: {} for name in self.metrics}
+        for dumped in self._collect():
+            for name, values in dumped.items():
+                if name in self.metrics:
+                    self.metrics[name].merge(merged[name], values)
+
+        lines = []
+        for name, metric in self.metrics.items():
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.type}")
+            lines.extend(metric.render(merged[name]))
+        return "\n".join(lines) + "\n"
+
+    async def run(self):
+        """Flush periodically so processes without HTTP are scraped too."""
+        if self.directory is None:
+            return
+        self.is_running = True
+        self._stopped.clear()
+        while self.is_running:
+            try:
+                await asyncio.wait_for(
+                    self._stopped.wait(), timeout=Settings.app.METRICS_FLUSH_INTERVAL
+                )
+            except asyncio.TimeoutError:
+                pass
+            try:
+                self.flush()
+            except OSError as e:
+                logging.error(f"Error writing metrics: {e}")
+
+    def stop(self):
+        self.is_running = False
+        self._stopped.set()
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes up a sleeping task.
+
+    A blocked loop (CPU-bound parsing, rendering, a synchronous call) delays
+    every request served by this process by the same amount.
+    """
+
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+        self.is_running = False
+        self._stopped = asyncio.Event()
+
+    async def run(self):
+        interval = Settings.app.LOOP_LAG_INTERVAL
+        self.is_running = True
+        self._stopped.clear()
+        while self.is_running:
+            expected = time.perf_counter() + interval
+            try:
+                await asyncio.wait_for(self._stopped.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+            self.histogram.observe(max(time.perf_counter() - expected, 0.0))
+
+    def stop(self):
+        self.is_running = False
+        self._stopped.set()
+
+
+def _is_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+# 全局指标注册表
+metrics = MetricsRegistry()
+
+HTTP_REQUEST_SECONDS = metrics.histogram(
+    "github_request_seconds", "Latency of requests to GitHub", ["outcome"]
+)
+HTTP_RESPONSE_BYTES = metrics.counter(
+    "github_response_bytes_total", "Bytes of GitHub response bodies"
+)
+HTTP_FAILURES = metrics.counter(
+    "github_request_failures_total", "Failed requests to GitHub", ["reason"]
+)
+HTTP_RETRIES = metrics.counter(
+    "github_request_retries_total", "Retried requests to GitHub", ["reason"]
+)
+PARSE_SECONDS = metrics.histogram(
+    "trending_parse_seconds", "Time to parse a trending page", ["kind"]
+)
+LLM_REQUEST_SECONDS = metrics.histogram(
+    "llm_request_seconds", "Latency of LLM calls", ["call"]
+)
+LLM_TOKENS = metrics.counter(
+    "llm_tokens_total", "Tokens used by LLM calls", ["call", "type"]
+)
+LLM_ERRORS = metrics.counter("llm_errors_total", "Failed LLM calls", ["call"])
+DB_STATEMENTS = metrics.counter("db_statements_total", "Executed SQL statements")
+DB_COMMIT_SECONDS = metrics.histogram(
+    "db_commit_seconds", "Time to flush and commit a session"
+)
+REFRESH_SECONDS = metrics.histogram(
+    "refresh_slice_seconds",
+    "Duration of a slice refresh",
+    ["kind", "since", "outcome"],
+    buckets=(1, 5, 10, 30, 60, 120, 300, 600, 1200, 3600),
+)
+JOB_SECONDS = metrics.histogram(
+    "refresh_job_seconds",
+    "Duration of a refresh job",
+    ["kind", "outcome"],
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300),
+)
+RENDER_SECONDS = metrics.histogram(
+    "render_seconds", "Time to render a page or feed", ["kind"]
+)
+CACHE_REQUESTS = metrics.counter(
+    "cache_requests_total", "Cache lookups", ["cache", "result"]
+)
+RETENTION_DELETED = metrics.counter(
+    "retention_deleted_rows_total", "Rows removed by the retention job", ["table"]
+)
+DB_SIZE_BYTES = metrics.gauge("db_size_bytes", "Size of the database")
+DB_FREE_BYTES = metrics.gauge(
+    "db_free_bytes", "Unused pages inside the SQLite database file"
+)
+DB_ROWS = metrics.gauge("db_rows", "Rows per table", ["table"])
+IMAGE_FETCH_SECONDS = metrics.histogram(
+    "image_fetch_seconds", "Latency of image proxy origin requests", ["kind", "outcome"]
+)
+IMAGE_CACHE_BYTES = metrics.gauge("image_cache_bytes", "Size of the image cache")
+SIMILARITY_SECONDS = metrics.histogram(
+    "similarity_seconds",
+    "Time to sync the similarity index or look up neighbors",
+    ["step"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5, 30),
+)
+SIMILARITY_DOCUMENTS = metrics.gauge(
+    "similarity_documents", "Repositories in the similarity index"
+)
+LOOP_LAG_SECONDS = metrics.histogram(
+    "event_loop_lag_seconds",
+    "Delay of the event loop waking up a sleeping task",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1),
+)
+
+# 事件循环延迟监控
+loop_lag = LoopLagMonitor(LOOP_LAG_SECONDS)
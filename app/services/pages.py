@@ -0,0 +1,139 @@
+"""Pages
+===================
+Rendering of the index page, shared by the live app and the static export.
+
+Templates never build links themselves, they call the ``urls`` object in
+their context: ``SiteUrls`` produces the query-string links of the live app
+and ``StaticSiteUrls`` the file paths written by ``python -m app.export``.
+"""
+
+import hashlib
+from typing import Mapping, Optional
+from urllib.parse import quote, urlencode
+
+from fastapi.templating import Jinja2Templates
+from jinja2 import FileSystemBytecodeCache
+
+from app.config import Settings
+from app.enums import AllowedDateRanges
+from app.services.read_model import TrendingSnapshot
+from app.services.translation import is_primary_language
+
+# 配置模板，编译结果缓存到临时目录，重启后冷渲染更快
+templates = Jinja2Templates(directory="app/templates")
+templates.env.bytecode_cache = FileSystemBytecodeCache()
+
+
+class SiteUrls:
+    """Links of the live app."""
+
+    def _query(self, tag: Optional[str], lang: Optional[str]) -> dict:
+        query = {}
+        if tag:
+            query["tag"] = tag
+        if lang and len(Settings.ai.SUMMARY_LANGUAGES) > 1:
+            query["lang"] = lang
+        return query
+
+    def page(
+        self,
+        since: AllowedDateRanges,
+        tag: Optional[str] = None,
+        lang: Optional[str] = None,
+    ) -> str:
+        return "/?" + urlencode({"since": since.value, **self._query(tag, lang)})
+
+    def feed(
+        self,
+        since: AllowedDateRanges,
+        tag: Optional[str] = None,
+        lang: Optional[str] = None,
+    ) -> str:
+        query = urlencode(self._query(tag, lang))
+        return f"/api/trending/repositories/{since.value}" + (
+            f"?{query}" if query else ""
+        )
+
+    def static(self, path: str) -> str:
+        return f"/static/{path}"
+
+    def avatar(self, username: str, size: int) -> str:
+        return f"/img/avatar/{quote(username)}?size={size}"
+
+
+class StaticSiteUrls(SiteUrls):
+    """Links between the files of a static export.
+
+    ``assets`` maps each static file to its content-hashed name.
+    """
+
+    def __init__(self, assets: Mapping[str, str]):
+        self.assets = assets
+
+    def directory(self, since: AllowedDateRanges, lang: Optional[str] = None) -> str:
+        path = f"{since.value}/"
+        if lang and not is_primary_language(lang):
+            path += f"lang/{lang}/"
+        return path
+
+    def tag_segment(self, tag: str) -> str:
+        """File name of a tag directory, ``/`` and leading dots would escape
+        the directory. A tag that had to be changed gets a hash of the
+        original appended, so ``a/b`` and ``a-b`` stay apart.
+        """
+        segment = tag.replace("/", "-").lstrip(".")
+        if segment == tag:
+            return segment
+        digest = hashlib.sha256(tag.encode("utf-8")).hexdigest()[:8]
+        return f"{segment}-{digest}" if segment else digest
+
+    def page(
+        self,
+        since: AllowedDateRanges,
+        tag: Optional[str] = None,
+        lang: Optional[str] = None,
+    ) -> str:
+        path = "/" + quote(self.directory(since, lang))
+        if tag:
+            path += f"tag/{quote(self.tag_segment(tag), safe='')}/"
+        return path
+
+    def feed(
+        self,
+        since: AllowedDateRanges,
+        tag: Optional[str] = None,
+        lang: Optional[str] = None,
+    ) -> str:
+        # 静态导出不按标签生成 feed
+        return "/" + quote(self.directory(since, lang)) + "feed.xml"
+
+    def static(self, path: str) -> str:
+        return f"/static/{self.assets.get(path, path)}"
+
+    def avatar(self, username: str, size: int) -> str:
+        # 静态导出没有图片代理，直接请求 GitHub 给定尺寸的头像
+        return f"https://github.com/{quote(username)}.png?size={size}"
+
+
+live_urls = SiteUrls()
+
+
+def render_index(
+    snapshot: TrendingSnapshot,
+    tag: Optional[str],
+    lang: str,
+    urls: SiteUrls = live_urls,
+) -> str:
+    return templates.get_template("index.html").render(
+        {
+            "repositories": snapshot.repositories_for(tag),
+            "since": snapshot.since,
+            "tag": tag,
+            "lang": lang,
+            "languages": Settings.ai.SUMMARY_LANGUAGES,
+            "date_ranges": list(AllowedDateRanges),
+            "translations": snapshot.translations_for(lang),
+            "related": snapshot.related,
+            "urls": urls,
+        }
+    )
@@ -0,0 +1,62 @@
+"""Parsing
+===================
+Runs the BeautifulSoup parsing of trending pages off the event loop.
+
+``PARSE_EXECUTOR`` selects where:
+
+* ``thread`` (default): a pool of ``PARSE_WORKERS`` threads. Parsing still
+  holds the GIL, but the loop gets it back every switch interval instead
+  of waiting for a whole page.
+* ``process``: a pool of ``PARSE_WORKERS`` processes. Only the filtered
+  article HTML is sent to a worker and only plain records come back, so
+  readers are not slowed down by crawls at all.
+* ``inline``: on the event loop, as before.
+"""
+
+import asyncio
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, List, Optional, TypeVar
+
+from app.config import Settings
+
+T = TypeVar("T")
+
+_executor: Optional[Executor] = None
+
+
+def get_executor() -> Optional[Executor]:
+    """The shared parse pool, created on first use; ``None`` when inline."""
+    global _executor
+    kind = Settings.app.PARSE_EXECUTOR
+    if kind == "inline":
+        return None
+    if _executor is None:
+        if kind == "process":
+            # spawn 启动的子进程不会继承事件循环和数据库连接
+            _executor = ProcessPoolExecutor(
+                max_workers=Settings.app.PARSE_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        else:
+            _executor = ThreadPoolExecutor(
+                max_workers=Settings.app.PARSE_WORKERS,
+                thread_name_prefix="parse",
+            )
+    return _executor
+
+
+async def run_parser(parser: Callable[[str], List[T]], articles_html: str) -> List[T]:
+    """Run ``parser`` (a module-level function) on the filtered article HTML."""
+    executor = get_executor()
+    if executor is None:
+        return parser(articles_html)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, parser, articles_html)
+
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -0,0 +1,283 @@
+"""Profiling
+===================
+Opt-in CPU and memory profiles of single requests and scheduler cycles.
+
+A profile samples the Python stacks of every thread (so work handed to
+``asyncio.to_thread`` is included) and records the top allocation sites
+with ``tracemalloc`` while it runs. Each profile is written to
+``PROFILE_DIR`` as one JSON file; the samples can also be downloaded as
+collapsed stacks for https://www.speedscope.app or ``flamegraph.pl``.
+
+Profiling never runs by accident:
+
+* a request is profiled only when it sends ``X-Profile: <ADMIN_TOKEN>``, or
+  while the admin API has armed profiling for the next few requests;
+* armed profiling expires after ``PROFILE_ARM_TTL`` seconds;
+* a profile stops sampling after ``PROFILE_MAX_SECONDS`` even if the
+  request or cycle is still running;
+* only one profile runs per process at a time, others run unprofiled;
+* only the last ``PROFILE_KEEP`` files are kept.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import secrets
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any, AsyncGenerator, Dict, List, Optional
+
+from app.config import Settings
+from app.enums import ProfileTarget
+
+PROFILE_HEADER = b"x-profile"
+
+# 不通过预约分析的路径：管理接口本身、指标和长连接
+UNPROFILED_PATHS = ("/api/admin", "/metrics", "/api/stream", "/static")
+
+
+class _Sampler(threading.Thread):
+    """Samples the stacks of all other threads until stopped or timed out."""
+
+    def __init__(self, interval: float, max_seconds: float):
+        super().__init__(name="profiler", daemon=True)
+        self.interval = interval
+        self.deadline = time.monotonic() + max_seconds
+        self.samples: Counter[str] = Counter()
+        self.allocations: List[Dict[str, Any]] = []
+        self.peak_memory = 0
+        self.is_truncated = False
+        self._stopped = threading.Event()
+        self._owns_tracemalloc = not tracemalloc.is_tracing()
+        if self._owns_tracemalloc:
+            tracemalloc.start()
+        else:
+            tracemalloc.reset_peak()
+
+    def run(self):
+        own = threading.get_ident()
+        names: Dict[int, str] = {}
+        while not self._stopped.wait(self.interval):
+            if time.monotonic() > self.deadline:
+                self.is_truncated = True
+                break
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                if ident not in names:
+                    names = {t.ident: t.name for t in threading.enumerate()}  # type: ignore
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(
+                        f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})"
+                    )
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.samples[";".join(reversed(stack))] += 1
+        self._snapshot_memory()
+
+    def _snapshot_memory(self):
+        _, self.peak_memory = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            (
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            )
+        )
+        if self._owns_tracemalloc:
+            tracemalloc.stop()
+        self.allocations = [
+            {"location": str(stat.traceback), "size": stat.size, "count": stat.count}
+            for stat in snapshot.statistics("lineno")[: Settings.app.PROFILE_TOP]
+        ]
+
+    def stop(self):
+        self._stopped.set()
+
+
+@dataclass
+class ArmedProfiling:
+    target: ProfileTarget
+    remaining: int
+    expires_at: float
+
+
+class Profiler:
+    def __init__(self):
+        self.directory = Path(Settings.app.PROFILE_DIR)
+        self.keep = Settings.app.PROFILE_KEEP
+        self.armed: Dict[ProfileTarget, ArmedProfiling] = {}
+        self._lock = threading.Lock()
+        self._is_busy = False
+
+    def arm(self, target: ProfileTarget, count: int = 1) -> ArmedProfiling:
+        """Profile the next ``count`` requests or scheduler cycles."""
+        self.armed[target] = ArmedProfiling(
+            target=target,
+            remaining=count,
+            expires_at=time.monotonic() + Settings.app.PROFILE_ARM_TTL,
+        )
+        return self.armed[target]
+
+    def disarm(self):
+        self.armed.clear()
+
+    def status(self) -> List[dict]:
+        now = time.monotonic()
+        return [
+            {
+                "target": armed.target,
+                "remaining": armed.remaining,
+                "expires_in": armed.expires_at - now,
+            }
+            for armed in self.armed.values()
+            if armed.expires_at > now
+        ]
+
+    def _take(self, target: ProfileTarget) -> bool:
+        armed = self.armed.get(target)
+        if armed is None:
+            return False
+        if armed.expires_at < time.monotonic():
+            del self.armed[target]
+            return False
+        armed.remaining -= 1
+        if armed.remaining <= 0:
+            del self.armed[target]
+        return True
+
+    def wants_request(self, scope: dict) -> bool:
+        token = Settings.app.ADMIN_TOKEN
+        if not token:
+            return False
+        for name, value in scope.get("headers", ()):
+            if name == PROFILE_HEADER:
+                return secrets.compare_digest(value, token.encode())
+        if scope["path"].startswith(UNPROFILED_PATHS):
+            return False
+        return self._take(ProfileTarget.requests)
+
+    def _acquire(self) -> bool:
+        with self._lock:
+            if self._is_busy:
+                return False
+            self._is_busy = True
+            return True
+
+    @asynccontextmanager
+    async def profile(self, name: str) -> AsyncGenerator[Optional[str], None]:
+        """Profile the block, yielding the artifact name or ``None`` if busy."""
+        if not self._acquire():
+            yield None
+            return
+
+        started_at = datetime.now(UTC)
+        artifact = f"profile-{started_at:%Y%m%dT%H%M%S%f}-{os.getpid()}.json"
+        sampler = _Sampler(
+            Settings.app.PROFILE_SAMPLE_INTERVAL, Settings.app.PROFILE_MAX_SECONDS
+        )
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            yield artifact
+        finally:
+            duration = time.perf_counter() - started
+            sampler.stop()
+            try:
+                await asyncio.to_thread(sampler.join)
+                await asyncio.to_thread(
+                    self._write, artifact, name, started_at, duration, sampler
+                )
+                logging.info(f"Wrote profile of {name} to {artifact}")
+            except Exception as e:
+                logging.error(f"Error writing profile of {name}: {e}")
+            finally:
+                self._is_busy = False
+
+    @asynccontextmanager
+    async def cycle(self, name: str) -> AsyncGenerator[None, None]:
+        """Profile a scheduler cycle if one was armed."""
+        if not self._take(ProfileTarget.scheduler):
+            yield
+            return
+        async with self.profile(name):
+            yield
+
+    def _write(
+        self,
+        artifact: str,
+        name: str,
+        started_at: datetime,
+        duration: float,
+        sampler: _Sampler,
+    ):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        profile = {
+            "name": name,
+            "started_at": started_at.isoformat(),
+            "duration": duration,
+            "interval": sampler.interval,
+            "is_truncated": sampler.is_truncated,
+            "peak_memory": sampler.peak_memory,
+            "allocations": sampler.allocations,
+            "samples": dict(sampler.samples.most_common()),
+        }
+        (self.directory / artifact).write_text(json.dumps(profile, indent=2))
+        for old in self.list()[self.keep :]:
+            old.unlink(missing_ok=True)
+
+    def list(self) -> List[Path]:
+        """Profile files, newest first."""
+        if not self.directory.is_dir():
+            return []
+        return sorted(self.directory.glob("profile-*.json"), reverse=True)
+
+    def find(self, name: str) -> Optional[Path]:
+        return next((path for path in self.list() if path.name == name), None)
+
+
+def collapsed_stacks(path: Path) -> str:
+    """The samples of a profile file in the collapsed stack format."""
+    samples = json.loads(path.read_text())["samples"]
+    return "".join(f"{stack} {count}\n" for stack, count in samples.items())
+
+
+class ProfilingMiddleware:
+    """Profiles requests chosen by ``Profiler.wants_request``.
+
+    The artifact name is returned in the ``X-Profile-Id`` response header.
+    Other requests pass straight through.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not profiler.wants_request(scope):
+            await self.app(scope, receive, send)
+            return
+
+        async with profiler.profile(f"{scope['method']} {scope['path']}") as artifact:
+
+            async def send_with_id(message):
+                if message["type"] == "http.response.start" and artifact:
+                    message["headers"] = [
+                        *message.get("headers", []),
+                        (b"x-profile-id", artifact.encode()),
+                    ]
+                await send(message)
+
+            await self.app(scope, receive, send_with_id)
+
+
+# 创建全局分析器实例
+profiler = Profiler()
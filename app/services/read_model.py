@@ -0,0 +1,352 @@
+"""Read model
+===================
+Immutable, in-process snapshot of everything the read endpoints serve for
+one date range: trending repositories with their keywords and similar
+repositories, developers, summary translations and tag counts.
+
+Snapshots are loaded lazily on first use. Whoever publishes a date range
+bumps its ``SnapshotVersion`` row; the publishing process swaps its own
+snapshot right away and every other process picks the new version up on
+its next poll. Readers only ever do a dictionary lookup.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import Settings
+from app.database import get_session
+from app.enums import AllowedDateRanges
+from app.models import (
+    RelatedRepository,
+    Repository,
+    SnapshotVersion,
+    TrendingDeveloper,
+)
+from app.services.cache import feed_cache
+from app.services.events import broadcaster
+from app.services.github_trending import (
+    get_related_repos,
+    get_trending_devs,
+    get_trending_repos,
+)
+from app.services.metrics import CACHE_REQUESTS
+from app.services.singleflight import single_flight
+from app.services.tags import TagCount, get_tag_counts
+from app.services.translation import get_translations, is_primary_language
+
+
+@dataclass(frozen=True, slots=True)
+class RepositoryRecord:
+    id: int
+    rank: int
+    username: str
+    repository_name: str
+    url: str
+    description: Optional[str]
+    language: Optional[str]
+    language_color: Optional[str]
+    total_stars: Optional[int]
+    forks: Optional[int]
+    stars_since: Optional[int]
+    ai_summary: Optional[str]
+    since: Optional[AllowedDateRanges]
+    created_at: datetime
+    updated_at: datetime
+    keywords: Tuple[str, ...]
+
+    @classmethod
+    def from_model(cls, repo: Repository) -> "RepositoryRecord":
+        return cls(
+            id=repo.id,
+            rank=repo.rank,
+            username=repo.username,
+            repository_name=repo.repository_name,
+            url=repo.url,
+            description=repo.description,
+            language=repo.language,
+            language_color=repo.language_color,
+            total_stars=repo.total_stars,
+            forks=repo.forks,
+            stars_since=repo.stars_since,
+            ai_summary=repo.ai_summary,
+            since=repo.since,
+            created_at=repo.created_at,
+            updated_at=repo.updated_at,
+            keywords=tuple(keyword.keyword for keyword in repo.keywords),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class DeveloperRecord:
+    id: int
+    rank: int
+    username: str
+    name: Optional[str]
+    url: str
+    avatar: Optional[str]
+    popular_repo_name: Optional[str]
+    popular_repo_description: Optional[str]
+    popular_repo_url: Optional[str]
+    ai_summary: Optional[str]
+    updated_at: datetime
+
+    @classmethod
+    def from_model(cls, trending_dev: TrendingDeveloper) -> "DeveloperRecord":
+        dev = trending_dev.developer
+        return cls(
+            id=dev.id,
+            rank=trending_dev.rank,
+            username=dev.username,
+            name=dev.name,
+            url=dev.url,
+            avatar=dev.avatar,
+            popular_repo_name=dev.popular_repo_name,
+            popular_repo_description=dev.popular_repo_description,
+            popular_repo_url=dev.popular_repo_url,
+            ai_summary=dev.ai_summary,
+            updated_at=dev.updated_at,
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class SimilarRepository:
+    id: int
+    username: str
+    repository_name: str
+    url: str
+    score: float
+
+    @classmethod
+    def from_model(cls, related: RelatedRepository) -> "SimilarRepository":
+        return cls(
+            id=related.related_id,
+            username=related.username,
+            repository_name=related.repository_name,
+            url=related.url,
+            score=related.score,
+        )
+
+
+EMPTY_MAPPING: Mapping[str, str] = MappingProxyType({})
+
+
+@dataclass(frozen=True)
+class TrendingSnapshot:
+    since: AllowedDateRanges
+    version: int
+    repositories: Tuple[RepositoryRecord, ...]
+    developers: Tuple[DeveloperRecord, ...]
+    tags: Tuple[TagCount, ...]
+    # 语言 -> {主语言总结: 译文}
+    translations: Mapping[str, Mapping[str, str]]
+    by_tag: Mapping[str, Tuple[RepositoryRecord, ...]] = field(repr=False)
+    # 仓库 id -> 相似仓库
+    related: Mapping[int, Tuple[SimilarRepository, ...]] = field(repr=False)
+    published_at: datetime
+    loaded_at: datetime = field(default_factory=lambda: datetime.now(UTC))
+
+    def repositories_for(
+        self, tag: Optional[str] = None
+    ) -> Tuple[RepositoryRecord, ...]:
+        if not tag:
+            return self.repositories
+        return self.by_tag.get(tag, ())
+
+    def translations_for(self, language: str) -> Mapping[str, str]:
+        return self.translations.get(language, EMPTY_MAPPING)
+
+    def related_to(self, repository_id: int) -> Tuple[SimilarRepository, ...]:
+        return self.related.get(repository_id, ())
+
+
+def diff_rankings(old: Dict[str, int], new: Dict[str, int]) -> Dict[str, Any]:
+    """Compare two ``name -> rank`` mappings."""
+    return {
+        "new": [
+            {"name": name, "rank": rank}
+            for name, rank in new.items()
+            if name not in old
+        ],
+        "moved": [
+            {"name": name, "from": old[name], "to": rank}
+            for name, rank in new.items()
+            if name in old and old[name] != rank
+        ],
+        "left": [name for name in old if name not in new],
+    }
+
+
+def diff_snapshots(old: TrendingSnapshot, new: TrendingSnapshot) -> Dict[str, Any]:
+    return {
+        "since": new.since.value,
+        "snapshot": new.version,
+        "published_at": new.published_at.replace(tzinfo=UTC).isoformat(),
+        "repositories": diff_rankings(
+            {
+                f"{repo.username}/{repo.repository_name}": repo.rank
+                for repo in old.repositories
+            },
+            {
+                f"{repo.username}/{repo.repository_name}": repo.rank
+                for repo in new.repositories
+            },
+        ),
+        "developers": diff_rankings(
+            {dev.username: dev.rank for dev in old.developers},
+            {dev.username: dev.rank for dev in new.developers},
+        ),
+    }
+
+
+async def get_snapshot_version(
+    session: AsyncSession, since: AllowedDateRanges
+) -> SnapshotVersion:
+    snapshot_version = await session.get(SnapshotVersion, since)
+    return snapshot_version or SnapshotVersion(since=since)
+
+
+async def bump_snapshot_version(session: AsyncSession, since: AllowedDateRanges):
+    """Mark ``since`` as republished, as part of the caller's transaction."""
+    result = await session.execute(
+        update(SnapshotVersion)
+        .where(SnapshotVersion.since == since)
+        .values(version=SnapshotVersion.version + 1, published_at=datetime.now(UTC))
+    )
+    if not result.rowcount:
+        session.add(SnapshotVersion(since=since, version=1))
+
+
+async def load_snapshot(
+    session: AsyncSession, since: AllowedDateRanges
+) -> TrendingSnapshot:
+    snapshot_version = await get_snapshot_version(session, since)
+    repositories = tuple(
+        RepositoryRecord.from_model(repo)
+        for repo in await get_trending_repos(since=since, session=session)
+        if repo
+    )
+    developers = tuple(
+        DeveloperRecord.from_model(trending_dev)
+        for trending_dev in await get_trending_devs(since=since, session=session)
+    )
+
+    summaries = [repo.ai_summary for repo in repositories] + [
+        dev.ai_summary for dev in developers
+    ]
+    translations: Dict[str, Mapping[str, str]] = {}
+    for language in Settings.ai.SUMMARY_LANGUAGES:
+        if not is_primary_language(language):
+            translations[language] = MappingProxyType(
+                await get_translations(session, summaries, language)
+            )
+
+    # 计数以发布时维护的 keywordcount 为准，这里只按标签分组
+    tags = tuple(await get_tag_counts(session, since))
+    by_tag: Dict[str, list] = {}
+    for repo in repositories:
+        for keyword in repo.keywords:
+            by_tag.setdefault(keyword, []).append(repo)
+
+    related: Dict[int, list] = {}
+    for row in await get_related_repos(since=since, session=session):
+        related.setdefault(row.repository_id, []).append(
+            SimilarRepository.from_model(row)
+        )
+
+    return TrendingSnapshot(
+        since=since,
+        version=snapshot_version.version,
+        published_at=snapshot_version.published_at,
+        repositories=repositories,
+        developers=developers,
+        tags=tags,
+        translations=MappingProxyType(translations),
+        by_tag=MappingProxyType(
+            {keyword: tuple(repos) for keyword, repos in by_tag.items()}
+        ),
+        related=MappingProxyType(
+            {repository_id: tuple(items) for repository_id, items in related.items()}
+        ),
+    )
+
+
+class ReadModel:
+    def __init__(self):
+        self.poll_interval = Settings.app.READ_MODEL_POLL_INTERVAL
+        self.is_running = False
+        self._snapshots: Dict[AllowedDateRanges, TrendingSnapshot] = {}
+        self._stopped = asyncio.Event()
+
+    async def get(self, since: AllowedDateRanges) -> TrendingSnapshot:
+        snapshot = self._snapshots.get(since)
+        if snapshot is not None:
+            CACHE_REQUESTS.inc("snapshot", "hit")
+            return snapshot
+        CACHE_REQUESTS.inc("snapshot", "miss")
+        # 首次访问时加载，并发的请求共用同一次加载
+        return await single_flight.do(
+            ("snapshot", since),
+            lambda: self.refresh(since),
+            Settings.app.SINGLE_FLIGHT_TIMEOUT,
+        )
+
+    async def refresh(self, since: AllowedDateRanges) -> TrendingSnapshot:
+        """Reload ``since`` from the database and swap it in."""
+        async with get_session() as session:
+            snapshot = await load_snapshot(session, since)
+        self._swap(snapshot)
+        return snapshot
+
+    def _swap(self, snapshot: TrendingSnapshot):
+        current = self._snapshots.get(snapshot.since)
+        if current is not None and current.version > snapshot.version:
+            return
+        self._snapshots[snapshot.since] = snapshot
+        if current is not None and current.version != snapshot.version:
+            broadcaster.publish(
+                snapshot.since.value, "publish", diff_snapshots(current, snapshot)
+            )
+        feed_cache.invalidate("repositories", snapshot.since)
+        feed_cache.invalidate("developers", snapshot.since)
+        feed_cache.invalidate("index", snapshot.since)
+        logging.info(
+            f"Loaded {snapshot.since.value} snapshot v{snapshot.version}: "
+            f"{len(snapshot.repositories)} repositories, "
+            f"{len(snapshot.developers)} developers"
+        )
+
+    async def watch(self):
+        """Reload snapshots that another process has republished."""
+        self.is_running = True
+        self._stopped.clear()
+        while self.is_running:
+            try:
+                await asyncio.wait_for(self._stopped.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            if not self._snapshots or not self.is_running:
+                continue
+            try:
+                async with get_session() as session:
+                    result = await session.execute(select(SnapshotVersion))
+                    versions = {row.since: row.version for row in result.scalars()}
+                for since, snapshot in list(self._snapshots.items()):
+                    if versions.get(since, 0) != snapshot.version:
+                        await self.refresh(since)
+            except Exception as e:
+                logging.error(f"Error reloading read model: {e}")
+
+    def stop(self):
+        self.is_running = False
+        self._stopped.set()
+
+
+# 全局读模型
+read_model = ReadModel()
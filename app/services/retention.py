@@ -0,0 +1,276 @@
+"""Retention
+===================
+Keeps the database from growing without bound.
+
+Rows that the current rankings reference are always kept. Beyond that each
+table has its own policy:
+
+* ``repository``: rows no trending slot points at are kept for
+  ``RETENTION_REPOSITORY_DAYS`` after their last update, as history and as
+  a summary cache for repositories that re-enter the list. Their keyword
+  links and search rows go with them.
+* ``repositorykeywordlink``: links whose repository no longer exists.
+* ``developer``: rows no trending slot points at, after
+  ``RETENTION_DEVELOPER_DAYS``.
+* ``refreshjob``: finished jobs, after ``RETENTION_JOB_DAYS``.
+
+A policy with 0 days keeps its rows forever.
+
+The process holding the scheduler lease runs a pass every
+``RETENTION_INTERVAL`` seconds. A pass deletes ``RETENTION_BATCH_SIZE``
+rows per transaction and pauses between batches, so the scheduler's
+writes never wait long and WAL readers are never blocked. On SQLite it then
+returns up to ``RETENTION_VACUUM_PAGES`` free pages to the filesystem per
+batch with ``PRAGMA incremental_vacuum``. Databases created from now on use
+incremental auto-vacuum. Older ones need a one-off
+``python -m app.cli compact --vacuum`` to switch.
+
+Every pass also records the database size and the row count of each table
+as metrics.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy import Select, delete, exists, func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import SQLModel
+
+from app.config import Settings
+from app.database import engine, get_session
+from app.enums import JobStatus
+from app.models import (
+    Developer,
+    RefreshJob,
+    Repository,
+    RepositoryKeywordLink,
+    TrendingDeveloper,
+    TrendingRepository,
+)
+from app.services.metrics import (
+    DB_FREE_BYTES,
+    DB_ROWS,
+    DB_SIZE_BYTES,
+    RETENTION_DELETED,
+)
+from app.services.search import remove_repositories
+from app.services.tracing import tracer
+
+# SQLite 的 auto_vacuum 取值：0 关闭，1 完整，2 增量
+SQLITE_INCREMENTAL_VACUUM = 2
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    """Which rows of ``table`` may go, and how to delete a batch of them.
+
+    ``expired`` selects the ids to delete given the cutoff time; a
+    ``keep_days`` of ``None`` means the policy does not depend on age.
+    """
+
+    table: str
+    keep_days: Optional[float]
+    expired: Callable[[datetime], Select]
+    delete: Callable[[AsyncSession, List[int]], Awaitable[None]]
+
+
+def expired_repositories(cutoff: datetime) -> Select:
+    return select(Repository.id).where(
+        Repository.updated_at < cutoff,
+        ~exists().where(TrendingRepository.repo_id == Repository.id),
+    )
+
+
+async def delete_repositories(session: AsyncSession, ids: List[int]):
+    await session.execute(
+        delete(RepositoryKeywordLink).where(
+            RepositoryKeywordLink.repository_id.in_(ids)  # type: ignore
+        )
+    )
+    await remove_repositories(session, ids)
+    await session.execute(delete(Repository).where(Repository.id.in_(ids)))  # type: ignore
+
+
+def orphaned_links(cutoff: datetime) -> Select:
+    return (
+        select(RepositoryKeywordLink.repository_id)
+        .where(~exists().where(Repository.id == RepositoryKeywordLink.repository_id))
+        .distinct()
+    )
+
+
+async def delete_links(session: AsyncSession, ids: List[int]):
+    await session.execute(
+        delete(RepositoryKeywordLink).where(
+            RepositoryKeywordLink.repository_id.in_(ids)  # type: ignore
+        )
+    )
+
+
+def expired_developers(cutoff: datetime) -> Select:
+    return select(Developer.id).where(
+        Developer.updated_at < cutoff,
+        ~exists().where(TrendingDeveloper.developer_id == Developer.id),
+    )
+
+
+async def delete_developers(session: AsyncSession, ids: List[int]):
+    await session.execute(delete(Developer).where(Developer.id.in_(ids)))  # type: ignore
+
+
+def expired_jobs(cutoff: datetime) -> Select:
+    return select(RefreshJob.id).where(
+        RefreshJob.status.in_([JobStatus.done, JobStatus.failed]),  # type: ignore
+        RefreshJob.updated_at < cutoff,
+    )
+
+
+async def delete_jobs(session: AsyncSession, ids: List[int]):
+    await session.execute(delete(RefreshJob).where(RefreshJob.id.in_(ids)))  # type: ignore
+
+
+def retention_policies() -> List[RetentionPolicy]:
+    return [
+        RetentionPolicy(
+            "repository",
+            Settings.app.RETENTION_REPOSITORY_DAYS,
+            expired_repositories,
+            delete_repositories,
+        ),
+        RetentionPolicy("repositorykeywordlink", None, orphaned_links, delete_links),
+        RetentionPolicy(
+            "developer",
+            Settings.app.RETENTION_DEVELOPER_DAYS,
+            expired_developers,
+            delete_developers,
+        ),
+        RetentionPolicy(
+            "refreshjob", Settings.app.RETENTION_JOB_DAYS, expired_jobs, delete_jobs
+        ),
+    ]
+
+
+async def incremental_vacuum():
+    """Return free SQLite pages to the filesystem, a few at a time."""
+    if engine.dialect.name != "sqlite":
+        return
+    async with engine.connect() as conn:
+        mode = (await conn.exec_driver_sql("PRAGMA auto_vacuum")).scalar()
+        if mode != SQLITE_INCREMENTAL_VACUUM:
+            return
+        # execute() 只执行一步、释放一页，executescript() 会执行到结束
+        raw = await conn.get_raw_connection()
+        await raw.driver_connection.executescript(
+            f"PRAGMA incremental_vacuum({int(Settings.app.RETENTION_VACUUM_PAGES)})"
+        )
+
+
+async def full_vacuum():
+    """Rebuild the SQLite file once, switching it to incremental auto-vacuum."""
+    if engine.dialect.name != "sqlite":
+        return
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.exec_driver_sql("PRAGMA auto_vacuum = INCREMENTAL")
+        await conn.exec_driver_sql("VACUUM")
+
+
+async def record_database_size() -> Dict[str, int]:
+    """Set the size and row count metrics, and return the row counts."""
+    rows: Dict[str, int] = {}
+    async with get_session() as session:
+        for table in SQLModel.metadata.sorted_tables:
+            count = (
+                await session.execute(select(func.count()).select_from(table))
+            ).scalar_one()
+            rows[table.name] = count
+            DB_ROWS.set(count, table.name)
+        if session.bind.dialect.name == "sqlite":
+            page_size = (await session.execute(text("PRAGMA page_size"))).scalar_one()
+            page_count = (await session.execute(text("PRAGMA page_count"))).scalar_one()
+            free_pages = (
+                await session.execute(text("PRAGMA freelist_count"))
+            ).scalar_one()
+            DB_SIZE_BYTES.set(page_size * page_count)
+            DB_FREE_BYTES.set(page_size * free_pages)
+        elif session.bind.dialect.name == "postgresql":
+            size = (
+                await session.execute(
+                    text("SELECT pg_database_size(current_database())")
+                )
+            ).scalar_one()
+            DB_SIZE_BYTES.set(size)
+    return rows
+
+
+class RetentionJob:
+    def __init__(self):
+        self.is_running = False
+        self._stopped = asyncio.Event()
+
+    async def run_once(self) -> Dict[str, int]:
+        """One pass over every policy; returns the deleted rows per table."""
+        started = time.perf_counter()
+        now = datetime.now(UTC)
+        batch_size = Settings.app.RETENTION_BATCH_SIZE
+        deleted: Dict[str, int] = {}
+        for policy in retention_policies():
+            if policy.keep_days is not None and policy.keep_days <= 0:
+                continue
+            cutoff = now - timedelta(days=policy.keep_days or 0)
+            deleted[policy.table] = 0
+            while not self._stopped.is_set():
+                async with get_session() as session:
+                    result = await session.execute(
+                        policy.expired(cutoff).limit(batch_size)
+                    )
+                    ids = list(result.scalars().all())
+                    if not ids:
+                        break
+                    await policy.delete(session, ids)
+                    await session.commit()
+                deleted[policy.table] += len(ids)
+                RETENTION_DELETED.inc(policy.table, amount=len(ids))
+                await incremental_vacuum()
+                if len(ids) < batch_size:
+                    break
+                # 批次之间让出写锁，调度器的写入不必久等
+                await asyncio.sleep(Settings.app.RETENTION_BATCH_PAUSE)
+        await record_database_size()
+        tracer.add("retention", "db", started, time.perf_counter(), **deleted)
+        return deleted
+
+    async def run(self, should_run: Callable[[], bool]):
+        """Run a pass every ``RETENTION_INTERVAL`` seconds while ``should_run()``."""
+        if Settings.app.RETENTION_INTERVAL <= 0:
+            return
+        self.is_running = True
+        self._stopped.clear()
+        # 第一次等选主完成后再执行，之后按间隔执行
+        timeout = Settings.app.LEADER_LEASE_TTL
+        while self.is_running:
+            try:
+                await asyncio.wait_for(self._stopped.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+            timeout = Settings.app.RETENTION_INTERVAL
+            if not self.is_running or not should_run():
+                continue
+            try:
+                deleted = await self.run_once()
+                if any(deleted.values()):
+                    logging.info(f"Retention removed {deleted}")
+            except Exception as e:
+                logging.error(f"Error applying retention: {e}")
+
+    def stop(self):
+        self.is_running = False
+        self._stopped.set()
+
+
+# 创建全局保留任务实例
+retention = RetentionJob()
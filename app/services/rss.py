@@ -1,24 +1,71 @@
-from typing import List
-from uuid import uuid4
-
-from feedgen.feed import FeedGenerator
+import json
+from datetime import UTC, datetime
+from typing import TYPE_CHECKING, Mapping, Optional, Sequence
 
 from app.enums import AllowedDateRanges
-from app.models import Developer, Repository
+from app.services.images import open_graph_version
+from app.services.read_model import DeveloperRecord, RepositoryRecord
+
+if TYPE_CHECKING:
+    from feedgen.feed import FeedGenerator
+
+
+def as_utc(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=UTC)
 
 
 class RSSService:
-    def __init__(self, base_url: str):
+    def __init__(self, base_url: str, image_proxy: bool = True):
         self.base_url = base_url
+        # 静态导出的 feed 不经过 /img/ 代理
+        self.image_proxy = image_proxy
 
-    def generate_repository_feed(
-        self, repositories: List[Repository], since: AllowedDateRanges
+    def open_graph_url(self, repo: RepositoryRecord) -> str:
+        # Open Graph 图片地址中的随机段用于绕过缓存，按更新时间生成以保证输出稳定
+        cache_buster = open_graph_version(repo)
+        if self.image_proxy:
+            return (
+                f"{self.base_url}/img/og/{repo.username}/{repo.repository_name}"
+                f"?v={cache_buster}"
+            )
+        return f"https://opengraph.githubassets.com/{cache_buster}/{repo.username}/{repo.repository_name}"
+
+    def repository_description(
+        self, repo: RepositoryRecord, translations: Mapping[str, str]
     ) -> str:
+        return f"""<img src="{self.open_graph_url(repo)}" alt="GitHub Open Graph" style="width: 100%; height: auto;"/><br><br>
+            <h2>{repo.repository_name}</h2>
+            <p>{translations.get(repo.ai_summary or "", repo.ai_summary)}</p>
+            <p><span style="background-color: {repo.language_color}; color: white; padding: 5px; border-radius: 5px;"></span> {repo.language}</p>
+            <p>⭐️ {repo.total_stars} stars</p>
+            <p>🍴 {repo.forks} forks </p>
+            <p>✨ {repo.stars_since} stars since {repo.since.value if repo.since else ""}</p>
+            <blockquote>
+            <p>{repo.description}</p>
+            </blockquote>
+            <p>📅 {repo.updated_at} updated</p>
+            """
+
+    def _repository_feed(
+        self,
+        repositories: Sequence[RepositoryRecord],
+        since: AllowedDateRanges,
+        translations: Optional[Mapping[str, str]] = None,
+        updated: Optional[datetime] = None,
+    ) -> "FeedGenerator":
+        # feedgen 依赖 lxml，导入较慢，首次生成 feed 时再加载
+        from feedgen.feed import FeedGenerator
+
+        translations = translations or {}
         fg = FeedGenerator()
+        fg.id(f"{self.base_url}/api/trending/repositories/{since.value}")
         fg.title(f"GitHub Trending Repositories ({since.value.capitalize()})")
         fg.description("AI summarized GitHub trending repositories")
         fg.link(href=self.base_url)
         fg.language("en")
+        if updated:
+            fg.updated(as_utc(updated))
+            fg.lastBuildDate(as_utc(updated))
 
         for repo in repositories:
             if not repo:
@@ -28,34 +75,88 @@ class RSSService:
             fe.link(href=repo.url)
             fe.guid(repo.url)
             fe.author({"name": repo.username})
-            description = f"""<img src="https://opengraph.githubassets.com/{uuid4()}/{repo.username}/{repo.repository_name}" alt="GitHub Open Graph" style="width: 100%; height: auto;"/><br><br>
-            <h2>{repo.repository_name}</h2>
-            <p>{repo.ai_summary}</p>
-            <p><span style="background-color: {repo.language_color}; color: white; padding: 5px; border-radius: 5px;"></span> {repo.language}</p>
-            <p>⭐️ {repo.total_stars} stars</p>
-            <p>🍴 {repo.forks} forks </p>
-            <p>✨ {repo.stars_since} stars since {repo.since.value if repo.since else ""}</p>
-            <blockquote>
-            <p>{repo.description}</p>
-            </blockquote>
-            <p>📅 {repo.updated_at} updated</p>
-            """
-            fe.description(description)
+            fe.updated(as_utc(repo.updated_at))
+            fe.description(self.repository_description(repo, translations))
 
+        return fg
+
+    def generate_repository_feed(
+        self,
+        repositories: Sequence[RepositoryRecord],
+        since: AllowedDateRanges,
+        translations: Optional[Mapping[str, str]] = None,
+        updated: Optional[datetime] = None,
+    ) -> str:
+        fg = self._repository_feed(repositories, since, translations, updated)
         return fg.rss_str(pretty=True).decode("utf-8")
 
-    def generate_developer_feed(self, developers: List[Developer], since: str) -> str:
+    def generate_repository_atom_feed(
+        self,
+        repositories: Sequence[RepositoryRecord],
+        since: AllowedDateRanges,
+        translations: Optional[Mapping[str, str]] = None,
+        updated: Optional[datetime] = None,
+    ) -> str:
+        fg = self._repository_feed(repositories, since, translations, updated)
+        return fg.atom_str(pretty=True).decode("utf-8")
+
+    def generate_repository_json_feed(
+        self,
+        repositories: Sequence[RepositoryRecord],
+        since: AllowedDateRanges,
+        translations: Optional[Mapping[str, str]] = None,
+        feed_url: Optional[str] = None,
+    ) -> str:
+        """JSON Feed 1.1 (https://jsonfeed.org/version/1.1)"""
+        translations = translations or {}
+        feed = {
+            "version": "https://jsonfeed.org/version/1.1",
+            "title": f"GitHub Trending Repositories ({since.value.capitalize()})",
+            "description": "AI summarized GitHub trending repositories",
+            "home_page_url": self.base_url,
+            "language": "en",
+            "items": [
+                {
+                    "id": repo.url,
+                    "url": repo.url,
+                    "title": f"{repo.username}/{repo.repository_name}",
+                    "summary": translations.get(repo.ai_summary or "", repo.ai_summary),
+                    "content_html": self.repository_description(repo, translations),
+                    "date_modified": as_utc(repo.updated_at).isoformat(),
+                    "authors": [{"name": repo.username}],
+                    "tags": list(repo.keywords),
+                }
+                for repo in repositories
+                if repo
+            ],
+        }
+        if feed_url:
+            feed["feed_url"] = feed_url
+        return json.dumps(feed, ensure_ascii=False, indent=2)
+
+    def generate_developer_feed(
+        self,
+        developers: Sequence[DeveloperRecord],
+        since: str,
+        translations: Optional[Mapping[str, str]] = None,
+        updated: Optional[datetime] = None,
+    ) -> str:
+        from feedgen.feed import FeedGenerator
+
+        translations = translations or {}
         fg = FeedGenerator()
         fg.title(f"GitHub Trending Developers ({since})")
         fg.description("AI summarized GitHub trending developers")
         fg.link(href=self.base_url)
         fg.language("en")
+        if updated:
+            fg.lastBuildDate(as_utc(updated))
 
         for dev in developers:
             fe = fg.add_entry()
             fe.title(f"{dev.name or dev.username}")
             fe.link(href=dev.url)
-            fe.description(dev.ai_summary)
+            fe.description(translations.get(dev.ai_summary or "", dev.ai_summary))
             fe.author({"name": dev.username})
 
         return fg.rss_str(pretty=True).decode("utf-8")
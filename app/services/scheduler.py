@@ -1,113 +1,716 @@
 import asyncio
+import hashlib
 import logging
+import random
+import time
+from dataclasses import asdict, dataclass, fields
 from datetime import UTC, datetime, timedelta
+from functools import cached_property
+from pathlib import Path
+from typing import Any, Dict
+from uuid import uuid4
 
+from sqlalchemy import delete, func
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 from sqlmodel import select
 
 from app.config import Settings
 from app.database import get_session
-from app.enums import AllowedDateRanges
-from app.models import Repository, RepositoryKeyword, TrendingRepository
+from app.enums import AllowedDateRanges, AllowedTrendingKinds, JobKind, JobStatus
+from app.models import (
+    Developer,
+    RefreshJob,
+    Repository,
+    RepositoryKeywordLink,
+    TrendingDeveloper,
+    TrendingRepository,
+)
 from app.services.ai import AISummaryService
 from app.services.github import GitHubTrendingService
+from app.services.jobs import TERMINAL_STATUSES, JobNotReady, JobQueue, JobWorker
+from app.services.metrics import CACHE_REQUESTS, REFRESH_SECONDS
+from app.services.profiling import profiler
+from app.services.read_model import bump_snapshot_version, read_model
+from app.services.scraping import ScrapedDeveloper, ScrapedRepository
+from app.services.search import index_repository, remove_repository
+from app.services.tags import (
+    get_or_create_keywords,
+    get_trending_repo_ids,
+    release_trending_slots,
+    update_tag_counts,
+)
+from app.services.tracing import tracer
+from app.services.translation import get_missing_languages, store_translations
+
+REFRESH_INTERVAL_GROWTH = 1.5
+
+
+def base_refresh_interval(since: AllowedDateRanges) -> float:
+    """各时间范围的基础刷新间隔（秒）"""
+    hours = {
+        AllowedDateRanges.daily: Settings.app.DAILY_REFRESH_INTERVAL,
+        AllowedDateRanges.weekly: Settings.app.WEEKLY_REFRESH_INTERVAL,
+        AllowedDateRanges.monthly: Settings.app.MONTHLY_REFRESH_INTERVAL,
+    }[since]
+    return hours * 3600
+
+
+def ranking_fingerprint(names: list[str]) -> str:
+    return hashlib.sha1("\n".join(names).encode("utf-8")).hexdigest()
+
+
+async def upsert_developers(
+    session: AsyncSession, developers: list[Developer]
+) -> dict[str, int]:
+    """插入新开发者并返回 username 到 id 的映射
+
+    其他进程可能同时插入了同一开发者，冲突时更新已有的行，
+    本次总结生成失败时保留已有的总结。
+    """
+    if not developers:
+        return {}
+    rows = [dev.model_dump(exclude={"id"}) for dev in developers]
+    if session.bind.dialect.name == "postgresql":
+        statement = postgresql_insert(Developer).values(rows)
+    else:
+        statement = sqlite_insert(Developer).values(rows)
+    columns = set(rows[0]) - {"username", "summary_language", "created_at"}
+    updates = {column: statement.excluded[column] for column in columns}
+    updates["ai_summary"] = func.coalesce(
+        statement.excluded.ai_summary, Developer.ai_summary
+    )
+    result = await session.execute(
+        statement.on_conflict_do_update(
+            index_elements=["username", "summary_language"], set_=updates
+        ).returning(Developer.username, Developer.id)
+    )
+    return dict(result.tuples().all())
+
+
+def update_changed(
+    row: Repository | Developer, scraped: ScrapedRepository | ScrapedDeveloper
+):
+    """Copy the scraped fields that differ onto an existing ORM row."""
+    for field in fields(scraped):
+        value = getattr(scraped, field.name)
+        if getattr(row, field.name) != value:
+            setattr(row, field.name, value)
+
+
+def is_stale(repo: Repository | None, threshold: datetime) -> bool:
+    """仓库不存在、总结过期或缺少总结/关键词时需要重新生成"""
+    return (
+        not repo
+        or repo.created_at.replace(tzinfo=UTC) < threshold
+        or repo.ai_summary is None
+        or len(repo.keywords) == 0
+    )
+
+
+@dataclass
+class SliceOutcome:
+    """一次分片刷新的结果"""
+
+    fingerprint: str | None = None
+    is_any_failure: bool = False
+
+
+@dataclass
+class RefreshSlice:
+    """一个 (类型, 时间范围) 分片的刷新计划与状态"""
+
+    kind: AllowedTrendingKinds
+    since: AllowedDateRanges
+    interval: float
+    next_run: float = 0.0
+    failures: int = 0
+    fingerprint: str | None = None
+    last_success: datetime | None = None
+    is_running: bool = False
+    is_forced: bool = False
+
+    @property
+    def key(self) -> str:
+        return f"{self.kind.value}/{self.since.value}"
+
+    def is_due(self, now: float) -> bool:
+        return self.is_forced or self.next_run <= now
+
+    def schedule_success(self, fingerprint: str | None):
+        """内容未变化时放宽间隔，变化时回到基础间隔"""
+        base = base_refresh_interval(self.since)
+        if fingerprint is not None and fingerprint == self.fingerprint:
+            self.interval = min(
+                self.interval * REFRESH_INTERVAL_GROWTH,
+                base * Settings.app.MAX_REFRESH_INTERVAL_FACTOR,
+            )
+        else:
+            self.interval = base
+        self.fingerprint = fingerprint
+        self.failures = 0
+        self.last_success = datetime.now(UTC)
+        self.next_run = time.monotonic() + self.interval
+
+    def schedule_failure(self):
+        """只重试失败的分片，指数退避并加入随机抖动"""
+        self.failures += 1
+        delay = min(
+            Settings.app.RETRY_DELAY * 2 ** (self.failures - 1),
+            Settings.app.MAX_RETRY_DELAY,
+        )
+        self.next_run = time.monotonic() + delay * random.uniform(0.8, 1.2)
+
+    def status(self) -> dict:
+        return {
+            "kind": self.kind.value,
+            "since": self.since.value,
+            "interval": self.interval,
+            "next_run_in": max(self.next_run - time.monotonic(), 0.0),
+            "failures": self.failures,
+            "last_success": self.last_success,
+            "is_running": self.is_running,
+            "is_forced": self.is_forced,
+        }
 
 
 class TrendingScheduler:
     def __init__(self):
-        self.github_service = GitHubTrendingService()
-        self.ai_service = AISummaryService()
         self.is_running = False
         self.is_any_failure = False
+        self.slices = {
+            (kind, since): RefreshSlice(
+                kind=kind, since=since, interval=base_refresh_interval(since)
+            )
+            for kind in AllowedTrendingKinds
+            for since in AllowedDateRanges
+        }
+        self.jobs = JobQueue()
+        self.worker = JobWorker(
+            self.jobs,
+            {
+                JobKind.fetch_slice: self._handle_fetch_slice,
+                JobKind.summarize_repo: self._handle_summarize_repo,
+                JobKind.tag_repo: self._handle_tag_repo,
+                JobKind.publish_slice: self._handle_publish_slice,
+            },
+        )
+        self._wakeup = asyncio.Event()
+        # 各时间范围的开发者榜单大量重叠，逐个更新以复用前一个分片刚生成的总结
+        self._developer_lock = asyncio.Lock()
+        # 回放归档时不调用模型，已有的总结一律沿用
+        self.is_offline = False
+
+    @cached_property
+    def github_service(self) -> GitHubTrendingService:
+        return GitHubTrendingService()
+
+    @cached_property
+    def ai_service(self) -> AISummaryService:
+        return AISummaryService()
 
     async def update_trending_data(self):
         """更新所有趋势数据"""
+        await self.run_slices(list(self.slices.values()))
+
+    async def run_slices(self, slices: list[RefreshSlice]):
+        """把给定分片拆成持久化任务并等待完成，没有常驻 worker 时临时启动一个"""
+        self.is_any_failure = False
+        async with (
+            profiler.cycle("refresh"),
+            tracer.cycle("refresh"),
+            self.worker.running(),
+        ):
+            await asyncio.gather(
+                *(self._run_slice(refresh_slice) for refresh_slice in slices)
+            )
+
+    async def _run_slice(self, refresh_slice: RefreshSlice):
+        refresh_slice.is_running = True
+        refresh_slice.is_forced = False
+        started = time.perf_counter()
+        try:
+            outcome = await self._run_slice_jobs(refresh_slice)
+        except Exception as e:
+            logging.error(f"Error refreshing {refresh_slice.key}: {e}")
+            outcome = SliceOutcome(is_any_failure=True)
+        finally:
+            refresh_slice.is_running = False
+        tracer.add(
+            refresh_slice.key,
+            "slice",
+            started,
+            time.perf_counter(),
+            is_any_failure=outcome.is_any_failure,
+        )
+        REFRESH_SECONDS.observe(
+            time.perf_counter() - started,
+            refresh_slice.kind.value,
+            refresh_slice.since.value,
+            "failure" if outcome.is_any_failure else "success",
+        )
+
+        if outcome.is_any_failure:
+            self.is_any_failure = True
+            refresh_slice.schedule_failure()
+            logging.warning(
+                f"Refresh of {refresh_slice.key} failed {refresh_slice.failures} time(s)"
+            )
+        else:
+            refresh_slice.schedule_success(outcome.fingerprint)
+            logging.info(
+                f"Refreshed {refresh_slice.key}, next in {refresh_slice.interval:.0f}s"
+            )
+
+    async def _run_slice_jobs(self, refresh_slice: RefreshSlice) -> SliceOutcome:
+        """提交分片的抓取任务并等待其发布，进程重启后接着未完成的任务继续"""
+        key = refresh_slice.key
+        async with get_session() as session:
+            publish_job = await self.jobs.find_active(session, f"publish:{key}:")
+            fetch_job = (
+                None
+                if publish_job
+                else await self.jobs.find_active(session, f"fetch:{key}:")
+            )
+            if publish_job:
+                logging.info(f"Resuming {publish_job.idempotency_key}")
+            elif fetch_job:
+                logging.info(f"Resuming {fetch_job.idempotency_key}")
+                fetch_key = fetch_job.idempotency_key
+            else:
+                fetch_key = f"fetch:{key}:{uuid4().hex}"
+                await self.jobs.enqueue(
+                    session,
+                    JobKind.fetch_slice,
+                    fetch_key,
+                    {
+                        "kind": refresh_slice.kind.value,
+                        "since": refresh_slice.since.value,
+                    },
+                )
+                await session.commit()
+
+        if publish_job is None:
+            fetch_job = await self.jobs.wait(fetch_key)
+            if fetch_job.status == JobStatus.failed:
+                logging.error(f"{fetch_key} failed: {fetch_job.last_error}")
+                return SliceOutcome(is_any_failure=True)
+            result = fetch_job.result or {}
+            if refresh_slice.kind == AllowedTrendingKinds.developers:
+                return SliceOutcome(
+                    fingerprint=result.get("fingerprint"),
+                    is_any_failure=result.get("is_any_failure", False),
+                )
+            publish_key = result["publish_job"]
+        else:
+            publish_key = publish_job.idempotency_key
+
+        publish_job = await self.jobs.wait(publish_key)
+        if publish_job.status == JobStatus.failed:
+            logging.error(f"{publish_key} failed: {publish_job.last_error}")
+            return SliceOutcome(is_any_failure=True)
+        return SliceOutcome(
+            fingerprint=publish_job.payload.get("fingerprint"),
+            is_any_failure=(publish_job.result or {}).get("is_any_failure", False),
+        )
+
+    def request_refresh(
+        self,
+        kind: AllowedTrendingKinds | None = None,
+        since: AllowedDateRanges | None = None,
+    ) -> dict[str, list[str]]:
+        """手动触发刷新，已排队或正在运行的分片会被合并"""
+        queued, coalesced = [], []
+        for refresh_slice in self.slices.values():
+            if (kind and refresh_slice.kind != kind) or (
+                since and refresh_slice.since != since
+            ):
+                continue
+            if refresh_slice.is_forced or refresh_slice.is_running:
+                coalesced.append(refresh_slice.key)
+            else:
+                refresh_slice.is_forced = True
+                queued.append(refresh_slice.key)
+        self._wakeup.set()
+        return {"queued": queued, "coalesced": coalesced}
+
+    def status(self) -> list[dict]:
+        return [refresh_slice.status() for refresh_slice in self.slices.values()]
+
+    async def _handle_fetch_slice(self, job: RefreshJob) -> Dict[str, Any]:
+        kind = AllowedTrendingKinds(job.payload["kind"])
+        since = AllowedDateRanges(job.payload["since"])
+        if kind == AllowedTrendingKinds.repositories:
+            return await self._fetch_repositories(job, since)
+
+        # 开发者数量少，整个分片作为一个任务完成
+        outcome = SliceOutcome()
+        async with self._developer_lock, get_session() as session:
+            outcome.fingerprint = await self._update_developers(session, since, outcome)
+        return {
+            "fingerprint": outcome.fingerprint,
+            "is_any_failure": outcome.is_any_failure,
+        }
+
+    async def _handle_summarize_repo(self, job: RefreshJob) -> Dict[str, Any]:
+        ai_summary = job.payload.get("ai_summary")
+        if ai_summary is None:
+            repo = ScrapedRepository(**job.payload["record"])
+            ai_summary = await self.ai_service.generate_summary(
+                repo, language=Settings.ai.SUMMARY_LANGUAGE
+            )
+            logging.info(f"AI summary: {ai_summary}")
+
+        outcome = SliceOutcome()
+        async with get_session() as session:
+            await self._update_translations(session, outcome, ai_summary)
+            await session.commit()
+        return {
+            "ai_summary": ai_summary,
+            "is_any_failure": outcome.is_any_failure,
+        }
+
+    async def _handle_tag_repo(self, job: RefreshJob) -> Dict[str, Any]:
+        repo = ScrapedRepository(**job.payload["record"])
+        ai_keywords = await self.ai_service.generate_tags(
+            repo, language=Settings.ai.SUMMARY_LANGUAGE
+        )
+        logging.info(f"AI keywords: {ai_keywords}")
+        return {"keywords": ai_keywords[:3]}
+
+    async def _handle_publish_slice(self, job: RefreshJob) -> Dict[str, Any]:
+        since = AllowedDateRanges(job.payload["since"])
+        entries = job.payload["entries"]
+        keys = [
+            entry[field]
+            for entry in entries
+            for field in ("summary_job", "tag_job", "translate_job")
+            if entry.get(field)
+        ]
         async with get_session() as session:
-            # 更新所有时间范围的仓库数据
-            for since in AllowedDateRanges:
-                await self._update_repositories(session, since)
-            # # 更新所有时间范围的开发者数据
-            # for since in AllowedDateRanges:
-            #     await self._update_developers(session, since)
-
-    async def _update_repositories(
+            jobs = await self.jobs.get_many(session, keys)
+            if any(
+                key not in jobs or jobs[key].status not in TERMINAL_STATUSES
+                for key in keys
+            ):
+                raise JobNotReady(self.worker.poll_interval)
+
+            await self._sync_similarity(session)
+            outcome = await self._publish_repositories(session, since, entries, jobs)
+        await self._swap_read_model(since)
+        return {"is_any_failure": outcome.is_any_failure}
+
+    async def _swap_read_model(self, since: AllowedDateRanges):
+        """发布后立即替换本进程的读模型，其他进程轮询版本号后重新加载"""
+        try:
+            await read_model.refresh(since)
+        except Exception as e:
+            logging.error(f"Error reloading {since.value} read model: {e}")
+            return
+        if Settings.app.EXPORT_DIR:
+            # 导出依赖模板等 Web 组件，只在开启导出时加载
+            from app.services.export import export_site
+
+            try:
+                await export_site(Path(Settings.app.EXPORT_DIR), [since])
+            except Exception as e:
+                logging.error(f"Error exporting {since.value}: {e}")
+
+    async def _find_repository(
+        self, session: AsyncSession, repo: ScrapedRepository, since: AllowedDateRanges
+    ) -> Repository | None:
+        result = await session.execute(
+            select(Repository)
+            .options(selectinload(Repository.keywords))
+            .where(
+                Repository.repository_name == repo.repository_name,
+                Repository.username == repo.username,
+                Repository.summary_language == Settings.ai.SUMMARY_LANGUAGE,
+                Repository.since == since,
+            )
+        )
+        return result.scalar_one_or_none()
+
+    async def _update_developers(
         self,
         session: AsyncSession,
         since: AllowedDateRanges,
+        outcome: SliceOutcome,
+    ) -> str:
+        developers = await self.github_service.get_trending_developers(since=since)
+        if not developers:
+            # 抛出异常，由任务队列退避后重试
+            raise RuntimeError(f"No trending developers fetched for {since.value}")
+
+        result = await session.execute(
+            select(Developer).where(
+                Developer.username.in_([dev.username for dev in developers]),  # type: ignore
+                Developer.summary_language == Settings.ai.SUMMARY_LANGUAGE,
+            )
+        )
+        existing_devs = {dev.username: dev for dev in result.scalars().all()}
+
+        update_time_threshold = datetime.now(UTC) - timedelta(
+            hours=Settings.app.UPDATE_INTERVAL
+        )
+        ranked_devs: list[Developer] = []
+        for scraped in developers:
+            existing_dev = existing_devs.get(scraped.username)
+            if existing_dev:
+                # 原地更新抓取字段，保留已缓存的 AI 总结
+                update_changed(existing_dev, scraped)
+                dev = existing_dev
+            else:
+                dev = Developer(**asdict(scraped))
+
+            if not existing_dev or (
+                not self.is_offline
+                and (
+                    existing_dev.ai_summary is None
+                    or existing_dev.updated_at.replace(tzinfo=UTC)
+                    < update_time_threshold
+                )
+            ):
+                logging.info(f"Updating developer {dev.username}")
+                CACHE_REQUESTS.inc("summary", "miss")
+                try:
+                    dev.ai_summary = await self.ai_service.generate_summary(
+                        scraped, language=Settings.ai.SUMMARY_LANGUAGE
+                    )
+                    dev.updated_at = datetime.now(UTC)
+                except Exception as e:
+                    logging.error(
+                        f"Error generating AI summary for developer {dev.username}: {e}"
+                    )
+                    outcome.is_any_failure = True
+                dev.summary_language = Settings.ai.SUMMARY_LANGUAGE
+            else:
+                CACHE_REQUESTS.inc("summary", "hit")
+            await self._update_translations(session, outcome, dev.ai_summary)
+            ranked_devs.append(dev)
+
+        # 一次性写入开发者及本时间范围的排名快照
+        await session.flush()
+        developer_ids = await upsert_developers(
+            session, [dev for dev in ranked_devs if dev.id is None]
+        )
+        await session.execute(
+            delete(TrendingDeveloper).where(TrendingDeveloper.since == since)  # type: ignore
+        )
+        session.add_all(
+            [
+                TrendingDeveloper(
+                    since=since,
+                    rank=dev.rank,
+                    developer_id=dev.id or developer_ids[dev.username],
+                )
+                for dev in ranked_devs
+            ]
+        )
+        await bump_snapshot_version(session, since)
+        await session.commit()
+        await self._swap_read_model(since)
+        return ranking_fingerprint([dev.username for dev in developers])
+
+    async def _update_translations(
+        self,
+        session: AsyncSession,
+        outcome: SliceOutcome,
+        summary: str | None,
     ):
-        self.is_any_failure = False
+        """把主语言总结翻译为其余语言，每条总结只调用一次模型"""
+        if not summary:
+            return
+        languages = await get_missing_languages(
+            session, summary, Settings.ai.SUMMARY_LANGUAGES
+        )
+        if not languages:
+            return
+        try:
+            translations = await self.ai_service.translate_summary(summary, languages)
+        except Exception as e:
+            logging.error(f"Error translating AI summary into {languages}: {e}")
+            outcome.is_any_failure = True
+            return
+        if len(translations) < len(languages):
+            outcome.is_any_failure = True
+        # 随调用方的下一次提交一起写入
+        await store_translations(session, summary, translations)
+
+    async def _fetch_repositories(
+        self, job: RefreshJob, since: AllowedDateRanges
+    ) -> Dict[str, Any]:
+        """抓取榜单，为需要更新的仓库提交总结和标签任务，最后提交发布任务"""
         repositories = await self.github_service.get_trending_repositories(
             since=since,
         )
+        if not repositories:
+            raise RuntimeError(f"No trending repositories fetched for {since.value}")
 
-        for repo in repositories:
-            try:
-                result = await session.execute(
-                    select(Repository)
-                    .options(selectinload(Repository.keywords))
-                    .where(
-                        Repository.repository_name == repo.repository_name,
-                        Repository.username == repo.username,
-                        Repository.summary_language == Settings.ai.SUMMARY_LANGUAGE,
-                        Repository.since == since,
-                    )
+        update_time_threshold = datetime.now(UTC) - timedelta(
+            hours=Settings.app.UPDATE_INTERVAL
+        )
+        entries = []
+        async with get_session() as session:
+            for repo in repositories:
+                record = asdict(repo)
+                entry: Dict[str, Any] = {"record": record}
+                existing_repo = await self._find_repository(session, repo, since)
+                job_key = (
+                    f"{since.value}:{repo.username}/{repo.repository_name}:{job.id}"
                 )
-                existing_repo: Repository | None = result.scalar_one_or_none()
-
-                current_time = datetime.now(UTC)
-                update_time_threshold = current_time - timedelta(
-                    hours=Settings.app.UPDATE_INTERVAL
+                is_summary_stale = (
+                    existing_repo is None
+                    if self.is_offline
+                    else is_stale(existing_repo, update_time_threshold)
                 )
-                if (
-                    not existing_repo
-                    or existing_repo.created_at.replace(tzinfo=UTC)
-                    < update_time_threshold
-                    or existing_repo.ai_summary is None
-                    or len(existing_repo.keywords) == 0
+                CACHE_REQUESTS.inc("summary", "miss" if is_summary_stale else "hit")
+                if is_summary_stale:
+                    entry["summary_job"] = f"summarize:{job_key}"
+                    entry["tag_job"] = f"tag:{job_key}"
+                    await self.jobs.enqueue(
+                        session,
+                        JobKind.summarize_repo,
+                        entry["summary_job"],
+                        {"record": record},
+                    )
+                    await self.jobs.enqueue(
+                        session, JobKind.tag_repo, entry["tag_job"], {"record": record}
+                    )
+                elif (
+                    not self.is_offline
+                    and existing_repo.ai_summary
+                    and await get_missing_languages(
+                        session, existing_repo.ai_summary, Settings.ai.SUMMARY_LANGUAGES
+                    )
                 ):
+                    # 沿用已有总结，只补齐缺少的译文
+                    entry["translate_job"] = f"translate:{job_key}"
+                    await self.jobs.enqueue(
+                        session,
+                        JobKind.summarize_repo,
+                        entry["translate_job"],
+                        {"record": record, "ai_summary": existing_repo.ai_summary},
+                    )
+                entries.append(entry)
+
+            fingerprint = ranking_fingerprint(
+                [f"{repo.username}/{repo.repository_name}" for repo in repositories]
+            )
+            publish_key = (
+                f"publish:{AllowedTrendingKinds.repositories.value}/{since.value}"
+                f":{job.id}"
+            )
+            await self.jobs.enqueue(
+                session,
+                JobKind.publish_slice,
+                publish_key,
+                {"since": since.value, "fingerprint": fingerprint, "entries": entries},
+            )
+            await session.commit()
+        return {"publish_job": publish_key, "fingerprint": fingerprint}
+
+    async def _publish_repositories(
+        self,
+        session: AsyncSession,
+        since: AllowedDateRanges,
+        entries: list[Dict[str, Any]],
+        jobs: Dict[str, RefreshJob],
+    ) -> SliceOutcome:
+        """把抓取结果和已完成的总结、标签写入数据库并更新排名
+
+        整个分片在同一个事务里发布，中途失败时全部回滚、由任务队列重试，
+        重试时读到的上一版榜单和标签计数仍然一致。
+        """
+        outcome = SliceOutcome()
+        previous_repo_ids = await get_trending_repo_ids(session, since)
+        for entry in entries:
+            scraped = ScrapedRepository(**entry["record"])
+            try:
+                existing_repo = await self._find_repository(session, scraped, since)
+                current_time = datetime.now(UTC)
+                if entry.get("summary_job"):
+                    repo = Repository(**entry["record"])
                     logging.info(
                         f"Updating repository {repo.username}/{repo.repository_name}"
                     )
-                    try:
-                        ai_summary = await self.ai_service.generate_summary(repo)
-                    except Exception as e:
+                    summary_job = jobs[entry["summary_job"]]
+                    if summary_job.status == JobStatus.done:
+                        repo.ai_summary = summary_job.result["ai_summary"]
+                        if summary_job.result.get("is_any_failure"):
+                            outcome.is_any_failure = True
+                    else:
                         logging.error(
-                            f"Error generating AI summary for {repo.username}/{repo.repository_name}: {e}"
+                            f"Error generating AI summary for {repo.username}/{repo.repository_name}: {summary_job.last_error}"
                         )
-                        ai_summary = None
-                        self.is_any_failure = True
-                    logging.info(f"AI summary: {ai_summary}")
-                    repo.ai_summary = ai_summary
+                        outcome.is_any_failure = True
                     repo.summary_language = Settings.ai.SUMMARY_LANGUAGE
                     repo.since = since
 
                     if existing_repo:
+                        await remove_repository(session, existing_repo.id)
+                        await release_trending_slots(session, existing_repo.id)
                         await session.delete(existing_repo)
                     session.add(repo)
-                    await session.commit()
-
-                    try:
-                        ai_keywords = await self.ai_service.generate_tags(repo)
-                        logging.info(f"AI keywords: {ai_keywords}")
-                        keywords = [
-                            RepositoryKeyword(keyword=keyword, repository_id=repo.id)
-                            for keyword in ai_keywords
-                        ]
-                        if len(keywords) > 3:
-                            keywords = keywords[:3]
-                        session.add_all(keywords)
-                        await session.commit()
-                    except Exception as e:
+                    # 只 flush 拿到 id，整个分片在最后一次提交
+                    await session.flush()
+
+                    keywords = []
+                    keyword_count = 0
+                    tag_job = jobs[entry["tag_job"]]
+                    if tag_job.status == JobStatus.done:
+                        keywords = await get_or_create_keywords(
+                            session, tag_job.result["keywords"]
+                        )
+                        session.add_all(
+                            [
+                                RepositoryKeywordLink(
+                                    repository_id=repo.id, keyword_id=keyword.id
+                                )
+                                for keyword in keywords
+                            ]
+                        )
+                        await session.flush()
+                        keyword_count = len(keywords)
+                    else:
                         logging.error(
-                            f"Error generating AI keywords for {repo.username}/{repo.repository_name}: {e}"
+                            f"Error generating AI keywords for {repo.username}/{repo.repository_name}: {tag_job.last_error}"
                         )
-                        self.is_any_failure = True
+                        outcome.is_any_failure = True
+
+                    # 同步全文检索索引
+                    await index_repository(
+                        session,
+                        repository_id=repo.id,
+                        description=repo.description,
+                        ai_summary=repo.ai_summary,
+                        keywords=[keyword.keyword for keyword in keywords],
+                        since=since,
+                    )
+                elif existing_repo is None:
+                    # 抓取与发布之间仓库被删除，留给下一轮刷新
+                    logging.error(
+                        f"Error: {scraped.username}/{scraped.repository_name} disappeared before publishing"
+                    )
+                    outcome.is_any_failure = True
+                    continue
                 else:
+                    # 沿用已有总结，但排名和统计数据以本次抓取为准
+                    update_changed(existing_repo, scraped)
+                    existing_repo.updated_at = current_time
                     repo = existing_repo
+                    keyword_count = len(existing_repo.keywords)
                     logging.info(
                         f"Repository {repo.username}/{repo.repository_name} already exists"
                     )
+                    translate_job = jobs.get(entry.get("translate_job", ""))
+                    if translate_job and (
+                        translate_job.status != JobStatus.done
+                        or translate_job.result.get("is_any_failure")
+                    ):
+                        outcome.is_any_failure = True
 
                 # 更新趋势仓库
                 result = await session.execute(
@@ -134,47 +737,90 @@ class TrendingScheduler:
                         repo=repo,
                     )
                 session.add(trending_repo)
-                await session.commit()
+                await session.flush()
 
                 # last check
                 if any(
                     [
                         trending_repo.repo_id is None,
                         trending_repo.repo is None,
-                        trending_repo.repo.ai_summary is None,
-                        len(trending_repo.repo.keywords) == 0,
+                        # 回放时新仓库没有总结和关键词，等下一次在线刷新补齐
+                        not self.is_offline
+                        and (
+                            trending_repo.repo.ai_summary is None or keyword_count == 0
+                        ),
                     ]
                 ):
                     logging.error(
                         f"Error: {repo.username}/{repo.repository_name} is missing data after processing"
                     )
-                    self.is_any_failure = True
+                    outcome.is_any_failure = True
             except Exception as e:
                 logging.error(
-                    f"Error processing repository {repo.username}/{repo.repository_name}: {e}"
+                    f"Error processing repository {scraped.username}/{scraped.repository_name}: {e}"
                 )
-                self.is_any_failure = True
-                continue
+                raise
+
+        # 按进出榜单的仓库增量更新标签计数
+        await update_tag_counts(session, since, previous_repo_ids)
+        await self._update_related(session, since)
+        await bump_snapshot_version(session, since)
+        await session.commit()
+        return outcome
+
+    async def _sync_similarity(self, session: AsyncSession):
+        """在发布事务写入之前同步相似度索引，首次全量构建不会占着写锁"""
+        from app.services.similarity import similarity_index
+
+        try:
+            await similarity_index.sync(session)
+        except Exception as e:
+            logging.error(f"Error syncing the similarity index: {e}")
+
+    async def _update_related(self, session: AsyncSession, since: AllowedDateRanges):
+        """在发布事务里算好相似仓库，读模型加载时直接读取"""
+        # 相似度计算依赖 numpy 和 scipy，只在发布时加载
+        from app.services.similarity import update_related
+
+        try:
+            await update_related(session, since)
+        except Exception as e:
+            # 相似仓库只是附加信息，不影响发布
+            logging.error(f"Error finding similar repositories for {since.value}: {e}")
 
     async def start(self):
-        """启动调度器"""
+        """启动调度器，按各分片自己的计划刷新"""
         self.is_running = True
         while self.is_running:
+            self._wakeup.clear()
+            now = time.monotonic()
+            due = [
+                refresh_slice
+                for refresh_slice in self.slices.values()
+                if refresh_slice.is_due(now)
+            ]
+            if due:
+                try:
+                    await self.run_slices(due)
+                except Exception as e:
+                    logging.error(f"Error in scheduler: {e}")
+                    for refresh_slice in due:
+                        refresh_slice.schedule_failure()
+                continue
+
+            # 等待最近的分片到期，或被手动触发唤醒
+            timeout = min(
+                refresh_slice.next_run for refresh_slice in self.slices.values()
+            )
             try:
-                await self.update_trending_data()
-                if self.is_any_failure:
-                    await asyncio.sleep(60)  # 如果发生错误，等待1分钟后重试
-                else:
-                    await asyncio.sleep(
-                        Settings.app.UPDATE_INTERVAL * 60
-                    )  # 等待指定的时间间隔
-            except Exception as e:
-                print(f"Error in scheduler: {e}")
-                await asyncio.sleep(60)  # 发生错误时等待1分钟后重试
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout - now)
+            except asyncio.TimeoutError:
+                pass
 
     def stop(self):
         """停止调度器"""
         self.is_running = False
+        self._wakeup.set()
 
 
 # 创建全局调度器实例
@@ -1,16 +1,48 @@
 """Scraping
 ===================
-Functions to scrape repository/developer data (HTML -> list of dicts).
+Functions to scrape repository/developer data (HTML -> lists of records).
 """
 
 # Copyright (c) 2021, Niklas Tiede.
 # All rights reserved. Distributed under the MIT License.
-from typing import Any, Dict, List, Optional, Union
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
 
-import aiohttp
-import bs4
+from app.services.transport import fetch_text
 
-from app.models import Developer, Repository
+if TYPE_CHECKING:
+    import aiohttp
+    import bs4
+
+
+@dataclass(frozen=True, slots=True)
+class ScrapedRepository:
+    """One article of the trending repositories page."""
+
+    rank: int
+    username: str
+    repository_name: str
+    url: str
+    description: Optional[str] = None
+    language: Optional[str] = None
+    language_color: Optional[str] = None
+    total_stars: Optional[int] = None
+    forks: Optional[int] = None
+    stars_since: Optional[int] = None
+
+
+@dataclass(frozen=True, slots=True)
+class ScrapedDeveloper:
+    """One article of the trending developers page."""
+
+    rank: int
+    username: str
+    url: str
+    name: Optional[str] = None
+    avatar: Optional[str] = None
+    popular_repo_name: Optional[str] = None
+    popular_repo_description: Optional[str] = None
+    popular_repo_url: Optional[str] = None
 
 
 async def get_request(
@@ -18,23 +50,31 @@ async def get_request(
     *,  # Mark subsequent arguments as keyword-only
     params: Optional[Dict[str, str]] = None,
     compress: Optional[bool] = None,
+    session: Optional["aiohttp.ClientSession"] = None,
     **other_kwargs: Any  # For any other keyword arguments aiohttp.get might take
-) -> Union[str, aiohttp.ClientConnectorError]:
-    """Asynchronous GET request with aiohttp."""
-    try:
-        # Prepare the keyword arguments for session.get
-        request_kwargs = {}
-        if params is not None:
-            request_kwargs["params"] = params
-        if compress is not None:
-            request_kwargs["compress"] = compress
-        request_kwargs.update(other_kwargs)
+) -> str:
+    """Asynchronous GET request with aiohttp.
+
+    Pass ``session`` to reuse a long-lived client (and its connection pool),
+    otherwise a throwaway one is created for this request. Raises a
+    ``TransportError`` once retries are exhausted or the host's circuit
+    breaker is open.
+    """
+    # aiohttp 和 bs4 导入较慢，只在真正抓取时加载
+    import aiohttp
+
+    # Prepare the keyword arguments for session.get
+    request_kwargs = {}
+    if params is not None:
+        request_kwargs["params"] = params
+    if compress is not None:
+        request_kwargs["compress"] = compress
+    request_kwargs.update(other_kwargs)
 
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, **request_kwargs) as resp:  # Pass url directly
-                return await resp.text()
-    except aiohttp.ClientConnectorError as cce:
-        return cce
+    if session is not None:
+        return await fetch_text(session, url, **request_kwargs)
+    async with aiohttp.ClientSession() as session:
+        return await fetch_text(session, url, **request_kwargs)
 
 
 def filter_articles(raw_html: str) -> str:
@@ -64,17 +104,29 @@ def filter_articles(raw_html: str) -> str:
     return "".join(articles_arrays)
 
 
-def make_soup(articles_html: str) -> bs4.element.ResultSet:
+def make_soup(articles_html: str) -> "bs4.element.ResultSet":
     """HTML enclosed by article-tags is converted into a
     soup for further data extraction.
     """
+    import bs4
+
     soup = bs4.BeautifulSoup(articles_html, "lxml")
     return soup.find_all("article", class_="Box-row")
 
 
+def _parse_count(text: Optional[str]) -> Optional[int]:
+    """'1,234' -> 1234, a missing or malformed count -> None."""
+    if not text:
+        return None
+    try:
+        return int(text.replace(",", ""))
+    except ValueError:
+        return None
+
+
 def scraping_repositories(
-    matches: bs4.element.ResultSet,
-) -> List[Repository]:
+    matches: "bs4.element.ResultSet",
+) -> List[ScrapedRepository]:
     """Data about all trending repositories are extracted."""
     trending_repositories = []
     for rank, match in enumerate(matches):
@@ -87,14 +139,8 @@ def scraping_repositories(
         # relative url
         rel_url = match.h2.a["href"]
 
-        # absolute url:
-        repo_url = "https://github.com" + rel_url
-
-        # name of repo
-        repository_name = rel_url.split("/")[-1]
-
-        # author (username):
-        username = rel_url.split("/")[-2]
+        # name of repo and author (username)
+        username, repository_name = rel_url.split("/")[-2:]
 
         # language and color
         progr_language = match.find("span", itemprop="programmingLanguage")
@@ -105,98 +151,46 @@ def scraping_repositories(
         else:
             lang_color, language = None, None
 
-        stars_built_section = match.div.findNextSibling("div")
-
-        # total stars:
-        if stars_built_section.a:
-            raw_total_stars = stars_built_section.a.get_text(strip=True)
-            if "," in raw_total_stars:
-                raw_total_stars = raw_total_stars.replace(",", "")
-        if raw_total_stars:
-            total_stars: Optional[int]
-            try:
-                total_stars = int(raw_total_stars)
-            except ValueError as missing_number:
-                print(missing_number)
-        else:
-            total_stars = None
-
-        # forks
-        if stars_built_section.a.findNextSibling("a"):
-            raw_forks = stars_built_section.a.findNextSibling(
-                "a",
-            ).get_text(strip=True)
-            if "," in raw_forks:
-                raw_forks = raw_forks.replace(",", "")
-        if raw_forks:
-            forks: Optional[int]
-            try:
-                forks = int(raw_forks)
-            except ValueError as missing_number:
-                print(missing_number)
-        else:
-            forks = None
+        stars_built_section = match.div.find_next_sibling("div")
+
+        # total stars and forks: the first two links of the section
+        stars_link = stars_built_section.a
+        forks_link = stars_link.find_next_sibling("a") if stars_link else None
 
         # stars in period
-        if stars_built_section.find(
+        stars_since_tag = stars_built_section.find(
             "span",
             class_="d-inline-block float-sm-right",
-        ):
-            raw_stars_since = (
-                stars_built_section.find(
-                    "span",
-                    class_="d-inline-block float-sm-right",
-                )
-                .get_text(strip=True)
-                .split()[0]
-            )
-            if "," in raw_stars_since:
-                raw_stars_since = raw_stars_since.replace(",", "")
-        if raw_stars_since:
-            stars_since: Optional[int]
-            try:
-                stars_since = int(raw_stars_since)
-            except ValueError as missing_number:
-                print(missing_number)
-        else:
-            stars_since = None
-
-        # builtby
-        built_section = stars_built_section.find(
-            "span",
-            class_="d-inline-block mr-3",
         )
-        if built_section:
-            contributors = stars_built_section.find(
-                "span",
-                class_="d-inline-block mr-3",
-            ).find_all("a")
-            built_by = []
-            for contributor in contributors:
-                contr_data = {}
-                contr_data["username"] = contributor["href"].strip("/")
-                contr_data["url"] = "https://github.com" + contributor["href"]
-                contr_data["avatar"] = contributor.img["src"]
-                built_by.append(dict(contr_data))
-        repo_instance = Repository(
-            rank=rank + 1,
-            username=username,
-            repository_name=repository_name,
-            url=repo_url,
-            description=description,
-            language=language,
-            language_color=lang_color,
-            total_stars=total_stars,
-            forks=forks,
-            stars_since=stars_since,
+        stars_since_words = (
+            stars_since_tag.get_text().split() if stars_since_tag else []
+        )
+        stars_since_text = stars_since_words[0] if stars_since_words else None
+
+        trending_repositories.append(
+            ScrapedRepository(
+                rank=rank + 1,
+                username=username,
+                repository_name=repository_name,
+                url="https://github.com" + rel_url,
+                description=description,
+                language=language,
+                language_color=lang_color,
+                total_stars=_parse_count(
+                    stars_link.get_text(strip=True) if stars_link else None
+                ),
+                forks=_parse_count(
+                    forks_link.get_text(strip=True) if forks_link else None
+                ),
+                stars_since=_parse_count(stars_since_text),
+            )
         )
-        trending_repositories.append(repo_instance)
     return trending_repositories
 
 
 def scraping_developers(
-    matches: bs4.element.ResultSet,
-) -> List[Developer]:
+    matches: "bs4.element.ResultSet",
+) -> List[ScrapedDeveloper]:
     """Data about all trending developers are extracted."""
     all_trending_developers = []
     for rank, match in enumerate(matches):
@@ -241,7 +235,7 @@ def scraping_developers(
             repo_name = None
             repo_url = None
 
-        dev_instance = Developer(
+        dev_instance = ScrapedDeveloper(
             rank=rank + 1,
             username=username,
             name=name,
@@ -253,3 +247,12 @@ def scraping_developers(
         )
         all_trending_developers.append(dev_instance)
     return all_trending_developers
+
+
+def parse_repositories(articles_html: str) -> List[ScrapedRepository]:
+    """Soup and extract in one call, so it can run in a worker process."""
+    return scraping_repositories(make_soup(articles_html))
+
+
+def parse_developers(articles_html: str) -> List[ScrapedDeveloper]:
+    return scraping_developers(make_soup(articles_html))
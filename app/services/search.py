@@ -0,0 +1,411 @@
+"""Search
+===================
+Full-text search over repository descriptions, AI summaries and keywords,
+backed by an SQLite FTS5 virtual table.
+
+The ``trigram`` tokenizer is used so that CJK summaries (generated in
+简体中文 by default) are searchable without a word segmenter. Trigram
+MATCH needs at least three characters per term, so 1–2 character terms,
+most CJK words, are looked up in a second FTS5 table,
+``repository_bigram``, holding every pair of adjacent characters of each
+word. A LIKE filter then checks the candidate rows, newest first, for the
+exact term. Short terms with punctuation are only filtered with LIKE.
+
+Snippets are HTML-escaped, with the matched terms wrapped in ``<mark>``.
+
+On PostgreSQL ``repository_fts`` is a plain table with the same columns,
+searched with ILIKE and ranked by the same column weights. A ``pg_trgm``
+GIN index speeds the ILIKE up when the extension can be installed; like
+FTS5 it cannot narrow down terms shorter than three characters, which
+scan the table.
+"""
+
+import html
+import logging
+from dataclasses import dataclass
+from typing import Iterable, List, Optional
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from app.enums import AllowedDateRanges
+
+FTS_TABLE = "repository_fts"
+
+BIGRAM_TABLE = "repository_bigram"
+
+# bm25 column weights: description, ai_summary, keywords
+BM25_WEIGHTS = (1.0, 1.0, 2.0)
+
+SNIPPET_TOKENS = 24
+
+SNIPPET_LENGTH = 200
+
+MIN_TRIGRAM_LENGTH = 3
+
+# snippet() 的高亮标记，转义正文后再换成 <mark>
+MARK_START = "\x02"
+MARK_END = "\x03"
+
+
+@dataclass
+class SearchResult:
+    repository_id: int
+    username: str
+    repository_name: str
+    url: str
+    since: Optional[str]
+    language: Optional[str]
+    snippet: str
+    score: float
+
+
+async def create_search_index(conn: AsyncConnection):
+    """Create the search table, and backfill it once if it was just created."""
+    if conn.dialect.name == "postgresql":
+        await _create_postgresql_index(conn)
+        return
+    if conn.dialect.name != "sqlite":
+        return
+
+    result = await conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {"name": FTS_TABLE},
+    )
+    if result.first() is not None:
+        await _create_bigram_index(conn)
+        return
+
+    await conn.execute(text(f"""CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+                description,
+                ai_summary,
+                keywords,
+                since UNINDEXED,
+                tokenize = 'trigram'
+            )"""))
+    await conn.execute(
+        text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank) VALUES ('rank', :rank)"),
+        {"rank": "bm25({}, {}, {})".format(*BM25_WEIGHTS)},
+    )
+    await conn.execute(
+        text(
+            f"""INSERT INTO {FTS_TABLE}(rowid, description, ai_summary, keywords, since)
+            SELECT
+                repository.id,
+                coalesce(repository.description, ''),
+                coalesce(repository.ai_summary, ''),
+                coalesce(
+                    (
+                        SELECT group_concat(keyword.keyword, ' ')
+                        FROM repositorykeywordlink
+                        JOIN keyword ON keyword.id = repositorykeywordlink.keyword_id
+                        WHERE repositorykeywordlink.repository_id = repository.id
+                    ),
+                    ''
+                ),
+                repository.since
+            FROM repository"""
+        )
+    )
+    await _create_bigram_index(conn)
+
+
+async def _create_bigram_index(conn: AsyncConnection):
+    """Create the bigram table of short terms, and backfill it from the
+    search table if it was just created.
+    """
+    result = await conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {"name": BIGRAM_TABLE},
+    )
+    if result.first() is not None:
+        return
+
+    # prefix='1' 让单字查询 "x*" 也走索引
+    await conn.execute(text(f"""CREATE VIRTUAL TABLE {BIGRAM_TABLE} USING fts5(
+                bigrams,
+                tokenize = 'unicode61',
+                prefix = '1'
+            )"""))
+    result = await conn.execute(
+        text(f"SELECT rowid, description, ai_summary, keywords FROM {FTS_TABLE}")
+    )
+    rows = [{"id": row[0], "bigrams": bigrams(*row[1:])} for row in result.all()]
+    if rows:
+        await conn.execute(
+            text(f"INSERT INTO {BIGRAM_TABLE}(rowid, bigrams) VALUES (:id, :bigrams)"),
+            rows,
+        )
+
+
+def bigrams(*texts: str) -> str:
+    """Adjacent character pairs of every word, plus its last character, so
+    that any 1–2 character substring is a token or a token prefix.
+    """
+    tokens = set()
+    for value in texts:
+        for word in (value or "").lower().split():
+            tokens.update(word[i : i + 2] for i in range(len(word) - 1))
+            tokens.add(word[-1])
+    return " ".join(sorted(tokens))
+
+
+async def _create_postgresql_index(conn: AsyncConnection):
+    if await conn.run_sync(lambda c: c.dialect.has_table(c, FTS_TABLE)):
+        return
+
+    await conn.execute(text(f"""CREATE TABLE {FTS_TABLE} (
+                rowid INTEGER PRIMARY KEY,
+                description TEXT NOT NULL DEFAULT '',
+                ai_summary TEXT NOT NULL DEFAULT '',
+                keywords TEXT NOT NULL DEFAULT '',
+                since VARCHAR
+            )"""))
+    try:
+        # pg_trgm 不可用时（没有权限或未安装）退化为顺序扫描
+        async with conn.begin_nested():
+            await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            await conn.execute(text(f"""CREATE INDEX ix_{FTS_TABLE}_trgm ON {FTS_TABLE}
+                    USING gin (({SEARCH_DOCUMENT}) gin_trgm_ops)"""))
+    except DBAPIError as e:
+        logging.warning(f"Search runs without a trigram index: {e}")
+    await conn.execute(
+        text(
+            f"""INSERT INTO {FTS_TABLE}(rowid, description, ai_summary, keywords, since)
+            SELECT
+                repository.id,
+                coalesce(repository.description, ''),
+                coalesce(repository.ai_summary, ''),
+                coalesce(
+                    (
+                        SELECT string_agg(keyword.keyword, ' ')
+                        FROM repositorykeywordlink
+                        JOIN keyword ON keyword.id = repositorykeywordlink.keyword_id
+                        WHERE repositorykeywordlink.repository_id = repository.id
+                    ),
+                    ''
+                ),
+                repository.since::text
+            FROM repository"""
+        )
+    )
+
+
+async def index_repository(
+    session: AsyncSession,
+    repository_id: int,
+    description: Optional[str],
+    ai_summary: Optional[str],
+    keywords: Iterable[str],
+    since: AllowedDateRanges | None,
+):
+    """Insert or replace the search row of a single repository."""
+    if session.bind.dialect.name not in ("sqlite", "postgresql"):
+        return
+
+    await session.execute(
+        text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :id"), {"id": repository_id}
+    )
+    await session.execute(
+        text(
+            f"""INSERT INTO {FTS_TABLE}(rowid, description, ai_summary, keywords, since)
+            VALUES (:id, :description, :ai_summary, :keywords, :since)"""
+        ),
+        {
+            "id": repository_id,
+            "description": description or "",
+            "ai_summary": ai_summary or "",
+            "keywords": " ".join(keywords),
+            "since": since.value if since else None,
+        },
+    )
+    if session.bind.dialect.name == "sqlite":
+        await session.execute(
+            text(f"DELETE FROM {BIGRAM_TABLE} WHERE rowid = :id"),
+            {"id": repository_id},
+        )
+        await session.execute(
+            text(f"INSERT INTO {BIGRAM_TABLE}(rowid, bigrams) VALUES (:id, :bigrams)"),
+            {
+                "id": repository_id,
+                "bigrams": bigrams(description, ai_summary, " ".join(keywords)),
+            },
+        )
+
+
+async def remove_repository(session: AsyncSession, repository_id: int):
+    """Drop the search row of a repository that is being replaced."""
+    if session.bind.dialect.name not in ("sqlite", "postgresql"):
+        return
+
+    for table in _search_tables(session):
+        await session.execute(
+            text(f"DELETE FROM {table} WHERE rowid = :id"), {"id": repository_id}
+        )
+
+
+async def remove_repositories(session: AsyncSession, repository_ids: List[int]):
+    """Drop the search rows of repositories removed by retention."""
+    if session.bind.dialect.name not in ("sqlite", "postgresql") or not repository_ids:
+        return
+
+    for table in _search_tables(session):
+        await session.execute(
+            text(f"DELETE FROM {table} WHERE rowid IN :ids").bindparams(
+                bindparam("ids", expanding=True)
+            ),
+            {"ids": repository_ids},
+        )
+
+
+def _search_tables(session: AsyncSession) -> List[str]:
+    if session.bind.dialect.name == "sqlite":
+        return [FTS_TABLE, BIGRAM_TABLE]
+    return [FTS_TABLE]
+
+
+def _quote(term: str) -> str:
+    return '"' + term.replace('"', '""') + '"'
+
+
+def _escape_like(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+SEARCH_COLUMNS = ("description", "ai_summary", "keywords")
+
+# 与 pg_trgm 索引的表达式一致，ILIKE 才能用上索引
+SEARCH_DOCUMENT = " || ' ' || ".join(f"{FTS_TABLE}.{c}" for c in SEARCH_COLUMNS)
+
+
+def _fallback_snippet() -> str:
+    return (
+        f"substr(coalesce(nullif({FTS_TABLE}.ai_summary, ''), "
+        f"{FTS_TABLE}.description), 1, {SNIPPET_LENGTH})"
+    )
+
+
+def _sqlite_search(terms: List[str], params: dict):
+    """FROM clause, WHERE conditions, snippet, score and ORDER BY for FTS5."""
+    long_terms = [term for term in terms if len(term) >= MIN_TRIGRAM_LENGTH]
+    short_terms = [term for term in terms if len(term) < MIN_TRIGRAM_LENGTH]
+
+    source = FTS_TABLE
+    conditions = []
+    if long_terms:
+        conditions.append(f"{FTS_TABLE} MATCH :match")
+        params["match"] = " ".join(_quote(term) for term in long_terms)
+    for i, term in enumerate(short_terms):
+        conditions.append(
+            "("
+            + " OR ".join(
+                f"{FTS_TABLE}.{column} LIKE :short{i} ESCAPE '\\'"
+                for column in SEARCH_COLUMNS
+            )
+            + ")"
+        )
+        params[f"short{i}"] = f"%{_escape_like(term)}%"
+
+    if long_terms:
+        # snippet() and bm25 are only available for MATCH queries
+        snippet = (
+            f"snippet({FTS_TABLE}, -1, '{MARK_START}', '{MARK_END}', '…', "
+            f"{SNIPPET_TOKENS})"
+        )
+        return source, conditions, snippet, f"{FTS_TABLE}.rank", f"{FTS_TABLE}.rank"
+
+    # 只有短词时由二元组表按 rowid 倒序给出候选行，LIKE 只检查这些行
+    indexed = [term.lower() for term in short_terms if term.isalnum()]
+    order_by = f"{FTS_TABLE}.rowid DESC"
+    if indexed:
+        source = (
+            f"{BIGRAM_TABLE} JOIN {FTS_TABLE} "
+            f"ON {FTS_TABLE}.rowid = {BIGRAM_TABLE}.rowid"
+        )
+        conditions.append(f"{BIGRAM_TABLE} MATCH :bigrams")
+        params["bigrams"] = " ".join(
+            _quote(term) if len(term) == 2 else f"{_quote(term)} *" for term in indexed
+        )
+        order_by = f"{BIGRAM_TABLE}.rowid DESC"
+    return source, conditions, _fallback_snippet(), "0.0", order_by
+
+
+def _highlight(snippet: Optional[str]) -> str:
+    return (
+        html.escape(snippet or "")
+        .replace(MARK_START, "<mark>")
+        .replace(MARK_END, "</mark>")
+    )
+
+
+def _postgresql_search(terms: List[str], params: dict):
+    """FROM clause, WHERE conditions, snippet, score and ORDER BY for ILIKE."""
+    conditions = []
+    weights = []
+    for i, term in enumerate(terms):
+        conditions.append(f"({SEARCH_DOCUMENT}) ILIKE :term{i}")
+        params[f"term{i}"] = f"%{_escape_like(term)}%"
+        for column, weight in zip(SEARCH_COLUMNS, BM25_WEIGHTS):
+            weights.append(f"{weight} * ({FTS_TABLE}.{column} ILIKE :term{i})::int")
+    # 与 bm25 一样分数越低越相关
+    score = f"-CAST({' + '.join(weights)} AS DOUBLE PRECISION)"
+    return (
+        FTS_TABLE,
+        conditions,
+        _fallback_snippet(),
+        score,
+        f"score, {FTS_TABLE}.rowid DESC",
+    )
+
+
+async def search_repositories(
+    session: AsyncSession,
+    query: str,
+    since: AllowedDateRanges | None = None,
+    limit: int = 20,
+) -> List[SearchResult]:
+    """Search indexed repositories, best matches first."""
+    terms = [term for term in query.split() if term]
+    if not terms:
+        return []
+
+    params: dict = {"limit": limit}
+    if session.bind.dialect.name == "postgresql":
+        source, conditions, snippet, score, order_by = _postgresql_search(terms, params)
+    else:
+        source, conditions, snippet, score, order_by = _sqlite_search(terms, params)
+    if since:
+        conditions.append(f"{FTS_TABLE}.since = :since")
+        params["since"] = since.value
+
+    result = await session.execute(
+        text(f"""SELECT
+                repository.id,
+                repository.username,
+                repository.repository_name,
+                repository.url,
+                repository.since,
+                repository.language,
+                {snippet} AS snippet,
+                {score} AS score
+            FROM {source}
+            JOIN repository ON repository.id = {FTS_TABLE}.rowid
+            WHERE {" AND ".join(conditions)}
+            ORDER BY {order_by}
+            LIMIT :limit"""),
+        params,
+    )
+    return [
+        SearchResult(
+            repository_id=row[0],
+            username=row[1],
+            repository_name=row[2],
+            url=row[3],
+            since=row[4],
+            language=row[5],
+            snippet=_highlight(row[6]),
+            score=row[7],
+        )
+        for row in result.all()
+    ]
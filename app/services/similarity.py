@@ -0,0 +1,570 @@
+"""Similarity
+===================
+Offline "similar projects" for every repository, computed from the same
+description, AI summary and keywords the search index holds. No embedding
+service is involved.
+
+Each repository becomes a sparse TF-IDF vector over hashed features:
+lowercased latin words, character bigrams of CJK runs (summaries are
+generated in 简体中文 by default, see ``app.services.search`` for the same
+concern) and whole keywords, which weigh ``KEYWORD_WEIGHT`` times a word.
+Features are hashed into ``SIMILARITY_FEATURES`` columns, so there is no
+vocabulary to maintain and a new repository is vectorized on its own.
+Rows are L2-normalized, which makes cosine similarity a sparse dot product.
+
+The index is only used when a date range is published: the publishing
+process keeps it in memory and brings it up to date with
+``repository_fts`` before the publish transaction starts writing, so a
+first build over a large table does not hold the SQLite write lock.
+Within the transaction only the slice's new repositories are vectorized,
+and the neighbors of every trending repository are stored in
+``RelatedRepository``. Readers load those rows with the snapshot and
+never import numpy or scipy, so the scheduler imports this module lazily.
+Only repositories added since the last sync are vectorized, deleted ones
+are masked out. The scheduler writes a new repository row whenever a summary changes, so the
+row id and creation time identify a version of the text. New rows are
+weighted with the current IDF and appended as a block of their own. Once
+the document count has drifted by ``SIMILARITY_REWEIGHT_RATIO`` since the
+last full build, every row is reweighted and the blocks are merged again.
+
+Neighbors are looked up for a whole snapshot at once. Each repository's
+``SIMILARITY_QUERY_FEATURES`` heaviest features are multiplied with every
+block's transposed rows, i.e. the posting lists of those features. Common
+features weigh little and have the longest posting lists, so leaving them
+out keeps the product small. ``numpy.argpartition`` picks the best
+candidates in each row of the sparse score matrix, and the candidates are
+then rescored with their full vectors in one batch.
+"""
+
+import asyncio
+import re
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+from sqlalchemy import bindparam, delete, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import Settings
+from app.enums import AllowedDateRanges
+from app.models import RelatedRepository
+from app.services.metrics import SIMILARITY_DOCUMENTS, SIMILARITY_SECONDS
+from app.services.read_model import SimilarRepository
+from app.services.search import FTS_TABLE
+from app.services.tags import get_trending_repo_ids
+from app.services.tracing import tracer
+
+# 拉丁字母单词
+WORD = re.compile(r"[a-z0-9][a-z0-9+#]*")
+
+# 中日韩字符的码位范围（假名、汉字、谚文、兼容汉字）
+CJK_RANGES = ((0x3040, 0x30FF), (0x3400, 0x9FFF), (0xAC00, 0xD7AF), (0xF900, 0xFAFF))
+
+STOP_WORDS = frozenset(
+    "an and are as at be by for from has in into is it its of on or that the "
+    "this to with you your".split()
+)
+
+# 不同种类的特征在哈希前放进不同的高位，避免相互碰撞
+WORD_FEATURE = 1 << 42
+KEYWORD_FEATURE = 2 << 42
+
+# 一个关键词相当于出现一次的单词的倍数
+KEYWORD_WEIGHT = 3.0
+
+# 追加的小块超过这个数量时合并，避免查询要遍历太多块
+MAX_BLOCKS = 16
+
+# 每个仓库先取 k 的这个倍数个候选，再精确打分和去重
+CANDIDATE_FACTOR = 4
+
+# SQLite 单条语句的变量个数有上限
+FETCH_BATCH_SIZE = 500
+
+
+def hash_features(values: np.ndarray, n_features: int) -> np.ndarray:
+    """Map 64-bit feature values onto ``n_features`` columns."""
+    # 乘法哈希，乘积溢出后取高位
+    mixed = values.astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15)
+    return ((mixed >> np.uint64(24)) % np.uint64(n_features)).astype(np.int32)
+
+
+def vectorize(
+    documents: Sequence[Tuple[str, str, str]], n_features: int
+) -> sparse.csr_matrix:
+    """Hashed, sublinear term frequencies of ``(description, ai_summary,
+    keywords)`` documents, one row each.
+    """
+    texts = []
+    rows: List[int] = []
+    values: List[int] = []
+    keyword_rows: List[int] = []
+    keyword_values: List[int] = []
+    for row, (description, ai_summary, keywords) in enumerate(documents):
+        value = f"{description}\n{ai_summary}\n{keywords}".lower()
+        texts.append(value)
+        for word in WORD.findall(value):
+            if len(word) > 1 and word not in STOP_WORDS:
+                rows.append(row)
+                values.append(WORD_FEATURE | zlib.crc32(word.encode("utf-8")))
+        for keyword in set(keywords.lower().split()):
+            keyword_rows.append(row)
+            keyword_values.append(KEYWORD_FEATURE | zlib.crc32(keyword.encode("utf-8")))
+
+    # 中文没有分词，用相邻两个字作为特征，整批文档一起按码位计算
+    points = np.frombuffer("\n".join(texts).encode("utf-32-le"), dtype=np.uint32)
+    owners = np.repeat(np.arange(len(texts)), [len(value) + 1 for value in texts])
+    owners = owners[: len(points)]
+    cjk = np.zeros(len(points), dtype=bool)
+    for low, high in CJK_RANGES:
+        cjk |= (points >= low) & (points <= high)
+    pairs = cjk[:-1] & cjk[1:]
+    points = points.astype(np.uint64)
+    bigrams = (points[:-1][pairs] << np.uint64(21)) | points[1:][pairs]
+    # 前后都不是中日韩字符的单字
+    alone = cjk.copy()
+    alone[1:] &= ~pairs
+    alone[:-1] &= ~pairs
+
+    counts = sparse.csr_matrix(
+        (
+            np.ones(len(rows) + len(bigrams) + int(alone.sum()), dtype=np.float32),
+            (
+                np.concatenate(
+                    [
+                        np.asarray(rows, dtype=np.int64),
+                        owners[:-1][pairs],
+                        owners[alone],
+                    ]
+                ),
+                hash_features(
+                    np.concatenate(
+                        [np.asarray(values, dtype=np.uint64), bigrams, points[alone]]
+                    ),
+                    n_features,
+                ),
+            ),
+        ),
+        shape=(len(texts), n_features),
+    )
+    counts.sum_duplicates()
+    counts.data = 1.0 + np.log(counts.data)
+    keywords = sparse.csr_matrix(
+        (
+            np.full(len(keyword_rows), KEYWORD_WEIGHT, dtype=np.float32),
+            (
+                np.asarray(keyword_rows, dtype=np.int64),
+                hash_features(np.asarray(keyword_values, dtype=np.uint64), n_features),
+            ),
+        ),
+        shape=(len(texts), n_features),
+    )
+    return (counts + keywords).tocsr()
+
+
+def inverse_document_frequency(df: np.ndarray, n_documents: int) -> np.ndarray:
+    return (np.log((1.0 + n_documents) / (1.0 + df)) + 1.0).astype(np.float32)
+
+
+def normalize_rows(rows: sparse.csr_matrix) -> sparse.csr_matrix:
+    norms = np.sqrt(
+        np.asarray(rows.multiply(rows).sum(axis=1), dtype=np.float32).ravel()
+    )
+    norms[norms == 0] = 1.0
+    return sparse.csr_matrix(sparse.diags(1.0 / norms) @ rows, dtype=np.float32)
+
+
+@dataclass
+class Block:
+    """Weighted, normalized rows of some documents, and their transpose.
+
+    ``idf`` is the weighting the rows were built with. The raw frequencies
+    are not kept: rows are renormalized after reweighting, so dividing by
+    the old IDF is enough to recover them up to scale.
+    """
+
+    rows: sparse.csr_matrix
+    columns: sparse.csr_matrix
+    idf: np.ndarray
+    alive: np.ndarray
+    codes: np.ndarray
+    repositories: List[Tuple[int, str, str, str]]
+
+    @classmethod
+    def build(
+        cls,
+        rows: sparse.csr_matrix,
+        idf: np.ndarray,
+        codes: np.ndarray,
+        repositories: List[Tuple[int, str, str, str]],
+    ) -> "Block":
+        rows = normalize_rows(rows)
+        rows.sort_indices()
+        return cls(
+            rows=rows,
+            columns=rows.T.tocsr(),
+            idf=idf,
+            alive=np.ones(rows.shape[0], dtype=bool),
+            codes=codes,
+            repositories=repositories,
+        )
+
+    @property
+    def size(self) -> int:
+        return self.rows.shape[0]
+
+
+class SimilarityIndex:
+    def __init__(self):
+        self.n_features = Settings.app.SIMILARITY_FEATURES
+        self._lock = asyncio.Lock()
+        self._blocks: List[Block] = []
+        # 仓库 id -> (创建时间, 在所有块中的行号)
+        self._documents: Dict[int, Tuple[Any, int]] = {}
+        self._df = np.zeros(self.n_features, dtype=np.int32)
+        # 同一仓库在不同时间范围下各有一行，按名称去重
+        self._codes: Dict[str, int] = {}
+        self._built_documents = 0
+        self._fingerprint: Tuple[Any, ...] = ()
+
+    async def related(
+        self, session: AsyncSession, repository_ids: Sequence[int], k: int
+    ) -> Dict[int, Tuple[SimilarRepository, ...]]:
+        """The ``k`` most similar repositories of each of ``repository_ids``.
+
+        Runs inside the publish transaction, so it only vectorizes the
+        given repositories if they are new; ``sync`` brings the rest of the
+        index up to date beforehand.
+        """
+        if k <= 0 or not self._is_supported(session):
+            return {}
+        async with self._lock:
+            documents = await self._fetch(
+                session, [i for i in repository_ids if i not in self._documents]
+            )
+            if documents:
+                await asyncio.to_thread(self._apply, [], documents)
+            while True:
+                with SIMILARITY_SECONDS.time("query"):
+                    related = await asyncio.to_thread(
+                        self._neighbors, repository_ids, k
+                    )
+                # 本次发布替换掉的旧版本仓库不能作为相似项目，
+                # 去掉后可能又排上来同名的另一个旧版本
+                vanished = await self._vanished(session, related)
+                if not vanished:
+                    break
+                await asyncio.to_thread(self._apply, vanished, [])
+            return related
+
+    async def sync(self, session: AsyncSession):
+        """Vectorize new repositories and drop deleted ones."""
+        if not self._is_supported(session):
+            return
+        async with self._lock:
+            await self._sync(session)
+
+    def _is_supported(self, session: AsyncSession) -> bool:
+        return session.bind.dialect.name in ("sqlite", "postgresql")
+
+    async def _sync(self, session: AsyncSession):
+        started = time.perf_counter()
+        # 仓库只会新增或删除（内容变化时换一行），
+        # 数量和最新的创建时间都没变就无需逐行比对
+        result = await session.execute(
+            text(
+                f"""SELECT count(*), max(repository.created_at)
+                FROM {FTS_TABLE} JOIN repository ON repository.id = {FTS_TABLE}.rowid"""
+            )
+        )
+        fingerprint = tuple(result.one())
+        if fingerprint == self._fingerprint:
+            return
+        result = await session.execute(
+            text(
+                f"""SELECT {FTS_TABLE}.rowid, repository.created_at
+                FROM {FTS_TABLE} JOIN repository ON repository.id = {FTS_TABLE}.rowid"""
+            )
+        )
+        current = {row[0]: row[1] for row in result}
+        removed = [
+            repository_id
+            for repository_id, (created_at, _) in self._documents.items()
+            if current.get(repository_id) != created_at
+        ]
+        added = [
+            repository_id
+            for repository_id, created_at in current.items()
+            if repository_id not in self._documents
+            or self._documents[repository_id][0] != created_at
+        ]
+        if not removed and not added:
+            self._fingerprint = fingerprint
+            return
+
+        documents = await self._fetch(session, added)
+        await asyncio.to_thread(self._apply, removed, documents)
+        self._fingerprint = fingerprint
+        SIMILARITY_DOCUMENTS.set(len(self._documents))
+        ended = time.perf_counter()
+        SIMILARITY_SECONDS.observe(ended - started, "sync")
+        tracer.add(
+            "similarity_sync",
+            "db",
+            started,
+            ended,
+            added=len(documents),
+            removed=len(removed),
+        )
+
+    async def _fetch(self, session: AsyncSession, ids: List[int]) -> List[Tuple]:
+        """Indexed text and names of the repositories ``ids``."""
+        documents = []
+        for i in range(0, len(ids), FETCH_BATCH_SIZE):
+            result = await session.execute(
+                text(f"""SELECT
+                        {FTS_TABLE}.rowid,
+                        repository.created_at,
+                        repository.username,
+                        repository.repository_name,
+                        repository.url,
+                        {FTS_TABLE}.description,
+                        {FTS_TABLE}.ai_summary,
+                        {FTS_TABLE}.keywords
+                    FROM {FTS_TABLE}
+                    JOIN repository ON repository.id = {FTS_TABLE}.rowid
+                    WHERE {FTS_TABLE}.rowid IN :ids""").bindparams(
+                    bindparam("ids", expanding=True)
+                ),
+                {"ids": ids[i : i + FETCH_BATCH_SIZE]},
+            )
+            documents.extend(tuple(row) for row in result)
+        return documents
+
+    async def _vanished(
+        self, session: AsyncSession, related: Dict[int, Tuple[SimilarRepository, ...]]
+    ) -> List[int]:
+        """Ids among ``related`` that are no longer in the search table."""
+        ids = sorted({item.id for items in related.values() for item in items})
+        if not ids:
+            return []
+        result = await session.execute(
+            text(f"SELECT rowid FROM {FTS_TABLE} WHERE rowid IN :ids").bindparams(
+                bindparam("ids", expanding=True)
+            ),
+            {"ids": ids},
+        )
+        return sorted(set(ids) - set(result.scalars()))
+
+    def _apply(self, removed: List[int], documents: List[Tuple]):
+        for repository_id in removed:
+            _, position = self._documents.pop(repository_id)
+            block, row = self._locate(position)
+            block.alive[row] = False
+            self._df[
+                block.rows.indices[block.rows.indptr[row] : block.rows.indptr[row + 1]]
+            ] -= 1
+
+        if documents:
+            raw = vectorize(
+                [
+                    (document[5] or "", document[6] or "", document[7] or "")
+                    for document in documents
+                ],
+                self.n_features,
+            )
+            self._df += np.bincount(raw.indices, minlength=self.n_features).astype(
+                np.int32
+            )
+            codes = np.asarray(
+                [
+                    self._codes.setdefault(
+                        f"{document[2]}/{document[3]}".lower(), len(self._codes)
+                    )
+                    for document in documents
+                ],
+                dtype=np.int64,
+            )
+            idf = inverse_document_frequency(
+                self._df, len(self._documents) + len(documents)
+            )
+            offset = sum(block.size for block in self._blocks)
+            self._blocks.append(
+                Block.build(
+                    raw.multiply(idf).tocsr(),
+                    idf,
+                    codes,
+                    [document[0:1] + document[2:5] for document in documents],
+                )
+            )
+            for i, document in enumerate(documents):
+                self._documents[document[0]] = (document[1], offset + i)
+
+        n_documents = len(self._documents)
+        drift = abs(n_documents - self._built_documents) / max(self._built_documents, 1)
+        if (
+            drift > Settings.app.SIMILARITY_REWEIGHT_RATIO
+            or len(self._blocks) > MAX_BLOCKS
+        ):
+            self._rebuild()
+
+    def _rebuild(self):
+        """Reweight every live row with the current IDF, as a single block."""
+        idf = inverse_document_frequency(self._df, len(self._documents))
+        parts, codes, repositories = [], [], []
+        for block in self._blocks:
+            live = np.flatnonzero(block.alive)
+            # 除以旧 IDF 还原频率（相差的倍数在归一化时消去），再乘新 IDF
+            parts.append(block.rows[live].multiply(idf / block.idf).tocsr())
+            codes.append(block.codes[live])
+            repositories.extend(block.repositories[i] for i in live)
+        if repositories:
+            self._blocks = [
+                Block.build(
+                    sparse.vstack(parts, format="csr"),
+                    idf,
+                    np.concatenate(codes),
+                    repositories,
+                )
+            ]
+        else:
+            self._blocks = []
+        self._documents = {
+            repository[0]: (self._documents[repository[0]][0], position)
+            for position, repository in enumerate(repositories)
+        }
+        self._built_documents = len(self._documents)
+
+    def _offsets(self) -> np.ndarray:
+        return np.cumsum([0] + [block.size for block in self._blocks])
+
+    def _locate(self, position: int) -> Tuple[Block, int]:
+        offsets = self._offsets()
+        index = int(np.searchsorted(offsets, position, side="right")) - 1
+        return self._blocks[index], position - int(offsets[index])
+
+    def _rows(self, positions: np.ndarray) -> sparse.csr_matrix:
+        """Rows at the given positions across all blocks, in order."""
+        offsets = self._offsets()
+        owners = np.searchsorted(offsets, positions, side="right") - 1
+        parts, order = [], []
+        for index, block in enumerate(self._blocks):
+            members = np.flatnonzero(owners == index)
+            if len(members):
+                parts.append(block.rows[positions[members] - offsets[index]])
+                order.append(members)
+        stacked = sparse.vstack(parts, format="csr")
+        return stacked[np.argsort(np.concatenate(order))]
+
+    def _neighbors(
+        self, repository_ids: Sequence[int], k: int
+    ) -> Dict[int, Tuple[SimilarRepository, ...]]:
+        ids = [i for i in repository_ids if i in self._documents]
+        if not ids or len(self._documents) < 2:
+            return {}
+        query_positions = np.asarray([self._documents[i][1] for i in ids])
+        queries = self._rows(query_positions)
+
+        # 召回只用每个仓库权重最高的特征，它们最少见、倒排列表也最短
+        pruned = queries.copy()
+        n_features = Settings.app.SIMILARITY_QUERY_FEATURES
+        for row in range(len(ids)):
+            data = pruned.data[pruned.indptr[row] : pruned.indptr[row + 1]]
+            if len(data) > n_features:
+                data[np.argpartition(data, len(data) - n_features)[:-n_features]] = 0
+        pruned.eliminate_zeros()
+        # 分数矩阵是稀疏的，只在每行的非零项里挑候选
+        scores = sparse.hstack(
+            [pruned @ block.columns for block in self._blocks], format="csr"
+        )
+        alive = np.concatenate([block.alive for block in self._blocks])
+        codes = np.concatenate([block.codes for block in self._blocks])
+
+        n_candidates = k * CANDIDATE_FACTOR
+        owners, candidates = [], []
+        for row in range(len(ids)):
+            begin, end = scores.indptr[row], scores.indptr[row + 1]
+            columns, values = scores.indices[begin:end], scores.data[begin:end]
+            keep = alive[columns] & (codes[columns] != codes[query_positions[row]])
+            columns, values = columns[keep], values[keep]
+            if len(columns) > n_candidates:
+                columns = columns[
+                    np.argpartition(-values, n_candidates - 1)[:n_candidates]
+                ]
+            owners.append(np.full(len(columns), row))
+            candidates.append(columns)
+        owner = np.concatenate(owners)
+        candidate = np.concatenate(candidates)
+        if not len(candidate):
+            return {repository_id: () for repository_id in ids}
+
+        # 只对候选用完整向量重新计算余弦相似度
+        exact = np.asarray(
+            self._rows(candidate).multiply(queries[owner]).sum(axis=1)
+        ).ravel()
+
+        offsets = self._offsets()
+        owner_blocks = np.searchsorted(offsets, candidate, side="right") - 1
+        related: Dict[int, List[SimilarRepository]] = {
+            repository_id: [] for repository_id in ids
+        }
+        seen = set()
+        min_score = Settings.app.SIMILARITY_MIN_SCORE
+        for i in np.lexsort((-exact, owner)):
+            score = float(exact[i])
+            found = related[ids[owner[i]]]
+            key = (owner[i], codes[candidate[i]])
+            if score < min_score or score <= 0 or len(found) == k or key in seen:
+                continue
+            seen.add(key)
+            block = self._blocks[owner_blocks[i]]
+            candidate_id, username, repository_name, url = block.repositories[
+                candidate[i] - offsets[owner_blocks[i]]
+            ]
+            found.append(
+                SimilarRepository(
+                    id=candidate_id,
+                    username=username,
+                    repository_name=repository_name,
+                    url=url,
+                    score=round(score, 4),
+                )
+            )
+        return {repository_id: tuple(found) for repository_id, found in related.items()}
+
+
+async def update_related(session: AsyncSession, since: AllowedDateRanges):
+    """Replace the stored neighbors of the trending repositories of ``since``,
+    as part of the caller's transaction.
+    """
+    related = await similarity_index.related(
+        session,
+        sorted(await get_trending_repo_ids(session, since)),
+        Settings.app.SIMILAR_REPOSITORIES,
+    )
+    await session.execute(
+        delete(RelatedRepository).where(RelatedRepository.since == since)  # type: ignore
+    )
+    session.add_all(
+        [
+            RelatedRepository(
+                since=since,
+                repository_id=repository_id,
+                position=position,
+                related_id=item.id,
+                username=item.username,
+                repository_name=item.repository_name,
+                url=item.url,
+                score=item.score,
+            )
+            for repository_id, items in related.items()
+            for position, item in enumerate(items)
+        ]
+    )
+
+
+# 创建全局相似度索引实例
+similarity_index = SimilarityIndex()
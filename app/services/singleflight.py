@@ -0,0 +1,65 @@
+"""Single flight
+===================
+Coalesce concurrent calls for the same key into one computation.
+
+The first caller for a key starts the computation as a task, later callers
+wait on the same task and get its result or its exception. Each caller may
+give up after its own timeout without cancelling the computation for the
+others; the key is released as soon as the computation finishes.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlightTimeout(asyncio.TimeoutError):
+    """A caller gave up waiting for the shared computation of ``key``."""
+
+    def __init__(self, key: Hashable, timeout: Optional[float]):
+        super().__init__(f"gave up on {key!r} after {timeout}s")
+        self.key = key
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+
+    async def do(
+        self,
+        key: Hashable,
+        fn: Callable[[], Awaitable[T]],
+        timeout: Optional[float] = None,
+    ) -> T:
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.create_task(self._run(key, fn))
+            task.add_done_callback(_consume_exception)
+            self._calls[key] = task
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), timeout)
+        except asyncio.TimeoutError as e:
+            # 计算本身抛出的超时原样传出，只有等待超时才换成 SingleFlightTimeout
+            if task.done():
+                raise
+            raise SingleFlightTimeout(key, timeout) from e
+
+    async def _run(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            return await fn()
+        finally:
+            self._calls.pop(key, None)
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+
+def _consume_exception(task: asyncio.Task):
+    # 所有等待者都超时后，避免 "exception was never retrieved" 警告
+    if not task.cancelled():
+        task.exception()
+
+
+# 全局 single-flight 实例
+single_flight = SingleFlight()
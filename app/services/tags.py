@@ -0,0 +1,207 @@
+"""Tags
+===================
+Interned keywords, repository links and per-range tag counts.
+
+``KeywordCount`` holds how many repositories currently on the trending list
+of a date range carry each keyword. It is adjusted incrementally from the
+repositories that entered or left the list in a refresh, in the same
+transaction that publishes the list, and is what the read model loads as
+the range's tag counts.
+"""
+
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Mapping, Optional, Set
+
+from sqlalchemy import case, select, text, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from app.enums import AllowedDateRanges
+from app.models import (
+    Keyword,
+    KeywordCount,
+    RepositoryKeywordLink,
+    TrendingRepository,
+)
+
+
+@dataclass
+class TagCount:
+    keyword: str
+    count: int
+
+
+async def get_or_create_keywords(
+    session: AsyncSession, names: Iterable[str]
+) -> List[Keyword]:
+    """Return the interned keywords for ``names``, creating missing ones."""
+    names = list(dict.fromkeys(name.strip() for name in names if name.strip()))
+    if not names:
+        return []
+
+    query = select(Keyword).where(Keyword.keyword.in_(names))  # type: ignore
+    result = await session.execute(query)
+    keywords = {keyword.keyword: keyword for keyword in result.scalars().all()}
+    missing = [{"keyword": name} for name in names if name not in keywords]
+    if missing:
+        # 多个分片并行发布时可能同时创建同一个关键词，冲突时沿用已有的行
+        if session.bind.dialect.name == "postgresql":
+            statement = postgresql_insert(Keyword).values(missing)
+        else:
+            statement = sqlite_insert(Keyword).values(missing)
+        await session.execute(
+            statement.on_conflict_do_nothing(index_elements=["keyword"])
+        )
+        result = await session.execute(query)
+        keywords = {keyword.keyword: keyword for keyword in result.scalars().all()}
+    return [keywords[name] for name in names]
+
+
+async def get_keyword_ids(
+    session: AsyncSession, repository_ids: Iterable[int]
+) -> List[int]:
+    """Keyword ids of the repositories, once per link."""
+    repository_ids = list(repository_ids)
+    if not repository_ids:
+        return []
+    result = await session.execute(
+        select(RepositoryKeywordLink.keyword_id).where(
+            RepositoryKeywordLink.repository_id.in_(repository_ids)  # type: ignore
+        )
+    )
+    return list(result.scalars().all())
+
+
+async def adjust_tag_counts(
+    session: AsyncSession, since: AllowedDateRanges, deltas: Mapping[int, int]
+):
+    """Add each keyword's delta to its trending count for ``since``.
+
+    Increments are one multi-row upsert, decrements one update per
+    distinct delta, clamped at zero.
+    """
+    increments = [
+        dict(since=since, keyword_id=keyword_id, count=delta)
+        for keyword_id, delta in deltas.items()
+        if delta > 0
+    ]
+    if increments:
+        if session.bind.dialect.name == "postgresql":
+            statement = postgresql_insert(KeywordCount).values(increments)
+        else:
+            statement = sqlite_insert(KeywordCount).values(increments)
+        await session.execute(
+            statement.on_conflict_do_update(
+                index_elements=["since", "keyword_id"],
+                set_={"count": KeywordCount.count + statement.excluded.count},
+            )
+        )
+
+    decrements: Dict[int, List[int]] = defaultdict(list)
+    for keyword_id, delta in deltas.items():
+        if delta < 0:
+            decrements[delta].append(keyword_id)
+    for delta, keyword_ids in decrements.items():
+        count = KeywordCount.count + delta
+        await session.execute(
+            update(KeywordCount)
+            .where(
+                KeywordCount.since == since,
+                KeywordCount.keyword_id.in_(keyword_ids),  # type: ignore
+            )
+            .values(count=case((count < 0, 0), else_=count))
+        )
+
+
+async def get_trending_repo_ids(
+    session: AsyncSession, since: AllowedDateRanges
+) -> Set[int]:
+    result = await session.execute(
+        select(TrendingRepository.repo_id).where(
+            TrendingRepository.since == since,
+            TrendingRepository.repo_id.is_not(None),  # type: ignore
+        )
+    )
+    return set(result.scalars().all())
+
+
+async def update_tag_counts(
+    session: AsyncSession, since: AllowedDateRanges, previous_repo_ids: Set[int]
+):
+    """Apply the difference between the previous and the current trending
+    repositories of ``since`` to the counts.
+    """
+    current_repo_ids = await get_trending_repo_ids(session, since)
+    deltas: Counter[int] = Counter()
+    deltas.subtract(
+        await get_keyword_ids(session, previous_repo_ids - current_repo_ids)
+    )
+    deltas.update(await get_keyword_ids(session, current_repo_ids - previous_repo_ids))
+    await adjust_tag_counts(session, since, deltas)
+
+
+async def release_trending_slots(session: AsyncSession, repository_id: int):
+    """Detach a repository that is about to be deleted from its trending
+    slots, taking its keywords out of the counts while its links still exist.
+    """
+    result = await session.execute(
+        select(TrendingRepository).where(TrendingRepository.repo_id == repository_id)
+    )
+    trending_repos = result.scalars().all()
+    if not trending_repos:
+        return
+
+    keyword_ids = await get_keyword_ids(session, [repository_id])
+    for trending_repo in trending_repos:
+        await adjust_tag_counts(
+            session,
+            trending_repo.since,
+            {keyword_id: -1 for keyword_id in keyword_ids},
+        )
+        trending_repo.repo_id = None
+
+
+async def get_tag_counts(
+    session: AsyncSession, since: AllowedDateRanges, limit: Optional[int] = None
+) -> List[TagCount]:
+    """Tags of the trending repositories of ``since``, most used first."""
+    result = await session.execute(
+        select(Keyword.keyword, KeywordCount.count)
+        .join(Keyword, Keyword.id == KeywordCount.keyword_id)  # type: ignore
+        .where(KeywordCount.since == since, KeywordCount.count > 0)
+        .order_by(KeywordCount.count.desc(), Keyword.keyword)  # type: ignore
+        .limit(limit)
+    )
+    return [TagCount(keyword=row[0], count=row[1]) for row in result.all()]
+
+
+async def migrate_legacy_keywords(conn: AsyncConnection):
+    """Move rows of the old per-repository ``repositorykeyword`` table into
+    the interned keyword tables, then rebuild the counts once.
+    """
+    legacy_exists = await conn.run_sync(
+        lambda sync_conn: sync_conn.dialect.has_table(sync_conn, "repositorykeyword")
+    )
+    if not legacy_exists:
+        return
+
+    await conn.execute(text("""INSERT INTO keyword (keyword)
+            SELECT DISTINCT keyword FROM repositorykeyword
+            WHERE keyword NOT IN (SELECT keyword FROM keyword)"""))
+    await conn.execute(
+        text("""INSERT INTO repositorykeywordlink (repository_id, keyword_id)
+            SELECT DISTINCT repositorykeyword.repository_id, keyword.id
+            FROM repositorykeyword
+            JOIN keyword ON keyword.keyword = repositorykeyword.keyword
+            WHERE repositorykeyword.repository_id IS NOT NULL""")
+    )
+    await conn.execute(text("DELETE FROM keywordcount"))
+    await conn.execute(text("""INSERT INTO keywordcount (since, keyword_id, count)
+            SELECT trendingrepository.since, repositorykeywordlink.keyword_id, count(*)
+            FROM trendingrepository
+            JOIN repositorykeywordlink
+                ON repositorykeywordlink.repository_id = trendingrepository.repo_id
+            GROUP BY trendingrepository.since, repositorykeywordlink.keyword_id"""))
+    await conn.execute(text("DROP TABLE repositorykeyword"))
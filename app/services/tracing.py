@@ -0,0 +1,144 @@
+"""Tracing
+===================
+Per-cycle timelines of the scheduler in the Chrome trace event format.
+
+While a scheduler cycle runs with tracing on, every span (slice, job,
+GitHub request, parse, LLM call, DB commit) is recorded with the asyncio
+task it ran in, and the cycle is written to ``TRACE_DIR`` as one JSON file
+that opens in Perfetto (https://ui.perfetto.dev) or ``chrome://tracing``.
+Each task gets its own track, so concurrent work and waits are visible
+side by side. Only the last ``TRACE_KEEP`` files are kept.
+
+Spans recorded by other processes (e.g. a job claimed by another web
+worker) end up in that process' own trace, if it has one running.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager, nullcontext
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any, AsyncGenerator, Dict, Iterator, List, Optional
+
+from app.config import Settings
+
+_NULL_SPAN = nullcontext()
+
+
+class Tracer:
+    def __init__(self):
+        self.is_enabled = Settings.app.TRACE_ENABLED
+        self.directory = Path(Settings.app.TRACE_DIR)
+        self.keep = Settings.app.TRACE_KEEP
+        self._events: Optional[List[Dict[str, Any]]] = None
+        self._tracks: Dict[int, int] = {}
+
+    def span(self, name: str, category: str, **args: Any):
+        """Time the block as one span of the running cycle, if any."""
+        if self._events is None:
+            return _NULL_SPAN
+        return self._span(name, category, args)
+
+    @contextmanager
+    def _span(self, name: str, category: str, args: Dict[str, Any]) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, category, started, time.perf_counter(), **args)
+
+    def add(self, name: str, category: str, started: float, ended: float, **args):
+        """Record a span measured elsewhere with ``time.perf_counter()``."""
+        if self._events is None:
+            return
+        self._events.append(
+            {
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                "ts": started * 1e6,
+                "dur": (ended - started) * 1e6,
+                "pid": os.getpid(),
+                "tid": self._track(),
+                "args": args,
+            }
+        )
+
+    def _track(self) -> int:
+        """One track per asyncio task, or per thread outside the event loop."""
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        ident = id(task) if task is not None else threading.get_ident()
+        track = self._tracks.get(ident)
+        if track is None:
+            track = self._tracks[ident] = len(self._tracks) + 1
+            name = (
+                task.get_name() if task is not None else threading.current_thread().name
+            )
+            self._events.append(  # type: ignore
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": os.getpid(),
+                    "tid": track,
+                    "args": {"name": name},
+                }
+            )
+        return track
+
+    @asynccontextmanager
+    async def cycle(self, name: str) -> AsyncGenerator[None, None]:
+        """Record the block as one trace file. Nested cycles join the outer one."""
+        if not self.is_enabled or self._events is not None:
+            yield
+            return
+
+        self._events, self._tracks = [], {}
+        started_at = datetime.now(UTC)
+        try:
+            with self._span(name, "cycle", {}):
+                yield
+        finally:
+            events, self._events = self._events, None
+            try:
+                await asyncio.to_thread(self._write, started_at, events)
+            except Exception as e:
+                logging.error(f"Error writing trace: {e}")
+
+    def _write(self, started_at: datetime, events: List[Dict[str, Any]]):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f"trace-{started_at:%Y%m%dT%H%M%S}-{os.getpid()}.json"
+        process = {
+            "name": "process_name",
+            "ph": "M",
+            "pid": os.getpid(),
+            "args": {"name": f"scheduler {os.getpid()}"},
+        }
+        path.write_text(
+            json.dumps({"traceEvents": [process, *events], "displayTimeUnit": "ms"})
+        )
+        for old in self.list()[self.keep :]:
+            old.unlink(missing_ok=True)
+
+    def list(self) -> List[Path]:
+        """Trace files, newest first."""
+        if not self.directory.is_dir():
+            return []
+        return sorted(
+            self.directory.glob("trace-*.json"),
+            key=lambda path: path.stat().st_mtime,
+            reverse=True,
+        )
+
+    def find(self, name: str) -> Optional[Path]:
+        return next((path for path in self.list() if path.name == name), None)
+
+
+# 创建全局追踪实例
+tracer = Tracer()
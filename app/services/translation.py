@@ -0,0 +1,98 @@
+"""Translation
+===================
+Per-language cache of AI summaries. Only the primary language is
+summarized from scratch; every other language is a translation of that
+summary, stored under a hash of its text.
+"""
+
+import hashlib
+from datetime import UTC, datetime
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import Settings
+from app.models import SummaryTranslation
+
+
+def summary_hash(summary: str) -> str:
+    return hashlib.sha1(summary.encode("utf-8")).hexdigest()
+
+
+def is_primary_language(language: str) -> bool:
+    return language == Settings.ai.SUMMARY_LANGUAGE
+
+
+async def get_translations(
+    session: AsyncSession, summaries: Iterable[Optional[str]], language: str
+) -> Dict[str, str]:
+    """Map each primary summary to its cached translation in ``language``.
+
+    Summaries without a translation are left out, callers fall back to the
+    primary summary.
+    """
+    if is_primary_language(language):
+        return {}
+
+    hashes = {summary_hash(summary): summary for summary in summaries if summary}
+    if not hashes:
+        return {}
+
+    result = await session.execute(
+        select(SummaryTranslation).where(
+            SummaryTranslation.source_hash.in_(hashes),  # type: ignore
+            SummaryTranslation.language == language,
+        )
+    )
+    return {
+        hashes[translation.source_hash]: translation.ai_summary
+        for translation in result.scalars().all()
+    }
+
+
+async def get_missing_languages(
+    session: AsyncSession, summary: str, languages: Iterable[str]
+) -> List[str]:
+    languages = [
+        language for language in languages if not is_primary_language(language)
+    ]
+    if not languages:
+        return []
+
+    result = await session.execute(
+        select(SummaryTranslation.language).where(
+            SummaryTranslation.source_hash == summary_hash(summary),
+            SummaryTranslation.language.in_(languages),  # type: ignore
+        )
+    )
+    existing = set(result.scalars().all())
+    return [language for language in languages if language not in existing]
+
+
+async def store_translations(
+    session: AsyncSession, summary: str, translations: Dict[str, str]
+):
+    """Insert translations, skipping languages another worker stored first."""
+    source_hash = summary_hash(summary)
+    rows = [
+        dict(
+            source_hash=source_hash,
+            language=language,
+            ai_summary=text,
+            created_at=datetime.now(UTC),
+        )
+        for language, text in translations.items()
+        if text
+    ]
+    if not rows:
+        return
+    if session.bind.dialect.name == "postgresql":
+        statement = postgresql_insert(SummaryTranslation).values(rows)
+    else:
+        statement = sqlite_insert(SummaryTranslation).values(rows)
+    await session.execute(
+        statement.on_conflict_do_nothing(index_elements=["source_hash", "language"])
+    )
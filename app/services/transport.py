@@ -0,0 +1,231 @@
+"""Transport
+===================
+Resilient GET requests to GitHub.
+
+Every request has a total, connect and read timeout, so a hung connection
+cannot stall a refresh. Timeouts, connection errors, ``429``, ``5xx`` and
+rate limited ``403`` responses are retried up to ``HTTP_RETRIES`` times
+with full-jitter exponential backoff, waiting for ``Retry-After`` instead
+when GitHub sends one. Other statuses fail at once.
+
+A circuit breaker per host fails fast while the host is throttling us or
+keeps failing: a ``Retry-After`` opens it for that long, and
+``BREAKER_THRESHOLD`` consecutive failures open it for ``BREAKER_COOLDOWN``
+seconds. Once that passes a single probe request is let through, and its
+result closes or reopens the breaker.
+
+Failures are raised as ``TransportError`` subclasses carrying the
+``retry_after`` the caller should wait before trying that URL again.
+"""
+
+import asyncio
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import TYPE_CHECKING, Any, Dict, Optional
+from urllib.parse import urlsplit
+
+from app.config import Settings
+from app.services.metrics import (
+    HTTP_FAILURES,
+    HTTP_REQUEST_SECONDS,
+    HTTP_RESPONSE_BYTES,
+    HTTP_RETRIES,
+)
+from app.services.tracing import tracer
+
+if TYPE_CHECKING:
+    import aiohttp
+
+RETRYABLE_STATUSES = (429, 500, 502, 503, 504)
+
+
+class TransportError(Exception):
+    """A GET request failed; ``retry_after`` is a hint in seconds, if any."""
+
+    reason = "error"
+    is_retryable = True
+
+    def __init__(self, url: str, message: str, retry_after: Optional[float] = None):
+        super().__init__(f"{message} ({url})")
+        self.url = url
+        self.retry_after = retry_after
+
+
+class RequestTimeout(TransportError):
+    reason = "timeout"
+
+
+class ConnectionFailed(TransportError):
+    reason = "connection"
+
+
+class HTTPStatusError(TransportError):
+    def __init__(self, url: str, status: int, retry_after: Optional[float] = None):
+        super().__init__(url, f"HTTP {status}", retry_after)
+        self.status = status
+        self.reason = str(status)
+        # GitHub 的二级限流返回 403 并带 Retry-After
+        self.is_retryable = status in RETRYABLE_STATUSES or (
+            status == 403 and retry_after is not None
+        )
+
+
+class CircuitOpen(TransportError):
+    """Raised without a request while the host's breaker is open."""
+
+    reason = "circuit_open"
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """``Retry-After`` in seconds, from either delta seconds or an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class CircuitBreaker:
+    def __init__(self, host: str):
+        self.host = host
+        self.failures = 0
+        self.opened_until = 0.0
+        self.is_probing = False
+
+    def check(self, url: str):
+        """Raise ``CircuitOpen`` unless a request may be sent now."""
+        now = time.monotonic()
+        if now < self.opened_until:
+            raise CircuitOpen(
+                url, f"circuit open for {self.host}", self.opened_until - now
+            )
+        if self.opened_until:
+            # 冷却结束后只放行一个探测请求
+            if self.is_probing:
+                raise CircuitOpen(
+                    url, f"circuit half-open for {self.host}", Settings.app.HTTP_BACKOFF
+                )
+            self.is_probing = True
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_until = 0.0
+        self.is_probing = False
+
+    def record_failure(self, retry_after: Optional[float] = None):
+        self.failures += 1
+        self.is_probing = False
+        if retry_after is not None:
+            self.opened_until = time.monotonic() + retry_after
+        elif self.failures >= Settings.app.BREAKER_THRESHOLD:
+            self.opened_until = time.monotonic() + Settings.app.BREAKER_COOLDOWN
+        elif self.opened_until:
+            # 探测失败，重新打开
+            self.opened_until = time.monotonic() + Settings.app.BREAKER_COOLDOWN
+
+    def status(self) -> dict:
+        return {
+            "host": self.host,
+            "failures": self.failures,
+            "open_for": max(self.opened_until - time.monotonic(), 0.0),
+        }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(url: str) -> CircuitBreaker:
+    host = urlsplit(url).netloc
+    breaker = _breakers.get(host)
+    if breaker is None:
+        breaker = _breakers[host] = CircuitBreaker(host)
+    return breaker
+
+
+def backoff_delay(attempt: int) -> float:
+    """Full jitter: uniform between 0 and the capped exponential delay."""
+    return random.uniform(
+        0, min(Settings.app.HTTP_BACKOFF * 2**attempt, Settings.app.HTTP_MAX_BACKOFF)
+    )
+
+
+async def _get_once(
+    session: "aiohttp.ClientSession", url: str, request_kwargs: Dict[str, Any]
+) -> str:
+    import aiohttp
+
+    timeout = aiohttp.ClientTimeout(
+        total=Settings.app.HTTP_TIMEOUT,
+        sock_connect=Settings.app.HTTP_CONNECT_TIMEOUT,
+        sock_read=Settings.app.HTTP_READ_TIMEOUT,
+    )
+    try:
+        async with session.get(url, timeout=timeout, **request_kwargs) as resp:
+            if resp.status != 200:
+                raise HTTPStatusError(
+                    url, resp.status, parse_retry_after(resp.headers.get("Retry-After"))
+                )
+            return await resp.text()
+    except asyncio.TimeoutError as e:
+        raise RequestTimeout(url, "request timed out") from e
+    except aiohttp.ClientError as e:
+        raise ConnectionFailed(url, f"{type(e).__name__}: {e}") from e
+
+
+async def fetch_text(
+    session: "aiohttp.ClientSession", url: str, **request_kwargs: Any
+) -> str:
+    """GET ``url`` with timeouts, retries and the host's circuit breaker."""
+    breaker = get_breaker(url)
+    attempt = 0
+    while True:
+        breaker.check(url)
+        started = time.perf_counter()
+        try:
+            text = await _get_once(session, url, request_kwargs)
+        except TransportError as e:
+            ended = time.perf_counter()
+            HTTP_REQUEST_SECONDS.observe(ended - started, "error")
+            HTTP_FAILURES.inc(e.reason)
+            tracer.add("GET", "http", started, ended, url=url, error=str(e))
+            if not e.is_retryable:
+                # 主机可以访问，只是这个地址不可用
+                breaker.record_success()
+                raise
+            breaker.record_failure(e.retry_after)
+            if attempt == Settings.app.HTTP_RETRIES or (
+                e.retry_after is not None
+                and e.retry_after > Settings.app.HTTP_MAX_BACKOFF
+            ):
+                # 等待太久时交给调用方稍后重试，不占用当前任务
+                raise
+            delay = (
+                e.retry_after if e.retry_after is not None else backoff_delay(attempt)
+            )
+            HTTP_RETRIES.inc(e.reason)
+            attempt += 1
+            await asyncio.sleep(delay)
+        except BaseException:
+            # 被取消时释放探测名额
+            breaker.is_probing = False
+            raise
+        else:
+            ended = time.perf_counter()
+            breaker.record_success()
+            HTTP_REQUEST_SECONDS.observe(ended - started, "ok")
+            HTTP_RESPONSE_BYTES.inc(amount=len(text))
+            tracer.add(
+                "GET",
+                "http",
+                started,
+                ended,
+                url=url,
+                params=request_kwargs.get("params"),
+            )
+            return text
@@ -0,0 +1,54 @@
+"""
+Standalone scheduler process.
+
+Run ``python -m app.worker`` to refresh trending data outside the web tier,
+e.g. next to ``SCHEDULER_ENABLED=false uvicorn app.main:app --workers 4``.
+Several workers may run at once, only the lease holder schedules refreshes
+while every worker claims jobs from the durable job queue, so adding
+workers (on any host sharing the database) spreads the AI calls.
+"""
+
+import asyncio
+import logging
+import signal
+
+from app.config import Settings
+from app.database import create_db_and_tables
+from app.services.leader import leader
+from app.services import parsing
+from app.services.metrics import loop_lag, metrics
+from app.services.retention import retention
+from app.services.scheduler import scheduler
+
+
+def stop():
+    leader.stop()
+    scheduler.worker.stop()
+    retention.stop()
+    metrics.stop()
+    loop_lag.stop()
+
+
+async def main():
+    await create_db_and_tables()
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop)
+
+    try:
+        await asyncio.gather(
+            leader.run(scheduler),
+            scheduler.worker.run(),
+            retention.run(lambda: leader.is_leader),
+            metrics.run(),
+            loop_lag.run(),
+        )
+    finally:
+        await scheduler.github_service.close()
+        parsing.shutdown()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=Settings.app.LOG_LEVEL.upper())
+    asyncio.run(main())
@@ -0,0 +1,59 @@
+"""Micro-benchmark of parsing one trending page.
+
+Reports time and peak allocation per page for each parsing step::
+
+    python tests/bench_scraping.py [articles per page] [pages]
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable
+
+sys.path[:0] = [str(Path(__file__).resolve().parent.parent)]
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from trending_pages import developers_page, repositories_page  # noqa: E402
+
+from app.services.scraping import (  # noqa: E402
+    filter_articles,
+    make_soup,
+    scraping_developers,
+    scraping_repositories,
+)
+
+
+def bench(label: str, fn: Callable[[], object], pages: int):
+    fn()
+    started = time.perf_counter()
+    for _ in range(pages):
+        fn()
+    elapsed = (time.perf_counter() - started) / pages
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:32s} {elapsed * 1e3:8.3f} ms/page  peak {peak / 1024:8.1f} KiB")
+
+
+def main(articles: int = 25, pages: int = 200):
+    for kind, page, extract in (
+        ("repositories", repositories_page(articles), scraping_repositories),
+        ("developers", developers_page(articles), scraping_developers),
+    ):
+        articles_html = filter_articles(page)
+        matches = make_soup(articles_html)
+        bench(f"{kind}: filter", lambda: filter_articles(page), pages)
+        bench(f"{kind}: soup", lambda: make_soup(articles_html), pages)
+        bench(f"{kind}: records", lambda: extract(matches), pages)
+        bench(
+            f"{kind}: filter+soup+records",
+            lambda: extract(make_soup(filter_articles(page))),
+            pages,
+        )
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,83 @@
+"""Micro-benchmark of the similar-repositories index.
+
+Builds the index over generated repositories, then reports the time to
+append a slice of new repositories and to look up the top-k neighbors of
+one published snapshot::
+
+    python tests/bench_similarity.py [repositories] [snapshot size] [rounds]
+"""
+
+import itertools
+import os
+import random
+import sys
+import time
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Callable, List, Tuple
+
+sys.path[:0] = [str(Path(__file__).resolve().parent.parent)]
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from app.config import Settings  # noqa: E402
+from app.services.similarity import SimilarityIndex  # noqa: E402
+
+# 真实描述的词频大致服从 Zipf 分布：少数常见词，大量罕见词
+VOCABULARY = 50_000
+CJK = [chr(0x4E00 + i) for i in range(3000)]
+
+
+def zipf_weights(n: int) -> List[float]:
+    """Cumulative weights, so ``random.choices`` does not sum them per call."""
+    return list(itertools.accumulate(1 / rank for rank in range(1, n + 1)))
+
+
+def documents(start: int, count: int, rng: random.Random) -> List[Tuple]:
+    created_at = datetime.now(UTC)
+    words = [f"word{i}" for i in range(VOCABULARY)]
+    word_weights = zipf_weights(VOCABULARY)
+    cjk_weights = zipf_weights(len(CJK))
+    return [
+        (
+            i,
+            created_at,
+            f"user{i}",
+            f"project{i}",
+            f"https://github.com/user{i}/project{i}",
+            " ".join(rng.choices(words, cum_weights=word_weights, k=12)),
+            "".join(rng.choices(CJK, cum_weights=cjk_weights, k=30)),
+            " ".join(rng.choices(words, cum_weights=word_weights, k=4)),
+        )
+        for i in range(start, start + count)
+    ]
+
+
+def bench(label: str, fn: Callable[[], object], rounds: int = 1):
+    started = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    elapsed = (time.perf_counter() - started) / rounds
+    print(f"{label:32s} {elapsed * 1e3:10.3f} ms")
+
+
+def main(repositories: int = 100_000, snapshot: int = 25, rounds: int = 20):
+    rng = random.Random(0)
+    index = SimilarityIndex()
+    corpus = documents(0, repositories, rng)
+    bench("build", lambda: index._apply([], corpus))
+
+    # 追加一个分片的新仓库，不触发重新加权
+    Settings.app.SIMILARITY_REWEIGHT_RATIO = 1.0
+    added = documents(repositories, snapshot, rng)
+    bench("append slice", lambda: index._apply([], added))
+    ids = [document[0] for document in added]
+    k = Settings.app.SIMILAR_REPOSITORIES
+    index._neighbors(ids, k)
+    bench(
+        f"top-{k} of {snapshot} repositories", lambda: index._neighbors(ids, k), rounds
+    )
+    bench("mask removed", lambda: index._apply(ids[:1], []))
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:4]))
@@ -0,0 +1,167 @@
+"""Test configuration
+===================
+Settings are read from the environment when ``app`` is first imported, so
+they are pinned here before any test module imports it.
+
+The suite runs against a fresh SQLite database in a temporary directory.
+Set ``TEST_DATABASE_URL`` to an empty PostgreSQL database to run the same
+tests against PostgreSQL, for example a throwaway cluster::
+
+    initdb -D /tmp/pgdata && pg_ctl -D /tmp/pgdata -o "-p 55432" start
+    createdb -p 55432 trending
+    TEST_DATABASE_URL=postgresql+asyncpg://localhost:55432/trending pytest
+"""
+
+import inspect
+import os
+import tempfile
+from dataclasses import dataclass
+from typing import Dict, List
+
+import pytest
+
+TEST_DIR = tempfile.mkdtemp(prefix="github-trending-tests-")
+
+os.environ.update(
+    DATABASE_URL=os.environ.get(
+        "TEST_DATABASE_URL", f"sqlite+aiosqlite:///{TEST_DIR}/test.db"
+    ),
+    OPENAI_API_KEY="test",
+    SUMMARY_LANGUAGES="简体中文,English",
+    SCHEDULER_ENABLED="false",
+    RETENTION_INTERVAL="0",
+    RETRY_DELAY="0",
+    JOB_POLL_INTERVAL="0.05",
+    IMAGE_CACHE_DIR=f"{TEST_DIR}/images",
+    TRACE_DIR=f"{TEST_DIR}/traces",
+    PROFILE_DIR=f"{TEST_DIR}/profiles",
+)
+os.environ.pop("EXPORT_DIR", None)
+os.environ.pop("ARCHIVE_DIR", None)
+os.environ.pop("METRICS_DIR", None)
+
+
+@pytest.fixture(scope="session")
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(scope="session")
+async def event_loop_for_session():
+    """Run every async test on one event loop: the app's global singletons
+    hold asyncio locks and events bound to the loop that first used them.
+    """
+    yield
+
+
+def pytest_collection_modifyitems(items):
+    for item in items:
+        if item.get_closest_marker("anyio") and inspect.iscoroutinefunction(
+            getattr(item, "function", None)
+        ):
+            item.fixturenames.insert(0, "event_loop_for_session")
+
+
+@pytest.fixture
+async def database():
+    """Empty tables, and no snapshot or job left over from another test."""
+    from sqlalchemy import text
+    from sqlmodel import SQLModel
+
+    from app.database import create_db_and_tables, engine
+    from app.services.cache import feed_cache
+    from app.services.read_model import read_model
+    from app.services.search import BIGRAM_TABLE, FTS_TABLE
+
+    engine.echo = False
+    await create_db_and_tables()
+    async with engine.begin() as conn:
+        for table in reversed(SQLModel.metadata.sorted_tables):
+            await conn.execute(table.delete())
+        await conn.execute(text(f"DELETE FROM {FTS_TABLE}"))
+        if conn.dialect.name == "sqlite":
+            await conn.execute(text(f"DELETE FROM {BIGRAM_TABLE}"))
+    read_model._snapshots.clear()
+    # 版本号随数据库一起从头开始，缓存的页面不能留给下一个测试
+    feed_cache._entries.clear()
+    yield engine
+    await engine.dispose()
+
+
+@dataclass
+class FakeServices:
+    """Stands in for GitHub and the model; rankings are set per test."""
+
+    repositories: List
+    developers: List
+    calls: Dict[str, int]
+
+    async def get_trending_repositories(self, since=None, **kwargs):
+        self.calls["repositories"] += 1
+        return list(self.repositories)
+
+    async def get_trending_developers(self, since=None, **kwargs):
+        self.calls["developers"] += 1
+        return list(self.developers)
+
+    async def generate_summary(self, data, language=None):
+        self.calls["summary"] += 1
+        return f"{data.username} 的云原生工具"
+
+    async def generate_tags(self, data, language=None):
+        self.calls["tags"] += 1
+        return ["DevOps", "云计算", f"tag-{data.username}"]
+
+    async def translate_summary(self, summary, languages):
+        self.calls["translate"] += 1
+        return {language: f"[{language}] {summary}" for language in languages}
+
+
+def scraped_repositories(names: List[str]):
+    from app.services.scraping import ScrapedRepository
+
+    return [
+        ScrapedRepository(
+            rank=rank,
+            username=name,
+            repository_name=f"{name}-project",
+            url=f"https://github.com/{name}/{name}-project",
+            description=f"A kubernetes tool made by {name}",
+            language="Python",
+            language_color="#3572A5",
+            total_stars=1000 * rank,
+            forks=10 * rank,
+            stars_since=rank,
+        )
+        for rank, name in enumerate(names, start=1)
+    ]
+
+
+def scraped_developers(names: List[str]):
+    from app.services.scraping import ScrapedDeveloper
+
+    return [
+        ScrapedDeveloper(rank=rank, username=name, url=f"https://github.com/{name}")
+        for rank, name in enumerate(names, start=1)
+    ]
+
+
+@pytest.fixture
+def services(database, monkeypatch):
+    """The global scheduler wired to fake GitHub and AI services."""
+    from app.services.scheduler import scheduler
+
+    fake = FakeServices(
+        repositories=scraped_repositories([f"user{i}" for i in range(5)]),
+        developers=scraped_developers([f"dev{i}" for i in range(3)]),
+        calls={
+            "repositories": 0,
+            "developers": 0,
+            "summary": 0,
+            "tags": 0,
+            "translate": 0,
+        },
+    )
+    monkeypatch.setattr(scheduler, "github_service", fake)
+    monkeypatch.setattr(scheduler, "ai_service", fake)
+    return fake
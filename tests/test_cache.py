@@ -0,0 +1,78 @@
+"""Conditional and compressed responses of cached pages."""
+
+from dataclasses import replace
+from datetime import UTC, datetime
+
+import pytest
+from starlette.requests import Request
+
+from app.services.cache import RenderedPage, accepted_encodings
+
+PUBLISHED = datetime(2026, 10, 19, 8, 30, tzinfo=UTC)
+
+
+def request(**headers: str) -> Request:
+    return Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "path": "/",
+            "headers": [
+                (name.replace("_", "-").encode(), value.encode())
+                for name, value in headers.items()
+            ],
+        }
+    )
+
+
+@pytest.fixture
+def page() -> RenderedPage:
+    return RenderedPage.build(b"<html>trending</html>" * 50, PUBLISHED)
+
+
+@pytest.mark.parametrize(
+    "if_modified_since, status",
+    [
+        ("Mon, 19 Oct 2026 08:30:00 GMT", 304),
+        ("Mon, 19 Oct 2026 08:30:00 -0000", 304),
+        ("Mon, 19 Oct 2026 10:30:00 +0200", 304),
+        ("Mon, 19 Oct 2026 08:29:59 GMT", 200),
+        ("not a date", 200),
+    ],
+)
+def test_if_modified_since(page, if_modified_since, status):
+    response = page.response(request(if_modified_since=if_modified_since), "text/html")
+    assert response.status_code == status
+
+
+def test_if_none_match(page):
+    assert (
+        page.response(request(if_none_match=page.etag), "text/html").status_code == 304
+    )
+    assert page.response(request(if_none_match='W/"x"'), "text/html").status_code == 200
+
+
+def test_accepted_encodings():
+    assert accepted_encodings("gzip, br;q=0, *;q=0.1") == {
+        "gzip": 1.0,
+        "br": 0.0,
+        "*": 0.1,
+    }
+    assert accepted_encodings("") == {}
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, encoding",
+    [
+        ("gzip, deflate, br", "br"),
+        ("gzip, br;q=0", "gzip"),
+        ("br;q=0, gzip;q=0", None),
+        ("*", "br"),
+        ("identity", None),
+    ],
+)
+def test_content_encoding(page, accept_encoding, encoding):
+    # 不依赖是否安装了 brotli
+    page = replace(page, brotli_body=b"br")
+    response = page.response(request(accept_encoding=accept_encoding), "text/html")
+    assert response.headers.get("content-encoding") == encoding
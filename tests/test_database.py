@@ -0,0 +1,194 @@
+"""The refresh write path on the configured backend.
+
+Runs on SQLite by default and on PostgreSQL with ``TEST_DATABASE_URL``
+(see ``conftest.py``), so dialect-specific upserts, migrations and search
+are checked on both.
+"""
+
+import pytest
+from conftest import scraped_repositories
+from sqlalchemy import text
+
+import app.services.scheduler as scheduler_module
+from app.database import (
+    create_db_and_tables,
+    engine_options,
+    get_session,
+    migrate_duplicate_developers,
+)
+from app.enums import AllowedDateRanges, AllowedTrendingKinds
+from app.services.read_model import read_model
+from app.services.scheduler import scheduler, upsert_developers
+from app.services.search import search_repositories
+from app.services.tags import get_tag_counts
+
+pytestmark = pytest.mark.anyio
+
+# 按当前排名重新统计的标签数，应与 keywordcount 中的计数一致
+RECOUNTED_TAGS = """SELECT trendingrepository.since, link.keyword_id, count(*)
+    FROM trendingrepository
+    JOIN repositorykeywordlink AS link
+        ON link.repository_id = trendingrepository.repo_id
+    GROUP BY trendingrepository.since, link.keyword_id"""
+
+
+def repository_slices(*ranges: AllowedDateRanges):
+    return [
+        scheduler.slices[(AllowedTrendingKinds.repositories, since)] for since in ranges
+    ]
+
+
+async def fetch_all(statement: str) -> list:
+    async with get_session() as session:
+        return sorted((await session.execute(text(statement))).all())
+
+
+def test_engine_options():
+    assert engine_options("sqlite+aiosqlite:///trending.db").keys() == {"url"}
+
+    options = engine_options("postgresql+asyncpg://localhost/trending")
+    assert options["pool_pre_ping"]
+    assert {"pool_size", "max_overflow", "pool_timeout", "pool_recycle"} <= set(options)
+    assert "prepared_statement_cache_size" in options["url"].query
+
+
+async def test_refresh_rounds_keep_tag_counts_consistent(services):
+    await scheduler.run_slices(list(scheduler.slices.values()))
+    # 第二轮有仓库掉出榜单，也有新仓库上榜
+    services.repositories = scraped_repositories([f"user{i}" for i in range(3, 8)])
+    await scheduler.run_slices(repository_slices(*AllowedDateRanges))
+    assert not scheduler.is_any_failure
+
+    counts = await fetch_all(
+        "SELECT since, keyword_id, count FROM keywordcount WHERE count > 0"
+    )
+    assert counts == await fetch_all(RECOUNTED_TAGS)
+
+    async with get_session() as session:
+        tags = await get_tag_counts(session, AllowedDateRanges.daily)
+    assert {tag.keyword: tag.count for tag in tags}["DevOps"] == 5
+    assert "tag-user0" not in {tag.keyword for tag in tags}
+    snapshot = await read_model.get(AllowedDateRanges.daily)
+    assert [repo.username for repo in snapshot.repositories] == [
+        f"user{i}" for i in range(3, 8)
+    ]
+    # 快照的标签计数来自 keywordcount，与按标签筛选出的仓库数一致
+    assert list(snapshot.tags) == tags
+    assert {tag.keyword: tag.count for tag in tags} == {
+        keyword: len(repos) for keyword, repos in snapshot.by_tag.items()
+    }
+
+
+async def test_failed_publish_is_retried_from_scratch(services, monkeypatch):
+    daily = repository_slices(AllowedDateRanges.daily)
+    await scheduler.run_slices(daily)
+
+    real = scheduler_module.update_changed
+    calls = {"count": 0}
+
+    def crash_midway(row, scraped):
+        calls["count"] += 1
+        if calls["count"] == 3:
+            raise RuntimeError("crash in the middle of publishing")
+        return real(row, scraped)
+
+    monkeypatch.setattr(scheduler_module, "update_changed", crash_midway)
+    services.repositories = scraped_repositories(
+        [repo.username for repo in reversed(services.repositories)]
+    )
+    await scheduler.run_slices(daily)
+
+    # 发布失败整体回滚，重试时从头发布，计数不会被算两次
+    attempts = await fetch_all(
+        "SELECT attempts FROM refreshjob WHERE kind = 'publish_slice'"
+    )
+    assert attempts[-1] == (2,)
+    counts = await fetch_all(
+        "SELECT since, keyword_id, count FROM keywordcount WHERE count > 0"
+    )
+    assert counts == await fetch_all(RECOUNTED_TAGS)
+    snapshot = await read_model.get(AllowedDateRanges.daily)
+    assert [repo.username for repo in snapshot.repositories] == [
+        repo.username for repo in services.repositories
+    ]
+
+
+async def test_developer_slices_share_rows(services):
+    await scheduler.run_slices(
+        [
+            scheduler.slices[(AllowedTrendingKinds.developers, since)]
+            for since in AllowedDateRanges
+        ]
+    )
+    rows = await fetch_all(
+        "SELECT username, summary_language, count(*) FROM developer"
+        " GROUP BY username, summary_language"
+    )
+    assert {row[2] for row in rows} == {1}
+    assert len(rows) == len(services.developers)
+
+    # 另一个进程写入同一开发者时合并到已有行，不覆盖已有总结
+    from app.models import Developer
+
+    developer = services.developers[0]
+    async with get_session() as session:
+        ids = await upsert_developers(
+            session,
+            [
+                Developer(
+                    rank=9,
+                    username=developer.username,
+                    url=developer.url,
+                    summary_language=rows[0][1],
+                )
+            ],
+        )
+        await session.commit()
+    summaries = await fetch_all(
+        "SELECT id, rank, ai_summary FROM developer"
+        f" WHERE username = '{developer.username}'"
+        f" AND summary_language = '{rows[0][1]}'"
+    )
+    assert [(row[0], row[1]) for row in summaries] == [(ids[developer.username], 9)]
+    assert summaries[0][2]
+
+
+async def test_duplicate_developers_are_merged(database):
+    async with database.begin() as conn:
+        await conn.execute(text("DROP INDEX uq_developer_username_language"))
+        for _ in range(3):
+            await conn.execute(text("""INSERT INTO developer
+                    (rank, username, url, summary_language, created_at, updated_at)
+                VALUES (1, 'dup', 'https://github.com/dup', '简体中文',
+                    CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)"""))
+        ids = (
+            await conn.execute(text("SELECT id FROM developer ORDER BY id"))
+        ).scalars()
+        ids = list(ids)
+        await conn.execute(
+            text("""INSERT INTO trendingdeveloper (since, rank, developer_id)
+                VALUES ('daily', 1, :developer_id)"""),
+            {"developer_id": ids[-1]},
+        )
+
+    await create_db_and_tables()
+    assert await fetch_all("SELECT id FROM developer") == [(ids[0],)]
+    assert await fetch_all("SELECT developer_id FROM trendingdeveloper") == [(ids[0],)]
+
+    # 唯一索引已补建，再次迁移不会出错
+    async with database.begin() as conn:
+        await migrate_duplicate_developers(conn)
+
+
+async def test_search(services):
+    await scheduler.run_slices(repository_slices(AllowedDateRanges.daily))
+    async with get_session() as session:
+        results = await search_repositories(session, "kubernetes user2")
+        weekly = await search_repositories(
+            session, "kubernetes", since=AllowedDateRanges.weekly
+        )
+        missing = await search_repositories(session, "nonexistent")
+    assert results[0].username == "user2"
+    assert results[0].since == AllowedDateRanges.daily
+    assert weekly == []
+    assert missing == []
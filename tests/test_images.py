@@ -0,0 +1,170 @@
+"""Image proxy against a stub origin on localhost."""
+
+import asyncio
+import io
+
+import httpx
+import pytest
+from aiohttp import web
+from PIL import Image
+
+from app.config import Settings
+from app.enums import AllowedDateRanges
+from app.services.images import ImageCache, ImageProxy, open_graph_version
+from app.services.read_model import read_model
+
+pytestmark = pytest.mark.anyio
+
+
+def png(width: int, height: int) -> bytes:
+    output = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 30, 30)).save(output, "PNG")
+    return output.getvalue()
+
+
+class StubOrigin:
+    def __init__(self):
+        self.requests = []
+        self.is_down = False
+
+    async def avatar(self, request: web.Request) -> web.Response:
+        self.requests.append(request.path_qs)
+        await asyncio.sleep(0.1)
+        if self.is_down:
+            return web.Response(status=503)
+        if request.match_info["name"] == "ghost.png":
+            return web.Response(status=404)
+        # 和 GitHub 一样忽略 size，总是返回大图
+        return web.Response(body=png(460, 460), content_type="image/png")
+
+    async def open_graph(self, request: web.Request) -> web.Response:
+        self.requests.append(request.path_qs)
+        return web.Response(body=png(1200, 600), content_type="image/png")
+
+
+@pytest.fixture
+async def origin(free_tcp_port, monkeypatch):
+    stub = StubOrigin()
+    app = web.Application()
+    app.router.add_get("/avatars/{name}", stub.avatar)
+    app.router.add_get("/og/{version}/{username}/{repository_name}", stub.open_graph)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", free_tcp_port).start()
+    base = f"http://127.0.0.1:{free_tcp_port}"
+    monkeypatch.setattr(Settings.app, "IMAGE_AVATAR_ORIGIN", f"{base}/avatars")
+    monkeypatch.setattr(Settings.app, "IMAGE_OG_ORIGIN", f"{base}/og")
+    yield stub
+    await runner.cleanup()
+
+
+@pytest.fixture
+async def client(origin, tmp_path, monkeypatch):
+    import app.api.images as routes
+    from app.main import app
+
+    proxy = ImageProxy(ImageCache(str(tmp_path / "images"), 10 * 1024 * 1024))
+    monkeypatch.setattr(routes, "image_proxy", proxy)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+    await proxy.close()
+
+
+async def test_concurrent_misses_share_one_origin_request(client, origin):
+    responses = await asyncio.gather(
+        *(client.get("/img/avatar/octocat?size=80") for _ in range(20))
+    )
+    assert {response.status_code for response in responses} == {200}
+    assert len(origin.requests) == 1
+    # 请求被归到最近的缓存尺寸并按显示尺寸缩小
+    assert origin.requests[0].endswith("/octocat.png?size=80")
+    assert Image.open(io.BytesIO(responses[0].content)).size == (80, 80)
+    assert "max-age" in responses[0].headers["cache-control"]
+
+    revalidated = await client.get(
+        "/img/avatar/octocat?size=70",
+        headers={"if-none-match": responses[0].headers["etag"]},
+    )
+    assert revalidated.status_code == 304
+    assert len(origin.requests) == 1
+
+
+async def test_origin_errors(client, origin):
+    missing = await client.get("/img/avatar/ghost")
+    assert missing.status_code == 404
+
+    origin.is_down = True
+    assert (await client.get("/img/avatar/nobody")).status_code == 502
+    assert (await client.get("/img/avatar/..%2Fetc")).status_code in (404, 422)
+
+
+async def test_stale_copy_served_when_origin_fails(client, origin, monkeypatch):
+    assert (await client.get("/img/avatar/octocat")).status_code == 200
+    monkeypatch.setattr(Settings.app, "IMAGE_AVATAR_TTL", 0)
+    origin.is_down = True
+    response = await client.get("/img/avatar/octocat")
+    assert response.status_code == 200
+    assert len(origin.requests) == 2
+
+
+async def test_file_evicted_by_another_process_is_refetched(client, origin):
+    import app.api.images as routes
+
+    assert (await client.get("/img/avatar/octocat")).status_code == 200
+    for entry in routes.image_proxy.cache._entries.values():
+        entry.path.unlink()
+    response = await client.get("/img/avatar/octocat")
+    assert response.status_code == 200
+    assert response.content
+    assert len(origin.requests) == 2
+
+
+async def test_open_graph_only_for_generated_versions(client, origin, services):
+    from app.services.scheduler import scheduler
+
+    await scheduler.run_slices(list(scheduler.slices.values()))
+    snapshot = await read_model.get(AllowedDateRanges.daily)
+    repo = snapshot.repositories[0]
+    path = f"/img/og/{repo.username}/{repo.repository_name}"
+    version = open_graph_version(repo)
+
+    response = await client.get(f"{path}?v={version}")
+    assert response.status_code == 200
+    assert response.headers["cache-control"].endswith("immutable")
+    assert Image.open(io.BytesIO(response.content)).width == Settings.app.IMAGE_OG_WIDTH
+    assert origin.requests == [f"/og/{version}/{repo.username}/{repo.repository_name}"]
+
+    # 过期或伪造的版本号跳转到当前版本，不会转发给源站
+    latest = max(
+        [
+            record
+            for since in AllowedDateRanges
+            for record in (await read_model.get(since)).repositories
+            if record.url == repo.url
+        ],
+        key=lambda record: record.updated_at,
+    )
+    redirect = await client.get(f"{path}?v=0123abcd")
+    assert redirect.status_code == 307
+    assert redirect.headers["location"].endswith(f"?v={open_graph_version(latest)}")
+    unknown = await client.get(f"/img/og/someone/else?v={version}")
+    assert unknown.status_code == 404
+    assert len(origin.requests) == 1
+
+
+async def test_cache_is_bounded_and_reloaded(origin, tmp_path):
+    directory = str(tmp_path / "images")
+    proxy = ImageProxy(ImageCache(directory, len(png(80, 80)) * 3))
+    for name in ("a", "b", "c", "d", "e"):
+        await proxy.avatar(name, 80)
+    await proxy.close()
+    assert len(proxy.cache._entries) < 5
+    assert proxy.cache.total_bytes <= proxy.cache.max_bytes
+
+    # 新进程从目录恢复 LRU 顺序，最近的图片仍然命中
+    reloaded = ImageProxy(ImageCache(directory, proxy.cache.max_bytes))
+    requests = len(origin.requests)
+    await reloaded.avatar("e", 80)
+    await reloaded.close()
+    assert len(origin.requests) == requests
@@ -0,0 +1,80 @@
+"""Import-time budget for the web app and the CLI.
+
+New read workers take traffic only after ``import app.main``, so heavy
+libraries must stay behind first use. The budget covers what the app adds
+on top of the web framework and the ORM, measured with ``-X importtime``;
+override it with ``IMPORT_TIME_BUDGET_MS`` on slow machines.
+"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+BUDGET_MS = float(os.environ.get("IMPORT_TIME_BUDGET_MS", 300))
+
+# 框架本身的导入时间不计入预算
+FRAMEWORK = (
+    "fastapi",
+    "fastapi.templating",
+    "sqlmodel",
+    "sqlalchemy.ext.asyncio",
+    "sqlalchemy.dialects.postgresql",
+    "sqlalchemy.dialects.sqlite",
+    "pydantic_settings",
+    "jinja2",
+    "dotenv",
+)
+
+# 只在抓取、总结、生成 feed、处理图片或计算相似度时才加载
+LAZY_MODULES = (
+    "aiohttp",
+    "bs4",
+    "feedgen",
+    "lxml",
+    "numpy",
+    "openai",
+    "PIL",
+    "scipy",
+)
+
+
+def run_python(*args: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *args],
+        cwd=ROOT,
+        env=os.environ.copy(),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def import_time_ms(module: str) -> float:
+    """Cumulative import time of ``module`` once the framework is loaded."""
+    statement = f"import {', '.join(FRAMEWORK)}; import {module}"
+    stderr = run_python("-X", "importtime", "-c", statement).stderr
+    for line in reversed(stderr.splitlines()):
+        _, cumulative, name = line.split("|")
+        if name.strip() == module:
+            return int(cumulative) / 1000
+    raise AssertionError(f"{module} missing from -X importtime output")
+
+
+@pytest.mark.parametrize("module", ["app.main", "app.cli"])
+def test_import_time_budget(module):
+    # 取三次中最快的一次，减少机器负载带来的抖动
+    elapsed = min(import_time_ms(module) for _ in range(3))
+    assert elapsed < BUDGET_MS, f"import {module} took {elapsed:.0f} ms"
+
+
+def test_heavy_modules_load_lazily():
+    statement = (
+        "import sys, app.main, app.cli; "
+        f"print(' '.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    )
+    assert run_python("-c", statement).stdout.split() == []
@@ -0,0 +1,48 @@
+"""Durable job queue and worker."""
+
+import asyncio
+
+import pytest
+
+from app.database import get_session
+from app.enums import JobKind, JobStatus
+from app.services.jobs import JobQueue, JobWorker
+
+pytestmark = pytest.mark.anyio
+
+
+async def enqueue(queue: JobQueue, *keys: str):
+    async with get_session() as session:
+        for key in keys:
+            await queue.enqueue(session, JobKind.fetch_slice, key, {})
+        await session.commit()
+
+
+async def test_worker_survives_errors_recording_a_result(database, monkeypatch):
+    queue = JobQueue()
+    handled = []
+
+    async def handler(job):
+        handled.append(job.idempotency_key)
+        return {}
+
+    worker = JobWorker(queue, {JobKind.fetch_slice: handler})
+    worker.concurrency = 1
+    real_complete = queue.complete
+
+    async def locked_once(job, owner, result):
+        if job.idempotency_key == "first":
+            raise RuntimeError("database is locked")
+        await real_complete(job, owner, result)
+
+    monkeypatch.setattr(queue, "complete", locked_once)
+    await enqueue(queue, "first", "second")
+    async with worker.running():
+        second = await asyncio.wait_for(queue.wait("second", 0.05), timeout=5)
+
+    assert handled == ["first", "second"]
+    assert second.status == JobStatus.done
+    async with get_session() as session:
+        first = await queue.get(session, "first")
+    # 结果没有记下来，租约过期后会被重新领取
+    assert first.status == JobStatus.running
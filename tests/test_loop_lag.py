@@ -0,0 +1,130 @@
+"""Read latency while a crawl is parsing pages.
+
+Stubs the GitHub fetch with a generated page and runs a burst of
+concurrent crawls through the real service, then compares the p99 of
+JSON API requests and of event-loop lag with an idle run. With the process
+parse pool readers must not notice the crawl; ``LOOP_LAG_MARGIN_MS``
+loosens the margin on slow machines.
+"""
+
+import asyncio
+import os
+import time
+from typing import List
+
+import httpx
+import pytest
+from trending_pages import repositories_page
+
+import app.services.github as github
+from app.config import Settings
+from app.enums import AllowedDateRanges
+from app.services import parsing
+
+pytestmark = pytest.mark.anyio
+
+MARGIN_MS = float(os.environ.get("LOOP_LAG_MARGIN_MS", 50))
+
+# 12 个语言分片跑 4 轮，每页 25 个仓库
+CRAWL_ROUNDS = 4
+CRAWL_SLICES = 12
+
+
+def p99(samples: List[float]) -> float:
+    samples = sorted(samples)
+    return samples[min(int(len(samples) * 0.99), len(samples) - 1)] * 1000
+
+
+async def sample_loop_lag(lags: List[float], stop: asyncio.Event):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.002)
+        lags.append(time.perf_counter() - started - 0.002)
+
+
+async def sample_requests(
+    client: httpx.AsyncClient, latencies: List[float], stop: asyncio.Event
+):
+    while not stop.is_set():
+        started = time.perf_counter()
+        response = await client.get("/api/repositories/daily")
+        latencies.append(time.perf_counter() - started)
+        assert response.status_code == 200
+
+
+async def measure(client: httpx.AsyncClient, workload) -> tuple[float, float]:
+    """p99 request latency and loop lag in ms while ``workload`` runs."""
+    latencies, lags, stop = [], [], asyncio.Event()
+    samplers = [
+        asyncio.create_task(sample_requests(client, latencies, stop)),
+        asyncio.create_task(sample_loop_lag(lags, stop)),
+    ]
+    await workload()
+    stop.set()
+    await asyncio.gather(*samplers)
+    return p99(latencies), p99(lags)
+
+
+@pytest.fixture
+async def client(services):
+    from app.main import app
+    from app.services.scheduler import scheduler
+
+    await scheduler.run_slices(list(scheduler.slices.values()))
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+
+
+@pytest.fixture
+async def crawler(request, monkeypatch):
+    page = repositories_page(25)
+
+    async def get_request(url, **kwargs):
+        await asyncio.sleep(0.01)
+        return page
+
+    monkeypatch.setattr(github, "get_request", get_request)
+    monkeypatch.setattr(Settings.app, "PARSE_EXECUTOR", request.param)
+    parsing.shutdown()
+    service = github.GitHubTrendingService()
+    yield service
+    await service.close()
+    parsing.shutdown()
+
+
+async def idle_and_crawl(client, crawler) -> tuple[float, float, float, float]:
+    async def crawl():
+        for _ in range(CRAWL_ROUNDS):
+            await asyncio.gather(
+                *(
+                    crawler.get_trending_repositories(since=AllowedDateRanges.daily)
+                    for _ in range(CRAWL_SLICES)
+                )
+            )
+
+    # 先启动解析池，不把子进程启动时间算进去
+    await crawler.get_trending_repositories(since=AllowedDateRanges.daily)
+    idle = await measure(client, lambda: asyncio.sleep(1))
+    return *idle, *await measure(client, crawl)
+
+
+@pytest.mark.parametrize("crawler", ["process"], indirect=True)
+async def test_readers_stay_flat_during_a_crawl(client, crawler):
+    idle_request, idle_lag, crawl_request, crawl_lag = await idle_and_crawl(
+        client, crawler
+    )
+    assert crawl_request < idle_request + MARGIN_MS, (
+        f"request p99 {crawl_request:.1f} ms during the crawl, "
+        f"{idle_request:.1f} ms idle"
+    )
+    assert (
+        crawl_lag < idle_lag + MARGIN_MS
+    ), f"loop lag p99 {crawl_lag:.1f} ms during the crawl, {idle_lag:.1f} ms idle"
+
+
+@pytest.mark.parametrize("crawler", ["inline"], indirect=True)
+async def test_inline_parsing_shows_up_in_loop_lag(client, crawler):
+    # 确认上面的检查能发现在事件循环上解析的回归
+    _, idle_lag, _, crawl_lag = await idle_and_crawl(client, crawler)
+    assert crawl_lag > idle_lag + MARGIN_MS
@@ -0,0 +1,74 @@
+"""Parsing of trending pages into scraped records."""
+
+import pytest
+from trending_pages import REPOSITORY_ARTICLE, developers_page, repositories_page
+
+from app.config import Settings
+from app.services import parsing
+from app.services.scraping import (
+    ScrapedRepository,
+    filter_articles,
+    make_soup,
+    parse_developers,
+    parse_repositories,
+    scraping_repositories,
+)
+
+
+def test_repositories():
+    repositories = parse_repositories(filter_articles(repositories_page(25)))
+    assert len(repositories) == 25
+    assert repositories[3] == ScrapedRepository(
+        rank=4,
+        username="owner3",
+        repository_name="project3",
+        url="https://github.com/owner3/project3",
+        description="A fast tool number 3 for containers and clusters",
+        language="Rust",
+        language_color="#dea584",
+        total_stars=12343,
+        forks=123,
+        stars_since=1023,
+    )
+
+
+def test_missing_counts_are_not_taken_from_the_previous_article():
+    second = REPOSITORY_ARTICLE.format(i=2)
+    for link in ("stargazers", "forks"):
+        start = second.index(f'<a href="/owner2/project2/{link}"')
+        second = second[:start] + second[second.index("</a>", start) + 5 :]
+    second = second.replace("1,022 stars today", "")
+    matches = make_soup(REPOSITORY_ARTICLE.format(i=1) + second)
+
+    first, repository = scraping_repositories(matches)
+    assert first.total_stars == 12341
+    assert (repository.total_stars, repository.forks, repository.stars_since) == (
+        None,
+        None,
+        None,
+    )
+
+
+def test_developers():
+    developers = parse_developers(filter_articles(developers_page(10)))
+    assert [developer.rank for developer in developers] == list(range(1, 11))
+    developer = developers[7]
+    assert developer.username == "dev7"
+    assert developer.url == "https://github.com/dev7"
+    assert developer.name == "Developer 7"
+    assert developer.popular_repo_name == "tool7"
+    assert developer.popular_repo_url == "https://github.com/dev7/tool7"
+    assert developer.popular_repo_description == "Popular tool number 7"
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("executor", ["inline", "thread", "process"])
+async def test_every_executor_returns_the_same_records(executor, monkeypatch):
+    articles_html = filter_articles(repositories_page(25))
+    monkeypatch.setattr(Settings.app, "PARSE_EXECUTOR", executor)
+    parsing.shutdown()
+    try:
+        records = await parsing.run_parser(parse_repositories, articles_html)
+    finally:
+        parsing.shutdown()
+    assert records == parse_repositories(articles_html)
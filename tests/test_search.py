@@ -0,0 +1,80 @@
+"""Full-text search, including 1–2 character CJK terms."""
+
+from dataclasses import replace
+
+import pytest
+from sqlalchemy import text
+
+from app.database import create_db_and_tables, get_session
+from app.enums import AllowedDateRanges, AllowedTrendingKinds
+from app.services.scheduler import scheduler
+from app.services.search import (
+    BIGRAM_TABLE,
+    MARK_END,
+    MARK_START,
+    _highlight,
+    bigrams,
+    search_repositories,
+)
+
+pytestmark = pytest.mark.anyio
+
+
+async def search(query: str) -> list:
+    async with get_session() as session:
+        return await search_repositories(session, query)
+
+
+@pytest.fixture
+async def published(services):
+    services.repositories[0] = replace(
+        services.repositories[0],
+        description="<script>alert(1)</script> kubernetes",
+    )
+    await scheduler.run_slices(
+        [scheduler.slices[(AllowedTrendingKinds.repositories, AllowedDateRanges.daily)]]
+    )
+    return services
+
+
+def test_bigrams():
+    assert bigrams("云原生 Go", None, "k8s") == "8s go k8 o s 云原 原生 生"
+
+
+@pytest.mark.parametrize(
+    "query, usernames",
+    [
+        ("云原生", 5),
+        ("原生", 5),
+        ("生", 5),
+        ("user3 工具", 1),
+        ("云计", 5),
+        ("计算 user1", 1),
+        ("生云", 0),
+        ("x", 0),
+    ],
+)
+async def test_short_terms(published, query, usernames):
+    assert len(await search(query)) == usernames
+
+
+def test_highlight_escapes_the_text():
+    snippet = f"<script>{MARK_START}alert{MARK_END}(1)</script>"
+    assert _highlight(snippet) == "&lt;script&gt;<mark>alert</mark>(1)&lt;/script&gt;"
+
+
+async def test_snippets_are_escaped(published, database):
+    (result,) = await search("script kubernetes")
+    assert "<script>" not in result.snippet
+    if database.dialect.name == "sqlite":
+        assert "&lt;/<mark>script</mark>&gt;" in result.snippet
+        assert "<mark>kubernetes</mark>" in result.snippet
+
+
+async def test_bigram_table_is_backfilled(published, database):
+    if database.dialect.name != "sqlite":
+        pytest.skip("the bigram table exists on SQLite only")
+    async with database.begin() as conn:
+        await conn.execute(text(f"DROP TABLE {BIGRAM_TABLE}"))
+    await create_db_and_tables()
+    assert len(await search("原生")) == 5
@@ -0,0 +1,179 @@
+"""Similar repositories from the TF-IDF index."""
+
+from datetime import UTC, datetime
+from typing import Tuple
+
+import pytest
+from sqlmodel import select
+
+import app.services.similarity as similarity
+from app.config import Settings
+from app.database import get_session
+from app.enums import AllowedDateRanges, AllowedTrendingKinds
+from app.models import RelatedRepository, Repository
+from app.services.scheduler import scheduler
+from app.services.similarity import SimilarityIndex
+
+CREATED_AT = datetime(2026, 10, 19, tzinfo=UTC)
+
+TOPICS = {
+    "k8s": (
+        "Deploy kubernetes clusters with helm charts",
+        "容器编排工具",
+        "kubernetes",
+    ),
+    "llm": ("Fine-tune large language models on a GPU", "大语言模型微调", "llm"),
+    "web": ("A fast web framework with routing and templates", "网页开发框架", "web"),
+}
+
+
+# 上面的索引去掉 10、加上 3 和 4 之后的内容
+REBUILT = {0: "k8s", 1: "k8s", 2: "k8s", 11: "llm", 12: "llm"}
+REBUILT.update({20: "web", 21: "web", 22: "web", 3: "k8s", 4: "k8s"})
+
+
+def document(repository_id: int, username: str, topic: str) -> Tuple:
+    description, summary, keyword = TOPICS[topic]
+    return (
+        repository_id,
+        CREATED_AT,
+        username,
+        f"{topic}-project",
+        f"https://github.com/{username}/{topic}-project",
+        f"{description} by {username}",
+        summary,
+        f"{keyword} {topic}-{username}",
+    )
+
+
+def neighbors(index: SimilarityIndex, repository_id: int, k: int = 5) -> list:
+    return [item.id for item in index._neighbors([repository_id], k)[repository_id]]
+
+
+def scores(index: SimilarityIndex, repository_id: int) -> set:
+    related = index._neighbors([repository_id], 5)[repository_id]
+    return {(item.id, item.score) for item in related}
+
+
+@pytest.fixture
+def index() -> SimilarityIndex:
+    index = SimilarityIndex()
+    index._apply(
+        [],
+        [
+            document(i * 10 + n, f"user{n}", topic)
+            for i, topic in enumerate(TOPICS)
+            for n in range(3)
+        ],
+    )
+    return index
+
+
+def test_neighbors_share_a_topic(index):
+    assert sorted(neighbors(index, 0)) == [1, 2]
+    assert sorted(neighbors(index, 21)) == [20, 22]
+    related = index._neighbors([0], 1)[0]
+    assert len(related) == 1 and related[0].score >= Settings.app.SIMILARITY_MIN_SCORE
+
+
+def test_removed_repositories_are_masked(index):
+    index._apply([1], [])
+    assert neighbors(index, 0) == [2]
+    assert 1 not in index._neighbors([0, 1], 5)
+
+
+def test_added_repositories_are_found(index, monkeypatch):
+    monkeypatch.setattr(Settings.app, "SIMILARITY_REWEIGHT_RATIO", 1.0)
+    index._apply([], [document(3, "user3", "k8s")])
+    assert len(index._blocks) == 2
+    assert sorted(neighbors(index, 3)) == [0, 1, 2]
+    assert 3 in neighbors(index, 0)
+
+
+def test_drift_rebuilds_the_index(index, monkeypatch):
+    monkeypatch.setattr(Settings.app, "SIMILARITY_REWEIGHT_RATIO", 0.1)
+    index._apply([10], [document(3, "user3", "k8s"), document(4, "user4", "k8s")])
+    assert len(index._blocks) == 1
+    assert index._built_documents == len(index._documents) == 10
+    assert 10 not in index._documents
+
+    # 合并后的结果与从头构建的一样
+    fresh = SimilarityIndex()
+    fresh._apply(
+        [],
+        [document(i, f"user{i % 10}", topic) for i, topic in REBUILT.items()],
+    )
+    for repository_id in (0, 3, 21):
+        assert scores(index, repository_id) == scores(fresh, repository_id)
+
+
+def test_same_name_is_not_its_own_neighbor(index, monkeypatch):
+    monkeypatch.setattr(Settings.app, "SIMILARITY_REWEIGHT_RATIO", 1.0)
+    # 同一仓库在另一个时间范围下的一行
+    index._apply([], [document(100, "user0", "k8s")])
+    assert sorted(neighbors(index, 0)) == [1, 2]
+    assert sorted(neighbors(index, 100)) == [1, 2]
+    # 两行都是 user0 的仓库，只列出一次
+    assert len([i for i in neighbors(index, 1) if i in (0, 100)]) == 1
+
+
+@pytest.fixture
+def similarity_index(monkeypatch) -> SimilarityIndex:
+    index = SimilarityIndex()
+    monkeypatch.setattr(similarity, "similarity_index", index)
+    return index
+
+
+async def publish_daily():
+    await scheduler.run_slices(
+        [scheduler.slices[(AllowedTrendingKinds.repositories, AllowedDateRanges.daily)]]
+    )
+
+
+async def related_rows() -> list:
+    async with get_session() as session:
+        result = await session.execute(select(RelatedRepository))
+        return list(result.scalars())
+
+
+@pytest.mark.anyio
+async def test_publish_stores_related_repositories(services, similarity_index):
+    await publish_daily()
+
+    async with get_session() as session:
+        repositories = {
+            repository.id: repository.username
+            for repository in (await session.execute(select(Repository))).scalars()
+        }
+    rows = await related_rows()
+    assert {row.repository_id for row in rows} == set(repositories)
+    for row in rows:
+        assert row.related_id in repositories
+        assert row.username != repositories[row.repository_id]
+
+
+@pytest.mark.anyio
+async def test_sync_runs_before_the_publish_transaction(
+    services, similarity_index, monkeypatch
+):
+    await publish_daily()
+    synced = set(similarity_index._documents)
+
+    # 总结过期后每个仓库都换成新的一行
+    monkeypatch.setattr(Settings.app, "UPDATE_INTERVAL", 0)
+    fetched = []
+    real_fetch = similarity_index._fetch
+
+    async def fetch(session, ids):
+        fetched.append(sorted(ids))
+        return await real_fetch(session, ids)
+
+    monkeypatch.setattr(similarity_index, "_fetch", fetch)
+    await publish_daily()
+
+    rows = await related_rows()
+    current = {row.repository_id for row in rows}
+    assert current and not current & synced
+    # 发布事务里只向量化本次新写入的行，旧版本不会出现在相似项目里
+    assert fetched == [sorted(current)]
+    assert all(row.related_id in current for row in rows)
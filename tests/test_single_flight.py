@@ -0,0 +1,179 @@
+"""Single flight, and the stampede it removes from cold read paths."""
+
+import asyncio
+
+import httpx
+import pytest
+
+import app.main
+import app.services.read_model as read_model_module
+from app.api.routes import rss_service
+from app.enums import AllowedDateRanges
+from app.services.cache import feed_cache
+from app.services.read_model import read_model
+from app.config import Settings
+from app.services.singleflight import SingleFlight, SingleFlightTimeout, single_flight
+
+pytestmark = pytest.mark.anyio
+
+CONCURRENCY = 50
+
+
+async def test_concurrent_calls_share_one_computation():
+    flight = SingleFlight()
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return calls
+
+    results = await asyncio.gather(*(flight.do("key", compute) for _ in range(10)))
+    assert results == [1] * 10
+    assert flight.in_flight() == 0
+    # 计算结束后释放 key，下一次调用重新计算
+    assert await flight.do("key", compute) == 2
+
+
+async def test_errors_reach_every_waiter():
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    results = await asyncio.gather(
+        *(flight.do("key", fail) for _ in range(5)), return_exceptions=True
+    )
+    assert all(isinstance(result, ValueError) for result in results)
+    assert flight.in_flight() == 0
+
+
+async def test_timeout_does_not_cancel_the_computation():
+    flight = SingleFlight()
+    finished = asyncio.Event()
+
+    async def slow():
+        await asyncio.sleep(0.1)
+        finished.set()
+        return "done"
+
+    with pytest.raises(SingleFlightTimeout):
+        await flight.do("key", slow, timeout=0.01)
+    # 其他等待者仍然拿到结果
+    assert await flight.do("key", slow) == "done"
+    assert finished.is_set()
+
+
+async def test_timeouts_of_the_computation_pass_through():
+    async def timing_out():
+        raise asyncio.TimeoutError()
+
+    with pytest.raises(asyncio.TimeoutError) as raised:
+        await SingleFlight().do("key", timing_out, timeout=1)
+    assert not isinstance(raised.value, SingleFlightTimeout)
+
+
+async def burst(client: httpx.AsyncClient, path: str) -> None:
+    responses = await asyncio.gather(*(client.get(path) for _ in range(CONCURRENCY)))
+    assert {response.status_code for response in responses} == {200}
+
+
+@pytest.fixture
+async def cold_client(services, monkeypatch):
+    """A client against a published database with cold caches, counting
+    snapshot loads and renders.
+    """
+    from app.services.scheduler import scheduler
+
+    await scheduler.run_slices(list(scheduler.slices.values()))
+    counts = {"load": 0, "rss": 0, "index": 0}
+
+    def counting(name, fn, is_async=False):
+        if is_async:
+
+            async def wrapper(*args, **kwargs):
+                counts[name] += 1
+                # 放大加载时间，让并发请求一定重叠
+                await asyncio.sleep(0.05)
+                return await fn(*args, **kwargs)
+
+        else:
+
+            def wrapper(*args, **kwargs):
+                counts[name] += 1
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    monkeypatch.setattr(
+        read_model_module,
+        "load_snapshot",
+        counting("load", read_model_module.load_snapshot, is_async=True),
+    )
+    monkeypatch.setattr(
+        rss_service,
+        "generate_repository_feed",
+        counting("rss", rss_service.generate_repository_feed),
+    )
+    monkeypatch.setattr(
+        app.main, "render_index_page", counting("index", app.main.render_index_page)
+    )
+    read_model._snapshots.clear()
+    feed_cache._entries.clear()
+    transport = httpx.ASGITransport(app=app.main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client, counts
+
+
+@pytest.mark.parametrize(
+    "path, render",
+    [
+        ("/api/trending/repositories/daily", "rss"),
+        ("/?since=daily", "index"),
+    ],
+)
+async def test_cold_burst_loads_and_renders_once(cold_client, path, render):
+    client, counts = cold_client
+    await burst(client, path)
+    assert counts["load"] == 1
+    assert counts[render] == 1
+
+
+async def test_cold_burst_without_single_flight_stampedes(cold_client, monkeypatch):
+    client, counts = cold_client
+
+    async def passthrough(key, fn, timeout=None):
+        return await fn()
+
+    monkeypatch.setattr(single_flight, "do", passthrough)
+    await burst(client, "/api/trending/repositories/daily")
+    # 没有合并时每个请求都各自加载快照并生成 feed
+    assert counts["load"] == CONCURRENCY
+    assert counts["rss"] == CONCURRENCY
+    assert read_model._snapshots[AllowedDateRanges.daily].version > 0
+
+
+async def test_only_single_flight_timeouts_are_service_busy(cold_client, monkeypatch):
+    client, _ = cold_client
+
+    released = asyncio.Event()
+
+    async def stuck(session, since):
+        await released.wait()
+        raise LookupError(since)
+
+    monkeypatch.setattr(read_model_module, "load_snapshot", stuck)
+    monkeypatch.setattr(Settings.app, "SINGLE_FLIGHT_TIMEOUT", 0.05)
+    response = await client.get("/api/repositories/weekly")
+    assert response.status_code == 503
+    released.set()
+
+    async def database_timeout(session, since):
+        raise asyncio.TimeoutError()
+
+    monkeypatch.setattr(read_model_module, "load_snapshot", database_timeout)
+    # 其他超时是真正的错误，不会被当成服务繁忙
+    with pytest.raises(asyncio.TimeoutError):
+        await client.get("/api/repositories/monthly")
@@ -0,0 +1,47 @@
+"""Synthetic GitHub trending pages shaped like the real markup."""
+
+REPOSITORY_ARTICLE = """<article class="Box-row">
+<div class="float-right d-flex"><a href="/login">Star</a></div>
+<h2 class="h3 lh-condensed"><a href="/owner{i}/project{i}" class="Link">owner{i} / project{i}</a></h2>
+<p class="col-9 color-fg-muted my-1 pr-4">A fast tool number {i} for containers and clusters</p>
+<div class="f6 color-fg-muted mt-2">
+<span class="d-inline-block ml-0 mr-3"><span class="repo-language-color" style="background-color: #dea584"></span>
+<span itemprop="programmingLanguage">Rust</span></span>
+<a href="/owner{i}/project{i}/stargazers" class="Link d-inline-block mr-3">12,34{i}</a>
+<a href="/owner{i}/project{i}/forks" class="Link d-inline-block mr-3">1,2{i}</a>
+<span class="d-inline-block mr-3">Built by <a href="/a{i}"><img class="avatar mb-1" src="https://avatars.githubusercontent.com/u/{i}?s=40"/></a></span>
+<span class="d-inline-block float-sm-right">1,02{i} stars today</span>
+</div>
+</article>"""
+
+DEVELOPER_ARTICLE = """<article class="Box-row d-flex" id="pa-dev{i}">
+<div class="mx-3"><a href="/dev{i}"><img class="rounded avatar-user" src="https://avatars.githubusercontent.com/u/{i}?s=96" width="48" height="48" alt="@dev{i}"/></a></div>
+<div class="d-sm-flex flex-auto">
+<div class="col-sm-8 d-md-flex">
+<div class="col-md-6"><h1 class="h3 lh-condensed"><a href="/dev{i}">Developer {i}</a></h1></div>
+<div class="col-md-6"><article>
+<h1 class="h4 lh-condensed"><a href="/dev{i}/tool{i}">tool{i}</a></h1>
+<div class="f6 color-text-secondary mt-1">Popular tool number {i}</div>
+</article></div>
+</div>
+</div>
+</article>"""
+
+HEADER = """<!DOCTYPE html>
+<html><head><title>Trending</title>
+<script>var article = "not an article";</script></head>
+<body><div class="application-main"><nav>Explore</nav>
+"""
+
+FOOTER = """</div><footer>GitHub</footer></body></html>
+"""
+
+
+def repositories_page(count: int = 25) -> str:
+    articles = "\n".join(REPOSITORY_ARTICLE.format(i=i) for i in range(count))
+    return f"{HEADER}{articles}\n{FOOTER}"
+
+
+def developers_page(count: int = 25) -> str:
+    articles = "\n".join(DEVELOPER_ARTICLE.format(i=i) for i in range(count))
+    return f"{HEADER}{articles}\n{FOOTER}"